@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark da compressão das respostas da API
+Para uma resposta do GET /items com peças sintéticas, mede o tempo de CPU e
+os bytes economizados de cada codificação/nível (gzip e, se o pacote 'brotli'
+estiver instalado, br), incluindo o base64 exigido pelo API Gateway.
+
+Uso:
+    python benchmark_compressao.py [--itens 100 1000] [--repeticoes 20]
+"""
+
+import argparse
+import base64
+import gzip
+import json
+import os
+import sys
+import time
+
+# O handler exige o nome da tabela, mas o benchmark não acessa a AWS
+os.environ.setdefault('DYNAMODB_TABLE', 'benchmark')
+import handler
+
+
+def gerar_resposta(quantidade):
+    """Monta o corpo JSON de uma página do GET /items"""
+    items = [
+        {
+            'id': f'00000000-0000-0000-0000-{i:012d}',
+            'nome': f'Filtro de Óleo Mann W{i}',
+            'codigo': f'MANN-W{i}',
+            'preco': round(10 + (i % 500) + (i % 100) / 100, 2),
+            'quantidade': i % 300,
+            'descricao': 'Filtro de óleo para motores diesel e gasolina',
+            'fabricante': 'Mann Filter',
+            'created_at': '2025-12-16T10:30:00.123456',
+            'updated_at': '2025-12-16T10:30:00.123456',
+            'version': 1
+        }
+        for i in range(quantidade)
+    ]
+    return json.dumps({'items': items, 'count': len(items), 'next_cursor': None}, cls=handler.DecimalEncoder)
+
+
+def codificadores():
+    """Lista (nome, função de compressão) a comparar"""
+    lista = [(f'gzip-{nivel}', lambda dados, nivel=nivel: gzip.compress(dados, compresslevel=nivel, mtime=0))
+             for nivel in (1, 5, 6, 9)]
+    brotli = handler.brotli_module()
+    if brotli:
+        lista += [(f'br-{qualidade}', lambda dados, qualidade=qualidade: brotli.compress(dados, quality=qualidade))
+                  for qualidade in (1, 4, 6, 11)]
+    return lista
+
+
+def medir(funcao, dados, repeticoes):
+    """Retorna (melhor tempo de CPU em ms, tamanho final em bytes)"""
+    melhor = float('inf')
+    resultado = b''
+    for _ in range(repeticoes):
+        inicio = time.process_time()
+        resultado = base64.b64encode(funcao(dados))
+        melhor = min(melhor, time.process_time() - inicio)
+    return melhor * 1000, len(resultado)
+
+
+def main():
+    """
+    Função principal
+    """
+    parser = argparse.ArgumentParser(description="Benchmark da compressão das respostas")
+    parser.add_argument('--itens', type=int, nargs='+', default=[10, 100, 1000],
+                        help="Itens por resposta (padrão: 10 100 1000)")
+    parser.add_argument('--repeticoes', type=int, default=20, help="Repetições (padrão: 20)")
+    args = parser.parse_args()
+    
+    if not handler.brotli_module():
+        print("ℹ️  Pacote 'brotli' não instalado: só gzip será medido (pip install brotli)\n")
+    
+    for quantidade in args.itens:
+        dados = gerar_resposta(quantidade).encode('utf-8')
+        print(f"Resposta com {quantidade} itens: {len(dados):,} bytes de JSON")
+        print(f"  {'Codificação':<12} {'CPU ms':>9} {'Bytes (b64)':>12} {'Economia':>9} {'MB/s':>8}")
+        for nome, funcao in codificadores():
+            cpu_ms, tamanho = medir(funcao, dados, args.repeticoes)
+            economia = 1 - tamanho / len(dados)
+            vazao = len(dados) / 1e6 / (cpu_ms / 1000) if cpu_ms else float('inf')
+            print(f"  {nome:<12} {cpu_ms:>9.3f} {tamanho:>12,} {economia:>8.1%} {vazao:>8.1f}")
+        print()
+    
+    print(f"Configuração atual: GZIP_LEVEL={handler.GZIP_LEVEL}, BROTLI_QUALITY={handler.BROTLI_QUALITY}, "
+          f"COMPRESSION_MIN_BYTES={handler.COMPRESSION_MIN_BYTES}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Benchmark dos Handlers sem LocalStack
+Executa cada handler do handler.py contra o backend em memória
+(memory_backend.py) e imprime throughput e latências p50/p95/p99.
+Como não há rede nem emulação envolvidas, os números medem apenas o custo
+do nosso código (validação, expressões, serialização).
+
+Uso:
+    python benchmark_handlers.py [--pecas 5000] [--iteracoes 500]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+# Precisa ser definido antes de importar o handler
+os.environ['STORAGE_BACKEND'] = 'memory'
+os.environ.setdefault('DYNAMODB_TABLE', 'pecas-automotivas-benchmark')
+os.environ.setdefault('SNS_TOPIC_ARN', 'arn:aws:sns:us-east-1:000000000000:pecas-automotivas-topic')
+
+import handler
+import memory_backend
+
+
+FABRICANTES = ['NGK', 'Bosch', 'Mann Filter', 'Cofap', 'Moura', 'Gates', 'TRW', 'Fras-le']
+
+
+def gerar_peca(indice, rng):
+    """Gera os dados de uma peça sintética"""
+    fabricante = rng.choice(FABRICANTES)
+    return {
+        'nome': f'Peça {indice} {fabricante}',
+        'codigo': f'{fabricante[:3].upper()}-{indice:07d}',
+        'preco': round(rng.uniform(5, 2000), 2),
+        'quantidade': rng.randint(0, 500),
+        'descricao': 'Peça automotiva gerada para benchmark',
+        'fabricante': fabricante
+    }
+
+
+def evento(body=None, path=None, query=None, headers=None):
+    """Monta um evento no formato do API Gateway (proxy)"""
+    return {
+        'body': json.dumps(body) if body is not None else None,
+        'pathParameters': path,
+        'queryStringParameters': query,
+        'headers': headers or {}
+    }
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) de uma lista já ordenada"""
+    if not valores:
+        return 0.0
+    indice = min(len(valores) - 1, int(round(p / 100 * (len(valores) - 1))))
+    return valores[indice]
+
+
+def medir(nome, funcao, gerar_evento, iteracoes, status_esperados=(200, 201)):
+    """Executa o handler 'iteracoes' vezes e retorna as estatísticas"""
+    latencias = []
+    erros = 0
+    inicio = time.perf_counter()
+    for i in range(iteracoes):
+        ev = gerar_evento(i)
+        t0 = time.perf_counter()
+        resposta = funcao(ev, None)
+        latencias.append((time.perf_counter() - t0) * 1000)
+        if resposta['statusCode'] not in status_esperados:
+            erros += 1
+    duracao = time.perf_counter() - inicio
+    latencias.sort()
+    return {
+        'handler': nome,
+        'iteracoes': iteracoes,
+        'erros': erros,
+        'ops_por_segundo': round(iteracoes / duracao, 1),
+        'p50_ms': round(percentil(latencias, 50), 3),
+        'p95_ms': round(percentil(latencias, 95), 3),
+        'p99_ms': round(percentil(latencias, 99), 3)
+    }
+
+
+def main():
+    """
+    Função principal
+    """
+    parser = argparse.ArgumentParser(description="Benchmark dos handlers com o backend em memória")
+    parser.add_argument('--pecas', type=int, default=5000, help="Peças carregadas antes das medições (padrão: 5000)")
+    parser.add_argument('--iteracoes', type=int, default=500, help="Chamadas por handler (padrão: 500)")
+    parser.add_argument('--seed', type=int, default=42, help="Semente do gerador de dados (padrão: 42)")
+    parser.add_argument('--json', help="Arquivo para salvar os resultados em JSON")
+    args = parser.parse_args()
+    
+    rng = random.Random(args.seed)
+    memory_backend.reset()
+    
+    # Carga inicial do catálogo
+    pecas = [gerar_peca(i, rng) for i in range(args.pecas)]
+    for inicio in range(0, len(pecas), handler.MAX_BATCH_ITEMS):
+        handler.create_items_batch(evento(pecas[inicio:inicio + handler.MAX_BATCH_ITEMS]), None)
+    ids = [item['id'] for pagina in handler.parallel_scan(1) for item in pagina]
+    
+    proximo = [args.pecas]
+    
+    def nova_peca(_):
+        proximo[0] += 1
+        return evento(gerar_peca(proximo[0], rng))
+    
+    def novo_lote(_):
+        lote = []
+        for _ in range(100):
+            proximo[0] += 1
+            lote.append(gerar_peca(proximo[0], rng))
+        return evento(lote)
+    
+    n = args.iteracoes
+    resultados = [
+        medir('create_item', handler.create_item, nova_peca, n),
+        medir('create_items_batch (100)', handler.create_items_batch, novo_lote, max(1, n // 10)),
+        medir('get_item', handler.get_item, lambda i: evento(path={'id': rng.choice(ids)}), n),
+        medir('list_items (limit=100)', handler.list_items, lambda i: evento(query={'limit': '100'}), n),
+        medir('list_items (codigo=)', handler.list_items,
+              lambda i: evento(query={'codigo': pecas[rng.randrange(len(pecas))]['codigo']}), n),
+        medir('list_items (all=true)', handler.list_items, lambda i: evento(query={'all': 'true'}), max(1, n // 100)),
+        medir('lookup_items (100)', handler.lookup_items, lambda i: evento({'ids': rng.sample(ids, 100)}), max(1, n // 10)),
+        medir('export_items (csv, 1000)', handler.export_items,
+              lambda i: evento(query={'format': 'csv', 'limit': '1000'}), max(1, n // 10)),
+        medir('update_item', handler.update_item,
+              lambda i: evento({'preco': round(rng.uniform(5, 2000), 2)}, path={'id': rng.choice(ids)}), n),
+        medir('adjust_stock', handler.adjust_stock,
+              lambda i: evento({'delta': rng.choice([5, 10, 20])}, path={'id': rng.choice(ids)}), n),
+        medir('delete_item', handler.delete_item, lambda i: evento(path={'id': ids.pop()}), min(n, len(ids) // 2)),
+    ]
+    
+    print(f"\nPeças carregadas: {args.pecas} | Iterações por handler: {n}\n")
+    print(f"{'Handler':<28} {'ops/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'erros':>6}")
+    print('-' * 76)
+    for r in resultados:
+        print(f"{r['handler']:<28} {r['ops_por_segundo']:>10} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9} {r['erros']:>6}")
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump({'pecas': args.pecas, 'iteracoes': n, 'resultados': resultados}, arquivo, indent=2)
+        print(f"\nResultados salvos em {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark da serialização das respostas da API
+Compara o caminho antigo (TypeDeserializer + Decimal + DecimalEncoder) com o
+caminho rápido (client de baixo nível + deserialize_item + json.dumps) para uma
+página de peças sintéticas, e imprime itens/segundo de cada um.
+
+Uso:
+    python benchmark_serializacao.py [--itens 5000] [--repeticoes 10]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from decimal import Decimal
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+# O handler exige o nome da tabela, mas o benchmark não acessa a AWS
+os.environ.setdefault('DYNAMODB_TABLE', 'benchmark')
+import handler
+
+
+def gerar_itens(quantidade):
+    """
+    Gera itens sintéticos no formato do DynamoDB (como chegam do client)
+    """
+    serializer = TypeSerializer()
+    itens = []
+    for i in range(quantidade):
+        item = {
+            'id': f'00000000-0000-0000-0000-{i:012d}',
+            'nome': f'Filtro de Óleo Mann W{i}',
+            'codigo': f'MANN-W{i}',
+            'preco': Decimal(f'{10 + i % 500}.{i % 100:02d}'),
+            'quantidade': Decimal(i % 300),
+            'descricao': 'Filtro de óleo para motores diesel e gasolina',
+            'fabricante': 'Mann Filter',
+            'created_at': '2025-12-16T10:30:00.123456',
+            'updated_at': '2025-12-16T10:30:00.123456',
+            'version': Decimal(1)
+        }
+        itens.append({chave: serializer.serialize(valor) for chave, valor in item.items()})
+    return itens
+
+
+def caminho_antigo(itens):
+    """Resource do boto3 (Decimal) + DecimalEncoder"""
+    deserializer = TypeDeserializer()
+    items = [
+        {chave: deserializer.deserialize(valor) for chave, valor in item.items()}
+        for item in itens
+    ]
+    return json.dumps({'items': items, 'count': len(items)}, cls=handler.DecimalEncoder)
+
+
+def caminho_rapido(itens):
+    """Client de baixo nível + deserialize_item"""
+    items = [handler.deserialize_item(item) for item in itens]
+    return json.dumps({'items': items, 'count': len(items)}, cls=handler.DecimalEncoder)
+
+
+def medir(funcao, itens, repeticoes):
+    """Retorna o melhor tempo (segundos) entre as repetições"""
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(itens)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def main():
+    """
+    Função principal
+    """
+    parser = argparse.ArgumentParser(description="Benchmark da serialização das respostas")
+    parser.add_argument('--itens', type=int, default=5000, help="Itens por resposta (padrão: 5000)")
+    parser.add_argument('--repeticoes', type=int, default=10, help="Repetições (padrão: 10)")
+    args = parser.parse_args()
+    
+    itens = gerar_itens(args.itens)
+    
+    # Os dois caminhos precisam produzir o mesmo JSON
+    if json.loads(caminho_antigo(itens)) != json.loads(caminho_rapido(itens)):
+        print("❌ Os caminhos produziram respostas diferentes")
+        return 1
+    
+    tempo_antigo = medir(caminho_antigo, itens, args.repeticoes)
+    tempo_rapido = medir(caminho_rapido, itens, args.repeticoes)
+    
+    print(f"Itens por resposta: {args.itens}")
+    print(f"  Antes  (TypeDeserializer + DecimalEncoder): {args.itens / tempo_antigo:>12,.0f} itens/s")
+    print(f"  Depois (deserialize_item + json.dumps):     {args.itens / tempo_rapido:>12,.0f} itens/s")
+    print(f"  Ganho: {tempo_antigo / tempo_rapido:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Coletor Local das Métricas da API
+Lê as linhas EMF (JSON com a chave '_aws') impressas pelos handlers com
+METRICS_ENABLED=true e agrega por handler: invocações, duração (p50/p95/p99),
+tempo médio de cada etapa (DynamoDB, SNS, JSON, validação...), RCU/WCU
+consumidas e tamanho médio dos payloads.
+
+Uso:
+    python servidor_local.py --backend memory --metricas | python coletor_metricas.py
+    python coletor_metricas.py --arquivo logs.txt --json resumo.json
+    serverless logs -f listItems --stage local | python coletor_metricas.py
+"""
+
+import argparse
+import json
+import sys
+import time
+
+
+PAYLOAD_FIELDS = ['RequestBytes', 'ResponseBytes', 'SnsBytes']
+CAPACITY_FIELDS = ['ConsumedRCU', 'ConsumedWCU']
+
+
+def percentile(values, fraction):
+    """Percentil por interpolação linear (values já ordenado)"""
+    if not values:
+        return 0.0
+    position = (len(values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def parse_record(line):
+    """Extrai o registro EMF de uma linha de log (ou None)"""
+    start = line.find('{')
+    if start < 0 or '"_aws"' not in line:
+        return None
+    try:
+        record = json.loads(line[start:])
+    except ValueError:
+        return None
+    if not isinstance(record, dict) or '_aws' not in record or 'Handler' not in record:
+        return None
+    return record
+
+
+class Coletor:
+    """Acumula os registros EMF por handler"""
+
+    def __init__(self):
+        self.handlers = {}
+
+    def add(self, record):
+        stats = self.handlers.setdefault(record['Handler'], {
+            'durations': [],
+            'stages': {},
+            'totals': {field: 0 for field in CAPACITY_FIELDS + PAYLOAD_FIELDS},
+            'status': {}
+        })
+        stats['durations'].append(record.get('Duration', 0))
+        for field in stats['totals']:
+            stats['totals'][field] += record.get(field, 0)
+        if 'StatusCode' in record:
+            status = str(record['StatusCode'])
+            stats['status'][status] = stats['status'].get(status, 0) + 1
+        for key, value in record.items():
+            if key.endswith('.ms'):
+                stage = key[:-3]
+                total, calls = stats['stages'].get(stage, (0.0, 0))
+                stats['stages'][stage] = (total + value, calls + record.get(f'{stage}.calls', 1))
+
+    def summary(self):
+        """Resumo agregado (dict serializável)"""
+        result = {}
+        for handler, stats in sorted(self.handlers.items()):
+            durations = sorted(stats['durations'])
+            count = len(durations)
+            result[handler] = {
+                'invocations': count,
+                'p50_ms': round(percentile(durations, 0.50), 3),
+                'p95_ms': round(percentile(durations, 0.95), 3),
+                'p99_ms': round(percentile(durations, 0.99), 3),
+                'avg_ms': round(sum(durations) / count, 3),
+                'status': stats['status'],
+                'rcu_total': round(stats['totals']['ConsumedRCU'], 3),
+                'wcu_total': round(stats['totals']['ConsumedWCU'], 3),
+                'avg_bytes': {field: round(stats['totals'][field] / count, 1) for field in PAYLOAD_FIELDS},
+                'stages': {
+                    stage: {
+                        'avg_ms_per_invocation': round(total / count, 3),
+                        'calls_per_invocation': round(calls / count, 2)
+                    }
+                    for stage, (total, calls) in sorted(stats['stages'].items(), key=lambda entry: -entry[1][0])
+                }
+            }
+        return result
+
+    def print_summary(self, output=sys.stderr):
+        summary = self.summary()
+        if not summary:
+            print("Nenhuma métrica recebida (os handlers rodam com METRICS_ENABLED=true?)", file=output)
+            return
+        print("=" * 78, file=output)
+        print("  MÉTRICAS POR HANDLER", file=output)
+        print("  (etapas paralelas, como scan segmentado, podem somar mais de 100%)", file=output)
+        print("=" * 78, file=output)
+        for handler, stats in summary.items():
+            print(f"\n{handler}: {stats['invocations']} invocações | "
+                  f"p50 {stats['p50_ms']} ms | p95 {stats['p95_ms']} ms | p99 {stats['p99_ms']} ms", file=output)
+            print(f"  RCU {stats['rcu_total']} | WCU {stats['wcu_total']} | "
+                  f"req {stats['avg_bytes']['RequestBytes']} B | resp {stats['avg_bytes']['ResponseBytes']} B | "
+                  f"SNS {stats['avg_bytes']['SnsBytes']} B | status {stats['status']}", file=output)
+            for stage, values in stats['stages'].items():
+                share = values['avg_ms_per_invocation'] / stats['avg_ms'] if stats['avg_ms'] else 0
+                print(f"    {stage:<28} {values['avg_ms_per_invocation']:>9.3f} ms "
+                      f"({share:>6.1%}) x{values['calls_per_invocation']}", file=output)
+        print(file=output)
+
+
+def main():
+    """
+    Função principal
+    """
+    parser = argparse.ArgumentParser(description="Agrega as métricas EMF dos handlers")
+    parser.add_argument('--arquivo', help="Lê de um arquivo em vez da entrada padrão")
+    parser.add_argument('--intervalo', type=float, default=0,
+                        help="Imprime o resumo a cada N segundos (padrão: só no final)")
+    parser.add_argument('--json', dest='saida_json', help="Grava o resumo final em um arquivo JSON")
+    parser.add_argument('--repassar', action='store_true',
+                        help="Repassa as linhas que não são métricas para a saída padrão")
+    args = parser.parse_args()
+
+    coletor = Coletor()
+    entrada = open(args.arquivo, encoding='utf-8') if args.arquivo else sys.stdin
+    ultimo_resumo = time.monotonic()
+
+    try:
+        for line in entrada:
+            record = parse_record(line)
+            if record is None:
+                if args.repassar:
+                    sys.stdout.write(line)
+                continue
+            coletor.add(record)
+            if args.intervalo and time.monotonic() - ultimo_resumo >= args.intervalo:
+                coletor.print_summary()
+                ultimo_resumo = time.monotonic()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if args.arquivo:
+            entrada.close()
+
+    coletor.print_summary()
+    if args.saida_json:
+        with open(args.saida_json, 'w', encoding='utf-8') as arquivo:
+            json.dump(coletor.summary(), arquivo, indent=2)
+        print(f"📄 Resumo salvo em {args.saida_json}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Exportação do Catálogo de Peças Automotivas
+Lê a tabela DynamoDB com scan paralelo e grava NDJSON ou CSV em streaming,
+mantendo o uso de memória constante independente do tamanho da tabela.
+
+Uso:
+    python exportar_catalogo.py --formato csv --saida catalogo.csv
+    python exportar_catalogo.py --formato ndjson > catalogo.ndjson
+"""
+
+import argparse
+import contextlib
+import sys
+import time
+
+import handler
+
+
+def exportar(saida, formato, segmentos):
+    """
+    Grava o catálogo completo em 'saida' e retorna o total de itens exportados
+    """
+    total = 0
+    include_header = True
+    
+    for page in handler.parallel_scan(segmentos):
+        for line in handler.export_lines(page, formato, include_header=include_header):
+            saida.write(line)
+        include_header = False
+        total += len(page)
+    
+    return total
+
+
+def main():
+    """
+    Função principal
+    """
+    parser = argparse.ArgumentParser(description="Exporta o catálogo de peças em NDJSON ou CSV")
+    parser.add_argument('--formato', choices=sorted(handler.EXPORT_FORMATS), default='ndjson',
+                        help="Formato de saída (padrão: ndjson)")
+    parser.add_argument('--saida', help="Arquivo de saída (padrão: stdout)")
+    parser.add_argument('--segmentos', type=int, default=handler.SCAN_SEGMENTS,
+                        help=f"Segmentos do scan paralelo (padrão: {handler.SCAN_SEGMENTS})")
+    args = parser.parse_args()
+    
+    inicio = time.perf_counter()
+    saida = open(args.saida, 'w', encoding='utf-8', newline='') if args.saida else sys.stdout
+    try:
+        # Mensagens do handler (ex.: ambiente detectado ao criar os clientes)
+        # vão para o stderr para não misturar com o catálogo no stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            total = exportar(saida, args.formato, args.segmentos)
+    finally:
+        if args.saida:
+            saida.close()
+    duracao = time.perf_counter() - inicio
+    
+    print(f"✅ {total} itens exportados em {duracao:.2f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
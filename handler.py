@@ -1,7 +1,28 @@
+import time
+
+# Início da importação do módulo (relatório de cold start)
+_MODULE_START = time.perf_counter()
+
+import base64
+import binascii
+import contextlib
+import contextvars
+import csv
+import functools
+import gzip
+import hashlib
+import io
 import json
 import os
+import queue
+import re
+import sys
+import threading
+import unicodedata
 import uuid
-import boto3
+from collections import OrderedDict
+from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from decimal import Decimal
 
@@ -23,224 +44,2081 @@ def is_local_environment():
 LOCALSTACK_ENDPOINT = os.environ.get('AWS_ENDPOINT_URL', 'http://localhost:4566')
 IS_LOCAL = is_local_environment()
 
-# Configurar clientes AWS com detecção automática de ambiente
-if IS_LOCAL:
-    print(f"🔧 Executando em AMBIENTE LOCAL - Endpoint: {LOCALSTACK_ENDPOINT}")
-    dynamodb = boto3.resource(
-        'dynamodb',
-        endpoint_url=LOCALSTACK_ENDPOINT,
-        region_name='us-east-1',
-        aws_access_key_id='test',
-        aws_secret_access_key='test'
+# Nome da tabela DynamoDB
+TABLE_NAME = os.environ['DYNAMODB_TABLE']
+
+# Configuração do botocore compartilhada por todos os clientes: pool de
+# conexões (scan paralelo), TCP keepalive, timeouts curtos e retries adaptativos
+AWS_CONNECT_TIMEOUT = float(os.environ.get('AWS_CONNECT_TIMEOUT', '1'))
+AWS_READ_TIMEOUT = float(os.environ.get('AWS_READ_TIMEOUT', '5'))
+AWS_MAX_ATTEMPTS = int(os.environ.get('AWS_MAX_ATTEMPTS', '5'))
+AWS_MAX_POOL_CONNECTIONS = int(os.environ.get('AWS_MAX_POOL_CONNECTIONS', '64'))
+
+# Clientes AWS criados sob demanda na primeira utilização e reaproveitados
+# pelas invocações seguintes do mesmo container. Funções que não usam SNS
+# (ou o DynamoDB) não pagam o custo de importar o boto3 e criar esses clientes.
+_aws_clients = {}
+_aws_clients_lock = threading.RLock()
+
+# Backend de armazenamento/notificações: 'aws' (DynamoDB/SNS reais ou
+# LocalStack) ou 'memory' (memory_backend.py, para testes e benchmarks
+# sem depender de serviços externos)
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'aws')
+
+# Tempos de inicialização (ms) para o relatório de cold start
+init_timings = {}
+
+# Instrumentação: uma linha JSON por invocação no formato EMF do CloudWatch,
+# com o tempo de cada etapa, RCU/WCU consumidas e tamanhos de payload
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'false').lower() == 'true'
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'PecasAutomotivasApi')
+
+
+def get_aws_config():
+    """Parâmetros dos clientes AWS com detecção automática de ambiente"""
+    # Importado aqui porque o botocore.config carrega boa parte do botocore
+    from botocore.config import Config
+    
+    config = Config(
+        connect_timeout=AWS_CONNECT_TIMEOUT,
+        read_timeout=AWS_READ_TIMEOUT,
+        retries={'max_attempts': AWS_MAX_ATTEMPTS, 'mode': 'adaptive'},
+        max_pool_connections=AWS_MAX_POOL_CONNECTIONS,
+        tcp_keepalive=True
     )
-    sns_client = boto3.client(
-        'sns',
-        endpoint_url=LOCALSTACK_ENDPOINT,
-        region_name='us-east-1',
-        aws_access_key_id='test',
-        aws_secret_access_key='test'
+    if IS_LOCAL:
+        return {
+            'endpoint_url': LOCALSTACK_ENDPOINT,
+            'region_name': 'us-east-1',
+            'aws_access_key_id': 'test',
+            'aws_secret_access_key': 'test',
+            'config': config
+        }
+    return {'region_name': 'us-east-1', 'config': config}
+
+
+def _get_aws_client(name, factory):
+    """Cria (uma única vez, mesmo entre threads) e retorna um cliente AWS"""
+    client = _aws_clients.get(name)
+    if client is not None:
+        return client
+    
+    with _aws_clients_lock:
+        if name not in _aws_clients:
+            start = time.perf_counter()
+            if not _aws_clients:
+                if IS_LOCAL:
+                    print(f"🔧 Executando em AMBIENTE LOCAL - Endpoint: {LOCALSTACK_ENDPOINT}")
+                else:
+                    print("☁️ Executando em AMBIENTE AWS REAL")
+            import boto3
+            _aws_clients[name] = factory(boto3)
+            init_timings[f'{name}_ms'] = round((time.perf_counter() - start) * 1000, 2)
+        return _aws_clients[name]
+
+
+_cold_start = True
+
+
+def report_cold_start(handler_function):
+    """
+    Decorator dos handlers Lambda: na primeira invocação do container imprime
+    (em uma linha JSON) o tempo de importação do módulo, o tempo de criação
+    de cada cliente AWS e a duração da primeira requisição.
+    """
+    @functools.wraps(handler_function)
+    def wrapper(event, context):
+        global _cold_start
+        if not _cold_start:
+            return handler_function(event, context)
+        
+        _cold_start = False
+        start = time.perf_counter()
+        try:
+            return handler_function(event, context)
+        finally:
+            report = {
+                'cold_start': True,
+                'handler': handler_function.__name__,
+                'first_request_ms': round((time.perf_counter() - start) * 1000, 2)
+            }
+            report.update(init_timings)
+            print(json.dumps(report))
+    return wrapper
+
+
+# Métricas da invocação em andamento (propagadas às threads com copy_context)
+_current_metrics = contextvars.ContextVar('current_metrics', default=None)
+
+# Operações do DynamoDB que aceitam ReturnConsumedCapacity, por tipo de capacidade
+DYNAMODB_READ_OPERATIONS = {'get_item', 'query', 'scan', 'batch_get_item'}
+DYNAMODB_WRITE_OPERATIONS = {'put_item', 'update_item', 'delete_item', 'batch_write_item', 'transact_write_items'}
+
+
+class InvocationMetrics:
+    """Acumula as métricas de uma invocação (várias threads podem registrar)"""
+    def __init__(self, handler_name):
+        self.handler = handler_name
+        self.stages = {}
+        self.consumed = {'ConsumedRCU': 0.0, 'ConsumedWCU': 0.0}
+        self.payload = {'RequestBytes': 0, 'ResponseBytes': 0, 'SnsBytes': 0}
+        self._lock = threading.Lock()
+    
+    def add_stage(self, stage, elapsed_ms):
+        with self._lock:
+            total, calls = self.stages.get(stage, (0.0, 0))
+            self.stages[stage] = (total + elapsed_ms, calls + 1)
+    
+    def add_capacity(self, operation, consumed):
+        """Soma o ConsumedCapacity (dict ou lista, no batch) da resposta"""
+        if not consumed:
+            return
+        entries = consumed if isinstance(consumed, list) else [consumed]
+        units = sum(entry.get('CapacityUnits', 0) for entry in entries)
+        key = 'ConsumedRCU' if operation in DYNAMODB_READ_OPERATIONS else 'ConsumedWCU'
+        with self._lock:
+            self.consumed[key] += units
+    
+    def add_payload(self, name, size):
+        with self._lock:
+            self.payload[name] += size
+    
+    def emf(self, duration_ms, status_code=None):
+        """Monta o registro no Embedded Metric Format do CloudWatch"""
+        record = {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': METRICS_NAMESPACE,
+                    'Dimensions': [['Handler']],
+                    'Metrics': []
+                }]
+            },
+            'Handler': self.handler,
+            'Duration': round(duration_ms, 3)
+        }
+        metrics = record['_aws']['CloudWatchMetrics'][0]['Metrics']
+        metrics.append({'Name': 'Duration', 'Unit': 'Milliseconds'})
+        
+        for name, value in list(self.consumed.items()) + list(self.payload.items()):
+            if value:
+                record[name] = round(value, 3) if isinstance(value, float) else value
+                metrics.append({'Name': name, 'Unit': 'Count' if name.startswith('Consumed') else 'Bytes'})
+        
+        for stage, (total, calls) in sorted(self.stages.items()):
+            record[f'{stage}.ms'] = round(total, 3)
+            record[f'{stage}.calls'] = calls
+            metrics.append({'Name': f'{stage}.ms', 'Unit': 'Milliseconds'})
+        
+        if status_code is not None:
+            record['StatusCode'] = status_code
+        return record
+
+
+@contextlib.contextmanager
+def measure(stage):
+    """Cronometra um trecho como etapa da invocação atual (sem custo se desligado)"""
+    metrics = _current_metrics.get()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_stage(stage, (time.perf_counter() - start) * 1000)
+
+
+def submit_with_context(executor, function, *args):
+    """executor.submit levando as métricas da invocação para a thread"""
+    return executor.submit(contextvars.copy_context().run, function, *args)
+
+
+class InstrumentedClient:
+    """
+    Envolve o Table/client do DynamoDB ou o client do SNS: cada chamada vira
+    uma etapa ('dynamodb.query', 'sns.publish_batch'...), as do DynamoDB pedem
+    ReturnConsumedCapacity=TOTAL e as do SNS contam os bytes publicados.
+    """
+    def __init__(self, target, service):
+        self._target = target
+        self._service = service
+    
+    def __getattr__(self, name):
+        attribute = getattr(self._target, name)
+        if name.startswith('_') or not callable(attribute):
+            return attribute
+        if name == 'batch_writer':
+            return self._batch_writer(attribute)
+        
+        stage = f'{self._service}.{name}'
+        
+        @functools.wraps(attribute)
+        def call(*args, **kwargs):
+            metrics = _current_metrics.get()
+            if metrics is None:
+                return attribute(*args, **kwargs)
+            if self._service == 'dynamodb' and name in DYNAMODB_READ_OPERATIONS | DYNAMODB_WRITE_OPERATIONS:
+                kwargs.setdefault('ReturnConsumedCapacity', 'TOTAL')
+            if self._service == 'sns':
+                messages = [kwargs.get('Message', '')] + [
+                    entry.get('Message', '') for entry in kwargs.get('PublishBatchRequestEntries', [])
+                ]
+                metrics.add_payload('SnsBytes', sum(len(message.encode('utf-8')) for message in messages))
+            
+            start = time.perf_counter()
+            try:
+                result = attribute(*args, **kwargs)
+            finally:
+                metrics.add_stage(stage, (time.perf_counter() - start) * 1000)
+            if isinstance(result, dict):
+                metrics.add_capacity(name, result.get('ConsumedCapacity'))
+            return result
+        return call
+    
+    def _batch_writer(self, batch_writer):
+        """O batch_writer grava ao sair do bloco: mede o bloco inteiro"""
+        @contextlib.contextmanager
+        def timed_batch_writer(*args, **kwargs):
+            with measure(f'{self._service}.batch_writer'):
+                with batch_writer(*args, **kwargs) as writer:
+                    yield writer
+        return timed_batch_writer
+
+
+def instrument(client, service):
+    """Aplica o InstrumentedClient quando METRICS_ENABLED"""
+    return InstrumentedClient(client, service) if METRICS_ENABLED else client
+
+
+def instrumented(handler_function):
+    """
+    Decorator dos handlers: com METRICS_ENABLED, registra as etapas da
+    invocação e imprime uma linha EMF ao final (coletável no CloudWatch ou
+    localmente com coletor_metricas.py)
+    """
+    @functools.wraps(handler_function)
+    def wrapper(event, context):
+        if not METRICS_ENABLED:
+            return handler_function(event, context)
+        
+        metrics = InvocationMetrics(handler_function.__name__)
+        body = event.get('body') if isinstance(event, dict) else None
+        if isinstance(body, str):
+            metrics.add_payload('RequestBytes', len(body))
+        
+        token = _current_metrics.set(metrics)
+        start = time.perf_counter()
+        result = None
+        try:
+            result = handler_function(event, context)
+            return result
+        finally:
+            _current_metrics.reset(token)
+            status_code = None
+            if isinstance(result, dict):
+                status_code = result.get('statusCode')
+                if isinstance(result.get('body'), str):
+                    metrics.add_payload('ResponseBytes', len(result['body']))
+            record = metrics.emf((time.perf_counter() - start) * 1000, status_code)
+            # Uma única escrita, para as linhas não se misturarem entre threads
+            sys.stdout.write(json.dumps(record) + '\n')
+            sys.stdout.flush()
+    return wrapper
+
+
+def get_memory_backend():
+    """Módulo do backend em memória, com a tabela de peças já criada"""
+    import memory_backend
+    memory_backend.ensure_table(TABLE_NAME, TABLE_INDEXES)
+    memory_backend.ensure_table(STATS_TABLE)
+    memory_backend.ensure_table(IDEMPOTENCY_TABLE)
+    memory_backend.ensure_table(SEARCH_TABLE, key='prefixo', range_key='chave')
+    return memory_backend
+
+
+def get_dynamodb():
+    """Resource do DynamoDB (usado nas escritas e leituras unitárias)"""
+    return _get_aws_client('dynamodb', lambda boto3: boto3.resource('dynamodb', **get_aws_config()))
+
+
+def get_table():
+    """Tabela de peças"""
+    if STORAGE_BACKEND == 'memory':
+        return instrument(get_memory_backend().get_table(TABLE_NAME), 'dynamodb')
+    dynamodb = get_dynamodb()
+    return _get_aws_client('table', lambda boto3: instrument(dynamodb.Table(TABLE_NAME), 'dynamodb'))
+
+
+def get_dynamodb_client():
+    """
+    Client de baixo nível para as leituras em massa (list/export/lookup):
+    devolve os atributos no formato do DynamoDB ({'N': '29.9'}), que são
+    convertidos direto para tipos JSON por deserialize_item, sem passar por Decimal
+    """
+    if STORAGE_BACKEND == 'memory':
+        return instrument(get_memory_backend().dynamodb_client, 'dynamodb')
+    return _get_aws_client(
+        'dynamodb_client',
+        lambda boto3: instrument(boto3.client('dynamodb', **get_aws_config()), 'dynamodb')
     )
-else:
-    print("☁️ Executando em AMBIENTE AWS REAL")
-    dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
-    sns_client = boto3.client('sns', region_name='us-east-1')
 
-table = dynamodb.Table(os.environ['DYNAMODB_TABLE'])
+
+def get_sns_client():
+    """Client do SNS"""
+    if STORAGE_BACKEND == 'memory':
+        return instrument(get_memory_backend().sns_client, 'sns')
+    return _get_aws_client('sns', lambda boto3: instrument(boto3.client('sns', **get_aws_config()), 'sns'))
+
+# Índice secundário global (GSI) para busca por código do fabricante
+CODIGO_INDEX = os.environ.get('CODIGO_INDEX', 'codigo-index')
+
+# GSI por fabricante, ordenado por preço (filtro de faixa de preço na própria Query)
+FABRICANTE_INDEX = os.environ.get('FABRICANTE_INDEX', 'fabricante-preco-index')
+
+# GSI esparso de estoque baixo: só as peças com quantidade <= LOW_STOCK_THRESHOLD
+# têm o atributo 'estoque_baixo', então o índice contém apenas elas
+LOW_STOCK_INDEX = os.environ.get('LOW_STOCK_INDEX', 'estoque-baixo-index')
+LOW_STOCK_THRESHOLD = int(os.environ.get('LOW_STOCK_THRESHOLD', '5'))
+LOW_STOCK_FLAG = '1'
+
+# GSIs da tabela (espelham o serverless.yml): {índice: (hash, range)}
+TABLE_INDEXES = {
+    CODIGO_INDEX: ('codigo', None),
+    FABRICANTE_INDEX: ('fabricante', 'preco'),
+    LOW_STOCK_INDEX: ('estoque_baixo', 'quantidade')
+}
+
+# Paginação do GET /items
+DEFAULT_PAGE_SIZE = int(os.environ.get('DEFAULT_PAGE_SIZE', '100'))
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', '1000'))
+# Um cursor tem no máximo a chave da tabela mais a do índice (hash e range)
+CURSOR_MAX_ATTRIBUTES = 4
+CURSOR_ATTRIBUTE_TYPES = ('S', 'N', 'B')
+
+# Scan paralelo (Segment/TotalSegments) para leituras completas da tabela
+SCAN_SEGMENTS = int(os.environ.get('SCAN_SEGMENTS', '4'))
+MAX_SCAN_SEGMENTS = int(os.environ.get('MAX_SCAN_SEGMENTS', '64'))
+
+# Exportação do catálogo (NDJSON/CSV)
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8'
+}
+EXPORT_FIELDS = [
+    'id', 'codigo', 'nome', 'fabricante', 'preco', 'quantidade',
+    'descricao', 'created_at', 'updated_at'
+]
+
+# Atributos que podem ser pedidos no parâmetro 'fields' (list e get)
+ITEM_FIELDS = EXPORT_FIELDS + ['version']
+
+# Compressão das respostas (negociada pelo Accept-Encoding)
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', '1024'))
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', '5'))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', '4'))
+
+# Busca textual (GET /items/search): índice invertido na tabela -search, mantido
+# pelo stats_aggregator a partir do DynamoDB Stream. Cada entrada é
+# (prefixo = 2 primeiras letras do termo, chave = 'termo#id'), então um termo
+# buscado por prefixo é uma Query na partição do prefixo com begins_with.
+# Termos de uma letra ficam na partição de mesmo nome e só casam inteiros.
+SEARCH_TABLE = os.environ.get('SEARCH_TABLE', f'{TABLE_NAME}-search')
+SEARCH_PREFIX_LENGTH = 2
+# Termos distintos por consulta (cada um é uma Query em paralelo)
+MAX_SEARCH_TERMS = int(os.environ.get('MAX_SEARCH_TERMS', '8'))
+# Entradas lidas por termo; um termo mais genérico que isso não restringe os candidatos
+SEARCH_MAX_POSTINGS = int(os.environ.get('SEARCH_MAX_POSTINGS', '5000'))
+MAX_SEARCH_RESULTS = int(os.environ.get('MAX_SEARCH_RESULTS', '100'))
+# Peso de cada campo no ranking; o texto vem de todos, o resultado só dos listados
+SEARCH_WEIGHTS = {'nome': 3, 'codigo': 2, 'fabricante': 2, 'descricao': 1}
+SEARCH_RESULT_FIELDS = ['id', 'codigo', 'nome', 'fabricante', 'preco', 'quantidade']
+
+# Cache local (por container) do GET /items/{id}; 0 desativa
+ITEM_CACHE_SIZE = int(os.environ.get('ITEM_CACHE_SIZE', '0'))
+ITEM_CACHE_TTL = float(os.environ.get('ITEM_CACHE_TTL', '30'))
+
+# Criação em lote (POST /items/batch)
+MAX_BATCH_ITEMS = int(os.environ.get('MAX_BATCH_ITEMS', '1000'))
+SNS_BATCH_SIZE = 10  # limite do PublishBatch
+BATCH_QUERY_WORKERS = int(os.environ.get('BATCH_QUERY_WORKERS', '16'))
+
+# Busca em lote (POST /items/lookup)
+BATCH_GET_SIZE = 100  # limite do BatchGetItem
+BATCH_GET_MAX_RETRIES = int(os.environ.get('BATCH_GET_MAX_RETRIES', '5'))
+BATCH_GET_BACKOFF = float(os.environ.get('BATCH_GET_BACKOFF', '0.05'))
+
+# Limite do BatchWriteItem (exclusão em lote); os reenvios seguem BATCH_GET_MAX_RETRIES/BACKOFF
+BATCH_WRITE_SIZE = 25
+
+# Agregados do inventário (GET /items/stats): um único registro em uma tabela
+# separada, atualizado com ADD a partir do DynamoDB Stream da tabela de peças
+STATS_TABLE = os.environ.get('STATS_TABLE', f'{TABLE_NAME}-stats')
+STATS_ID = 'inventario'
+# Contador de alterações da tabela (ETag das listagens), no mesmo lugar
+CHANGE_COUNTER_ID = 'alteracoes'
+STATS_FABRICANTE_PREFIX = 'fabricante:'
+# Fabricantes por UpdateItem: mantém a UpdateExpression abaixo do limite de 4 KB
+STATS_FABRICANTES_PER_UPDATE = 200
+
+# Registros de idempotência do POST /items (header Idempotency-Key), com TTL
+# no atributo expires_at
+IDEMPOTENCY_TABLE = os.environ.get('IDEMPOTENCY_TABLE', f'{TABLE_NAME}-idempotency')
+IDEMPOTENCY_TTL = int(os.environ.get('IDEMPOTENCY_TTL', '86400'))
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
 
 
 class DecimalEncoder(json.JSONEncoder):
     """Helper para serializar Decimal do DynamoDB"""
     def default(self, obj):
         if isinstance(obj, Decimal):
+            if obj == obj.to_integral_value():
+                return int(obj)
             return float(obj)
         return super(DecimalEncoder, self).default(obj)
 
 
-def response(status_code, body):
-    """Helper para formatar respostas HTTP"""
+def parse_number(value):
+    """Converte um número do DynamoDB (string) em int ou float"""
+    if '.' in value or 'e' in value or 'E' in value:
+        return float(value)
+    return int(value)
+
+
+def deserialize_value(attribute):
+    """Converte um atributo no formato do DynamoDB em um valor serializável em JSON"""
+    (attribute_type, value), = attribute.items()
+    if attribute_type == 'S' or attribute_type == 'BOOL':
+        return value
+    if attribute_type == 'N':
+        return parse_number(value)
+    if attribute_type == 'M':
+        return deserialize_item(value)
+    if attribute_type == 'L':
+        return [deserialize_value(element) for element in value]
+    if attribute_type == 'NULL':
+        return None
+    if attribute_type == 'SS':
+        return list(value)
+    if attribute_type == 'NS':
+        return [parse_number(element) for element in value]
+    if attribute_type == 'B':
+        return base64.b64encode(value).decode('ascii')
+    if attribute_type == 'BS':
+        return [base64.b64encode(element).decode('ascii') for element in value]
+    raise ValueError(f"Tipo DynamoDB não suportado: {attribute_type}")
+
+
+def serialize_value(value):
+    """Converte um valor Python no formato de atributo do DynamoDB (inverso de deserialize_value)"""
+    if isinstance(value, bool):
+        return {'BOOL': value}
+    if isinstance(value, (int, float, Decimal)):
+        return {'N': str(value)}
+    if isinstance(value, str):
+        return {'S': value}
+    if value is None:
+        return {'NULL': True}
+    if isinstance(value, dict):
+        return {'M': serialize_item(value)}
+    if isinstance(value, (list, tuple)):
+        return {'L': [serialize_value(element) for element in value]}
+    raise ValueError(f"Tipo não suportado pelo DynamoDB: {type(value).__name__}")
+
+
+def serialize_item(item):
+    """Converte um item Python no formato do client de baixo nível"""
+    return {key: serialize_value(value) for key, value in item.items()}
+
+
+def deserialize_item(image):
+    """
+    Converte um item no formato do DynamoDB em dict pronto para json.dumps.
+    Equivale ao TypeDeserializer do boto3, mas entrega int/float em vez de
+    Decimal, o que evita o DecimalEncoder e é bem mais rápido em listas grandes.
+    """
+    item = {}
+    for key, attribute in image.items():
+        if 'S' in attribute:
+            item[key] = attribute['S']
+        elif 'N' in attribute:
+            item[key] = parse_number(attribute['N'])
+        else:
+            item[key] = deserialize_value(attribute)
+    return item
+
+
+class ItemCache:
+    """
+    Cache LRU com TTL para peças, mantido na memória do container Lambda
+    do getItem. As escritas rodam em outras funções (outros containers) e
+    não chegam a este cache, então cada HIT é revalidado pela versão da peça
+    (ver get_item); o TTL só limita por quanto tempo uma peça fica guardada.
+    """
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @property
+    def enabled(self):
+        return self.max_size > 0
+    
+    def get(self, item_id):
+        """Retorna a peça em cache ou None (conta hit/miss)"""
+        with self._lock:
+            entry = self._items.get(item_id)
+            if entry is not None and entry[0] > time.monotonic():
+                self._items.move_to_end(item_id)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._items[item_id]
+            self.misses += 1
+            return None
+    
+    def put(self, item):
+        """Guarda a peça, descartando a menos usada se o cache estiver cheio"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._items[item['id']] = (time.monotonic() + self.ttl, item)
+            self._items.move_to_end(item['id'])
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+    
+    def invalidate(self, item_id):
+        """Remove a peça do cache"""
+        with self._lock:
+            self._items.pop(item_id, None)
+    
+    def stale(self, item_id):
+        """Descarta uma peça que a revalidação mostrou desatualizada (o HIT vira MISS)"""
+        with self._lock:
+            self._items.pop(item_id, None)
+            self.hits -= 1
+            self.misses += 1
+    
+    def stats(self):
+        """Contadores para dimensionar o cache"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._items),
+                'max_size': self.max_size
+            }
+
+
+item_cache = ItemCache(ITEM_CACHE_SIZE, ITEM_CACHE_TTL)
+
+
+def search_tokens(text):
+    """
+    Quebra o texto em termos de busca: minúsculas, sem acentos
+    ('Pastilha de Freio Dianteira' -> ['pastilha', 'de', 'freio', 'dianteira'])
+    """
+    folded = unicodedata.normalize('NFKD', str(text or '')).lower()
+    folded = ''.join(char for char in folded if not unicodedata.combining(char))
+    return re.findall(r'[a-z0-9]+', folded)
+
+
+def search_terms(item):
+    """
+    Termos de busca de uma peça com o peso do campo mais importante em que
+    aparecem ({'pastilha': 3, 'bosch': 2, ...})
+    """
+    terms = {}
+    for field, weight in SEARCH_WEIGHTS.items():
+        for term in search_tokens(item.get(field)):
+            terms[term] = max(terms.get(term, 0), weight)
+    return terms
+
+
+def term_matches(token, term):
+    """Um termo da consulta casa por prefixo; mais curto que o prefixo do índice, só inteiro"""
+    return token == term or (len(term) >= SEARCH_PREFIX_LENGTH and token.startswith(term))
+
+
+def search_score(item, terms):
+    """
+    Relevância de uma peça para os termos da consulta: soma, por termo, o
+    peso do melhor campo que o contém (termo completo vale o dobro de um
+    prefixo). 0 se algum termo não aparece na peça.
+    """
+    item_terms = search_terms(item)
+    total = 0
+    for term in terms:
+        best = max(
+            (weight * (2 if token == term else 1) for token, weight in item_terms.items() if term_matches(token, term)),
+            default=0
+        )
+        if not best:
+            return 0
+        total += best
+    return total
+
+
+def search_postings(item):
+    """Entradas da peça no índice de busca: {(prefixo, chave): peso}"""
+    return {
+        (term[:SEARCH_PREFIX_LENGTH], f"{term}#{item['id']}"): weight
+        for term, weight in search_terms(item).items()
+    }
+
+
+def raw_response(status_code, body, content_type, headers=None):
+    """Helper para respostas HTTP com corpo já serializado"""
+    response_headers = {
+        'Content-Type': content_type,
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Credentials': True,
+        'Access-Control-Expose-Headers': 'ETag, X-Next-Cursor, Idempotent-Replayed'
+    }
+    if headers:
+        response_headers.update(headers)
     return {
         'statusCode': status_code,
-        'headers': {
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Credentials': True
-        },
-        'body': json.dumps(body, cls=DecimalEncoder)
+        'headers': response_headers,
+        'body': body
     }
 
 
-def validate_peca_data(data, is_update=False):
+def response(status_code, body, headers=None):
+    """Helper para formatar respostas HTTP"""
+    with measure('json.encode'):
+        serialized = json.dumps(body, cls=DecimalEncoder)
+    return raw_response(status_code, serialized, 'application/json', headers)
+
+
+def brotli_module():
+    """Módulo brotli, se instalado (dependência opcional)"""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def parse_accept_encoding(value):
+    """
+    Converte o header Accept-Encoding em {codificação: q}
+    ('gzip, br;q=0.8' -> {'gzip': 1.0, 'br': 0.8})
+    """
+    encodings = {}
+    for part in (value or '').split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        encodings[name] = quality
+    return encodings
+
+
+def choose_encoding(accept_encoding):
+    """Escolhe 'br' ou 'gzip' conforme o cliente aceita (None = sem compressão)"""
+    encodings = parse_accept_encoding(accept_encoding)
+    candidates = ['br', 'gzip'] if brotli_module() else ['gzip']
+    best = None
+    for name in candidates:
+        quality = encodings.get(name, encodings.get('*', 0))
+        if quality > 0 and (best is None or quality > best[1]):
+            best = (name, quality)
+    return best[0] if best else None
+
+
+def compress_body(body, encoding):
+    """Comprime o corpo (str ou bytes) com a codificação escolhida"""
+    data = body.encode('utf-8') if isinstance(body, str) else body
+    if encoding == 'br':
+        return brotli_module().compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compress_response(result, accept_encoding):
+    """
+    Comprime a resposta de um handler se o cliente aceitar e o corpo passar
+    de COMPRESSION_MIN_BYTES. O corpo vai em base64 (isBase64Encoded), como o
+    API Gateway espera para respostas binárias.
+    """
+    body = result.get('body')
+    headers = result.setdefault('headers', {})
+    if not isinstance(body, str) or result.get('isBase64Encoded') or 'Content-Encoding' in headers:
+        return result
+    if len(body) < COMPRESSION_MIN_BYTES:
+        return result
+    
+    headers['Vary'] = 'Accept-Encoding'
+    encoding = choose_encoding(accept_encoding)
+    if encoding is None:
+        return result
+    
+    with measure('compression'):
+        compressed = compress_body(body, encoding)
+    headers['Content-Encoding'] = encoding
+    result['body'] = base64.b64encode(compressed).decode('ascii')
+    result['isBase64Encoded'] = True
+    return result
+
+
+def negotiate_compression(handler_function):
+    """Decorator dos handlers HTTP: aplica compress_response à resposta"""
+    @functools.wraps(handler_function)
+    def wrapper(event, context):
+        result = handler_function(event, context)
+        return compress_response(result, get_header(event, 'Accept-Encoding'))
+    return wrapper
+
+
+def get_header(event, name):
+    """Retorna um header da requisição (sem diferenciar maiúsculas/minúsculas)"""
+    name = name.lower()
+    for key, value in (event.get('headers') or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def make_etag(version, fields=None):
+    """
+    Gera o ETag de uma peça a partir do atributo 'version'.
+    Com 'fields' a representação é outra, então o ETag inclui os campos
+    ('"3+id+nome"'); o If-Match continua aceitando esse valor.
+    """
+    if fields:
+        return f'"{version}+{"+".join(fields)}"'
+    return f'"{version}"'
+
+
+def parse_if_match(value):
+    """
+    Converte o header If-Match na versão esperada da peça.
+    Retorna None quando o header não foi enviado ou é '*' (qualquer versão).
+    Lança ValueError se o valor não for uma versão válida.
+    """
+    if value is None or value.strip() == '*':
+        return None
+    value = value.strip()
+    if value.startswith('W/'):
+        value = value[2:]
+    try:
+        return int(value.strip('"').split('+')[0])
+    except ValueError:
+        raise ValueError("Header If-Match inválido")
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Verifica o header If-None-Match contra o ETag atual
+    (lista separada por vírgulas, '*' ou ETags fracos W/"...")
+    """
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    # Comparação fraca (RFC 9110): o prefixo W/ é ignorado dos dois lados
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return any((tag[2:] if tag.startswith('W/') else tag) == opaque for tag in candidates)
+
+
+def conditional_get_response(event, body, headers=None):
+    """
+    Resposta de um GET com ETag: 304 sem corpo se o cliente já tem essa
+    versão (If-None-Match), senão 200 com o corpo
+    """
+    etag = (headers or {}).get('ETag')
+    if etag_matches(get_header(event, 'If-None-Match'), etag):
+        return raw_response(304, '', 'application/json', headers)
+    return response(200, body, headers)
+
+
+def item_headers(item, fields=None):
+    """Headers de resposta de uma peça (ETag com a versão atual)"""
+    if item.get('version') is None:
+        return None
+    return {'ETag': make_etag(item['version'], fields)}
+
+
+def cache_headers(item, status, fields=None):
+    """Headers de uma peça servida pelo GET com o cache ativo"""
+    stats = item_cache.stats()
+    headers = item_headers(item, fields) or {}
+    headers['X-Cache'] = status
+    headers['X-Cache-Stats'] = f"hits={stats['hits']}; misses={stats['misses']}; size={stats['size']}"
+    return headers
+
+
+def conditional_check_failed(error):
+    """
+    Trata a falha de uma escrita condicional.
+    Retorna a peça atual (ReturnValuesOnConditionCheckFailure=ALL_OLD) ou
+    None se ela não existe. Relança qualquer outro erro do DynamoDB.
+    """
+    if error.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+        raise error
+    old_item = error.response.get('Item')
+    if not old_item:
+        return None
+    return deserialize_item(old_item)
+
+
+def version_conflict_response(current_item):
+    """Resposta 409 quando o If-Match não corresponde à versão atual"""
+    return response(409, {
+        'error': 'A peça foi modificada por outra requisição',
+        'current_version': current_item.get('version')
+    }, item_headers(current_item))
+
+
+def timed(stage):
+    """Decorator: mede cada chamada da função como uma etapa da invocação"""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with measure(stage):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@timed('validation')
+def validate_peca_data(data, is_update=False):
+    """
+    Valida os dados de uma peça automotiva.
+    Campos obrigatórios: nome, codigo, preco, quantidade
+    """
+    required_fields = ['nome', 'codigo', 'preco', 'quantidade']
+    
+    if not is_update:
+        missing_fields = [field for field in required_fields if field not in data]
+        if missing_fields:
+            return False, f"Campos obrigatórios faltando: {', '.join(missing_fields)}"
+    
+    # Validar tipos de dados quando presentes
+    if 'preco' in data:
+        try:
+            preco = float(data['preco'])
+            if preco < 0:
+                return False, "Preço não pode ser negativo"
+        except (ValueError, TypeError):
+            return False, "Preço deve ser um número válido"
+    
+    if 'quantidade' in data:
+        try:
+            quantidade = int(data['quantidade'])
+            if quantidade < 0:
+                return False, "Quantidade não pode ser negativa"
+        except (ValueError, TypeError):
+            return False, "Quantidade deve ser um número inteiro"
+    
+    return True, None
+
+
+def get_query_params(event):
+    """Retorna os query string parameters do evento (nunca None)"""
+    return event.get('queryStringParameters') or {}
+
+
+def parse_limit(value):
+    """
+    Converte o parâmetro 'limit' em inteiro entre 1 e MAX_PAGE_SIZE.
+    Retorna (limit, mensagem_de_erro).
+    """
+    if value is None or value == '':
+        return DEFAULT_PAGE_SIZE, None
+    try:
+        limit = int(value)
+    except (ValueError, TypeError):
+        return None, "Parâmetro 'limit' deve ser um número inteiro"
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        return None, f"Parâmetro 'limit' deve estar entre 1 e {MAX_PAGE_SIZE}"
+    return limit, None
+
+
+def parse_segments(value):
+    """
+    Converte o parâmetro 'segments' em inteiro entre 1 e MAX_SCAN_SEGMENTS.
+    Retorna (segments, mensagem_de_erro).
+    """
+    if value is None or value == '':
+        return SCAN_SEGMENTS, None
+    try:
+        segments = int(value)
+    except (ValueError, TypeError):
+        return None, "Parâmetro 'segments' deve ser um número inteiro"
+    if segments < 1 or segments > MAX_SCAN_SEGMENTS:
+        return None, f"Parâmetro 'segments' deve estar entre 1 e {MAX_SCAN_SEGMENTS}"
+    return segments, None
+
+
+def parse_fields(value):
+    """
+    Converte o parâmetro 'fields' (ex.: 'nome,preco,quantidade') na lista de
+    atributos a retornar; 'id' sempre vem. Retorna (fields, mensagem_de_erro),
+    com fields=None quando todos os atributos devem ser retornados.
+    """
+    if value is None or value.strip() == '':
+        return None, None
+    fields = ['id']
+    for field in value.split(','):
+        field = field.strip()
+        if not field:
+            continue
+        if field not in ITEM_FIELDS:
+            return None, f"Campo inválido em 'fields': {field}. Use: {', '.join(ITEM_FIELDS)}"
+        if field not in fields:
+            fields.append(field)
+    return fields, None
+
+
+def projection_kwargs(fields):
+    """
+    Monta ProjectionExpression/ExpressionAttributeNames para os campos pedidos.
+    Todos os nomes passam por placeholders (#nome), assim palavras reservadas
+    do DynamoDB como 'nome' e 'version' não quebram a expressão.
+    """
+    if not fields:
+        return {}
+    return {
+        'ProjectionExpression': ', '.join(f'#{field}' for field in fields),
+        'ExpressionAttributeNames': {f'#{field}': field for field in fields}
+    }
+
+
+def select_fields(item, fields):
+    """Aplica o parâmetro 'fields' a uma peça já lida (ex.: vinda do cache)"""
+    if not fields:
+        return item
+    return {field: item[field] for field in fields if field in item}
+
+
+def parse_filters(params):
+    """
+    Lê os filtros do GET /items: fabricante, preco_min, preco_max e
+    estoque_baixo=true. Retorna (filtros, mensagem_de_erro).
+    """
+    filters = {}
+    if params.get('fabricante'):
+        filters['fabricante'] = params['fabricante']
+    
+    for name in ('preco_min', 'preco_max'):
+        value = params.get(name)
+        if value is None or value == '':
+            continue
+        try:
+            number = float(value)
+        except (ValueError, TypeError):
+            return None, f"Parâmetro '{name}' deve ser um número"
+        if number != number or number in (float('inf'), float('-inf')) or number < 0:
+            return None, f"Parâmetro '{name}' deve ser um número não negativo"
+        filters[name] = number
+    
+    if 'preco_min' in filters and 'preco_max' in filters and filters['preco_min'] > filters['preco_max']:
+        return None, "Parâmetro 'preco_min' não pode ser maior que 'preco_max'"
+    
+    if params.get('estoque_baixo') == 'true':
+        filters['estoque_baixo'] = True
+    
+    return filters, None
+
+
+def build_filtered_request(filters):
+    """
+    Escolhe como atender os filtros com o menor custo:
+      - estoque_baixo: Query no GSI esparso de estoque baixo
+      - fabricante: Query no GSI fabricante/preço, com a faixa de preço
+        na KeyConditionExpression
+      - só faixa de preço: Scan com FilterExpression (nenhum índice serve)
+    Filtros que não cabem na chave do índice escolhido viram FilterExpression.
+    Retorna (operação 'query' ou 'scan', kwargs para o client de baixo nível).
+    """
+    names = {}
+    values = {}
+    key_conditions = []
+    filter_conditions = []
+    
+    price_condition = None
+    if 'preco_min' in filters:
+        values[':preco_min'] = {'N': repr(filters['preco_min'])}
+    if 'preco_max' in filters:
+        values[':preco_max'] = {'N': repr(filters['preco_max'])}
+    if 'preco_min' in filters and 'preco_max' in filters:
+        price_condition = '#preco BETWEEN :preco_min AND :preco_max'
+    elif 'preco_min' in filters:
+        price_condition = '#preco >= :preco_min'
+    elif 'preco_max' in filters:
+        price_condition = '#preco <= :preco_max'
+    if price_condition:
+        names['#preco'] = 'preco'
+    
+    if 'fabricante' in filters:
+        names['#fabricante'] = 'fabricante'
+        values[':fabricante'] = {'S': filters['fabricante']}
+    
+    request = {'TableName': TABLE_NAME}
+    if filters.get('estoque_baixo'):
+        names['#estoque_baixo'] = 'estoque_baixo'
+        values[':estoque_baixo'] = {'S': LOW_STOCK_FLAG}
+        request['IndexName'] = LOW_STOCK_INDEX
+        key_conditions.append('#estoque_baixo = :estoque_baixo')
+        if 'fabricante' in filters:
+            filter_conditions.append('#fabricante = :fabricante')
+        if price_condition:
+            filter_conditions.append(price_condition)
+    elif 'fabricante' in filters:
+        request['IndexName'] = FABRICANTE_INDEX
+        key_conditions.append('#fabricante = :fabricante')
+        if price_condition:
+            key_conditions.append(price_condition)
+    elif price_condition:
+        filter_conditions.append(price_condition)
+    
+    if key_conditions:
+        request['KeyConditionExpression'] = ' AND '.join(key_conditions)
+    if filter_conditions:
+        request['FilterExpression'] = ' AND '.join(filter_conditions)
+    request['ExpressionAttributeNames'] = names
+    request['ExpressionAttributeValues'] = values
+    
+    return ('query' if key_conditions else 'scan'), request
+
+
+def low_stock_flag(quantidade):
+    """Valor do atributo esparso 'estoque_baixo' (None = sem o atributo)"""
+    return LOW_STOCK_FLAG if quantidade <= LOW_STOCK_THRESHOLD else None
+
+
+def encode_cursor(last_evaluated_key):
+    """
+    Transforma o LastEvaluatedKey do DynamoDB (formato do client de baixo
+    nível, ex.: {'id': {'S': '...'}}) em um cursor opaco
+    """
+    if not last_evaluated_key:
+        return None
+    raw = json.dumps(last_evaluated_key, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Converte o cursor recebido de volta em ExclusiveStartKey.
+    Lança ValueError se o cursor for inválido.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError, binascii.Error):
+        raise ValueError("Cursor inválido")
+    # Chaves do DynamoDB só têm atributos S, N ou B e sempre incluem o 'id'
+    # da tabela: {"id": {"S": "..."}}
+    if not isinstance(key, dict) or 'id' not in key or len(key) > CURSOR_MAX_ATTRIBUTES:
+        raise ValueError("Cursor inválido")
+    for value in key.values():
+        if (not isinstance(value, dict) or len(value) != 1
+                or next(iter(value)) not in CURSOR_ATTRIBUTE_TYPES
+                or not isinstance(next(iter(value.values())), str)):
+            raise ValueError("Cursor inválido")
+    return key
+
+
+def invalid_start_key(error):
+    """
+    True se o DynamoDB rejeitou o ExclusiveStartKey (cursor bem formado,
+    mas que não corresponde à chave da tabela ou do índice consultado).
+    """
+    return (isinstance(error, ClientError)
+            and error.response.get('Error', {}).get('Code') == 'ValidationException'
+            and 'start' in error.response.get('Error', {}).get('Message', '').lower())
+
+
+def scan_segment(segment, total_segments, **scan_kwargs):
+    """
+    Gera as páginas (listas de itens) de um segmento do Scan,
+    seguindo o LastEvaluatedKey até o fim do segmento.
+    Usa o client de baixo nível, que (ao contrário do resource) é thread-safe.
+    """
+    client = get_dynamodb_client()
+    kwargs = dict(scan_kwargs, TableName=TABLE_NAME)
+    if total_segments > 1:
+        kwargs['Segment'] = segment
+        kwargs['TotalSegments'] = total_segments
+    
+    while True:
+        result = client.scan(**kwargs)
+        yield [deserialize_item(item) for item in result.get('Items', [])]
+        
+        last_key = result.get('LastEvaluatedKey')
+        if not last_key:
+            return
+        kwargs['ExclusiveStartKey'] = last_key
+
+
+_SCAN_DONE = object()
+
+
+def parallel_scan(total_segments=None, ordered=False, **scan_kwargs):
+    """
+    Lê a tabela inteira dividindo o Scan em segmentos processados em paralelo.
+    Gera páginas (listas de itens) à medida que chegam; com ordered=True as
+    páginas são entregues na ordem dos segmentos (0, 1, 2...).
+    """
+    total_segments = total_segments or SCAN_SEGMENTS
+    if total_segments <= 1:
+        yield from scan_segment(0, 1, **scan_kwargs)
+        return
+    
+    stop = threading.Event()
+    if ordered:
+        # Cada segmento tem sua fila para que a ordem possa ser preservada
+        queues = [queue.Queue() for _ in range(total_segments)]
+    else:
+        # Fila compartilhada e limitada: os workers esperam o consumidor
+        shared = queue.Queue(maxsize=total_segments * 2)
+        queues = [shared] * total_segments
+    
+    def put(segment, payload):
+        while not stop.is_set():
+            try:
+                queues[segment].put(payload, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def worker(segment):
+        try:
+            for page in scan_segment(segment, total_segments, **scan_kwargs):
+                if not put(segment, page):
+                    return
+        except Exception as e:
+            put(segment, e)
+        finally:
+            put(segment, _SCAN_DONE)
+    
+    executor = ThreadPoolExecutor(max_workers=total_segments)
+    try:
+        for segment in range(total_segments):
+            submit_with_context(executor, worker, segment)
+        
+        pending = total_segments
+        segment = 0
+        while pending:
+            payload = queues[segment].get()
+            if payload is _SCAN_DONE:
+                pending -= 1
+                if ordered:
+                    segment += 1
+            elif isinstance(payload, Exception):
+                raise payload
+            else:
+                yield payload
+    finally:
+        stop.set()
+        executor.shutdown(wait=True)
+
+
+def export_lines(items, fmt, include_header=True):
+    """
+    Converte itens em linhas de texto NDJSON ou CSV, um item por vez,
+    sem montar o documento inteiro em memória.
+    """
+    if fmt == 'ndjson':
+        for item in items:
+            yield json.dumps(item, cls=DecimalEncoder, ensure_ascii=False) + '\n'
+        return
+    
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, extrasaction='ignore')
+    
+    def flush():
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return line
+    
+    if include_header:
+        writer.writeheader()
+        yield flush()
+    for item in items:
+        writer.writerow(item)
+        yield flush()
+
+
+def build_sns_message(operation, item_data):
+    """Monta o corpo da mensagem SNS de uma operação"""
+    message = {
+        'operation': operation,
+        'timestamp': datetime.now().isoformat(),
+        'item': item_data
+    }
+    return json.dumps(message, cls=DecimalEncoder)
+
+
+def find_by_codigo(codigo, fields=None):
+    """
+    Busca as peças com um determinado código usando o GSI de 'codigo'.
+    Usa o client de baixo nível (thread-safe) para poder rodar em paralelo.
+    Com fields, retorna só esses atributos (ProjectionExpression).
+    """
+    query_kwargs = {
+        'TableName': TABLE_NAME,
+        'IndexName': CODIGO_INDEX,
+        'KeyConditionExpression': 'codigo = :codigo',
+        'ExpressionAttributeValues': {':codigo': {'S': codigo}},
+        **projection_kwargs(fields)
+    }
+    client = get_dynamodb_client()
+    items = []
+    while True:
+        result = client.query(**query_kwargs)
+        items.extend(deserialize_item(item) for item in result.get('Items', []))
+        
+        last_key = result.get('LastEvaluatedKey')
+        if not last_key:
+            return items
+        query_kwargs['ExclusiveStartKey'] = last_key
+
+
+def query_search_term(term):
+    """
+    Lê as entradas do índice cujos termos começam por 'term' (Query na
+    partição do prefixo). Retorna ({id: peso}, entradas_lidas, completo);
+    completo é False quando a leitura parou em SEARCH_MAX_POSTINGS.
+    """
+    query_kwargs = {
+        'TableName': SEARCH_TABLE,
+        'KeyConditionExpression': 'prefixo = :prefixo AND begins_with(chave, :termo)',
+        'ExpressionAttributeValues': {
+            ':prefixo': {'S': term[:SEARCH_PREFIX_LENGTH]},
+            ':termo': {'S': term if len(term) >= SEARCH_PREFIX_LENGTH else f'{term}#'}
+        }
+    }
+    client = get_dynamodb_client()
+    scores = {}
+    read = 0
+    while True:
+        result = client.query(**query_kwargs)
+        for entry in result.get('Items', []):
+            token, _, item_id = entry['chave']['S'].rpartition('#')
+            weight = int(entry['peso']['N']) * (2 if token == term else 1)
+            scores[item_id] = max(scores.get(item_id, 0), weight)
+            read += 1
+            if read >= SEARCH_MAX_POSTINGS:
+                return scores, read, False
+        
+        last_key = result.get('LastEvaluatedKey')
+        if not last_key:
+            return scores, read, True
+        query_kwargs['ExclusiveStartKey'] = last_key
+
+
+def search_catalog(query, limit):
+    """
+    Busca no índice da tabela -search: uma Query por termo (em paralelo),
+    interseção dos IDs e leitura das peças mais relevantes com BatchGetItem.
+    As peças lidas são conferidas e pontuadas de novo, então entradas
+    atrasadas do índice (peça alterada ou removida) não aparecem no resultado.
+    Retorna (peças, estatísticas da consulta).
+    """
+    terms = list(dict.fromkeys(search_tokens(query)))
+    with ThreadPoolExecutor(max_workers=min(len(terms), MAX_SEARCH_TERMS)) as executor:
+        futures = [submit_with_context(executor, query_search_term, term) for term in terms]
+        results = [future.result() for future in futures]
+    
+    # Termos genéricos demais (leitura truncada) não restringem os candidatos:
+    # são conferidos nas peças lidas
+    restricting = [scores for scores, _, complete in results if complete] or [scores for scores, _, _ in results]
+    candidates = restricting[0]
+    for scores in restricting[1:]:
+        candidates = {
+            item_id: score + scores[item_id]
+            for item_id, score in candidates.items() if item_id in scores
+        }
+    
+    top_ids = [
+        item_id for item_id, _ in
+        sorted(candidates.items(), key=lambda entry: (-entry[1], entry[0]))[:MAX_SEARCH_RESULTS]
+    ]
+    found, _ = batch_get_items(top_ids)
+    
+    items = []
+    for item_id in top_ids:
+        item = found.get(item_id)
+        score = search_score(item, terms) if item else 0
+        if score:
+            items.append(dict(select_fields(item, SEARCH_RESULT_FIELDS), score=score))
+    items.sort(key=lambda item: (-item['score'], item.get('nome', '')))
+    
+    return items[:limit], {
+        'terms': len(terms),
+        'postings_read': sum(read for _, read, _ in results),
+        'candidates': len(candidates)
+    }
+
+
+def codigo_in_use(codigo, ignore_id=None):
+    """
+    Verifica se o código já pertence a outra peça.
+    O GSI é eventualmente consistente: escritas concorrentes com o mesmo
+    código ainda podem passar, mas duplicatas comuns são barradas sem Scan.
+    """
+    return any(item['id'] != ignore_id for item in find_by_codigo(codigo))
+
+
+def batch_get_items(item_ids):
+    """
+    Busca itens por ID com BatchGetItem em lotes de 100, reenviando as
+    UnprocessedKeys com backoff exponencial.
+    Retorna (itens_por_id, ids_nao_processados).
+    """
+    client = get_dynamodb_client()
+    found = {}
+    unprocessed = []
+    
+    for start in range(0, len(item_ids), BATCH_GET_SIZE):
+        request_items = {
+            TABLE_NAME: {'Keys': [{'id': {'S': item_id}} for item_id in item_ids[start:start + BATCH_GET_SIZE]]}
+        }
+        attempt = 0
+        while request_items:
+            result = client.batch_get_item(RequestItems=request_items)
+            for item in result.get('Responses', {}).get(TABLE_NAME, []):
+                found[item['id']['S']] = deserialize_item(item)
+            
+            request_items = result.get('UnprocessedKeys') or {}
+            if not request_items:
+                break
+            if attempt >= BATCH_GET_MAX_RETRIES:
+                unprocessed.extend(key['id']['S'] for key in request_items[TABLE_NAME]['Keys'])
+                break
+            time.sleep(BATCH_GET_BACKOFF * (2 ** attempt))
+            attempt += 1
+    
+    return found, unprocessed
+
+
+def batch_write_chunk(table_name, requests):
+    """
+    Grava até 25 PutRequest/DeleteRequest com um BatchWriteItem, reenviando
+    os UnprocessedItems com backoff exponencial. Retorna as requisições que
+    não puderam ser gravadas.
+    """
+    client = get_dynamodb_client()
+    request_items = {table_name: requests}
+    attempt = 0
+    while True:
+        result = client.batch_write_item(RequestItems=request_items)
+        request_items = result.get('UnprocessedItems') or {}
+        if not request_items:
+            return []
+        if attempt >= BATCH_GET_MAX_RETRIES:
+            return request_items[table_name]
+        time.sleep(BATCH_GET_BACKOFF * (2 ** attempt))
+        attempt += 1
+
+
+def batch_write_requests(table_name, requests):
+    """
+    Grava requisições de BatchWriteItem em lotes de 25 enviados em paralelo.
+    Retorna as não gravadas (UnprocessedItems após os reenvios).
+    """
+    chunks = [requests[start:start + BATCH_WRITE_SIZE] for start in range(0, len(requests), BATCH_WRITE_SIZE)]
+    if not chunks:
+        return []
+    with ThreadPoolExecutor(max_workers=min(len(chunks), BATCH_QUERY_WORKERS)) as executor:
+        futures = [submit_with_context(executor, batch_write_chunk, table_name, chunk) for chunk in chunks]
+        return [request for future in futures for request in future.result()]
+
+
+def batch_delete_items(item_ids):
+    """
+    Remove itens por ID em lotes de 25 gravados em paralelo.
+    Retorna os IDs não removidos (UnprocessedItems após os reenvios).
+    """
+    requests = [{'DeleteRequest': {'Key': {'id': {'S': item_id}}}} for item_id in item_ids]
+    return [
+        request['DeleteRequest']['Key']['id']['S']
+        for request in batch_write_requests(TABLE_NAME, requests)
+    ]
+
+
+def find_ids_by_filter(fabricante, codigo_prefix, limit):
+    """
+    IDs das peças de um fabricante e/ou com código começando por um prefixo.
+    Com fabricante a busca é uma Query no GSI fabricante/preço; só com o
+    prefixo é um scan paralelo. Lê só o 'id'.
+    Retorna (ids, ha_mais) - no máximo 'limit' IDs.
+    """
+    names = {'#id': 'id'}
+    values = {}
+    request = {'ProjectionExpression': '#id'}
+    if codigo_prefix:
+        names['#codigo'] = 'codigo'
+        values[':codigo_prefix'] = {'S': codigo_prefix}
+        request['FilterExpression'] = 'begins_with(#codigo, :codigo_prefix)'
+    
+    if fabricante:
+        names['#fabricante'] = 'fabricante'
+        values[':fabricante'] = {'S': fabricante}
+        request.update(TableName=TABLE_NAME, IndexName=FABRICANTE_INDEX,
+                       KeyConditionExpression='#fabricante = :fabricante')
+    request['ExpressionAttributeNames'] = names
+    request['ExpressionAttributeValues'] = values
+    
+    def pages():
+        if not fabricante:
+            yield from parallel_scan(**request)
+            return
+        client = get_dynamodb_client()
+        while True:
+            result = client.query(**request)
+            yield [deserialize_item(item) for item in result.get('Items', [])]
+            if not result.get('LastEvaluatedKey'):
+                return
+            request['ExclusiveStartKey'] = result['LastEvaluatedKey']
+    
+    item_ids = []
+    for page in pages():
+        for item in page:
+            if len(item_ids) == limit:
+                return item_ids, True
+            item_ids.append(item['id'])
+    return item_ids, False
+
+
+def publish_batch_to_sns(events):
+    """
+    Publica eventos (operacao, item) no tópico SNS usando PublishBatch,
+    10 mensagens por chamada.
+    Retorna os índices dos eventos que não puderam ser publicados.
+    """
+    topic_arn = os.environ.get('SNS_TOPIC_ARN')
+    if not topic_arn:
+        print("AVISO: SNS_TOPIC_ARN não configurado")
+        return []
+    
+    sns_client = get_sns_client()
+    failed = []
+    for start in range(0, len(events), SNS_BATCH_SIZE):
+        chunk = events[start:start + SNS_BATCH_SIZE]
+        try:
+            result = sns_client.publish_batch(
+                TopicArn=topic_arn,
+                PublishBatchRequestEntries=[
+                    {
+                        'Id': str(index),
+                        'Message': build_sns_message(operation, item),
+                        'Subject': f'Peça Automotiva - {operation}'
+                    }
+                    for index, (operation, item) in enumerate(chunk)
+                ]
+            )
+            for failure in result.get('Failed', []):
+                operation, item = chunk[int(failure['Id'])]
+                print(f"Erro ao publicar no SNS: {operation} - Item ID: {item.get('id')} - {failure.get('Message')}")
+                failed.append(start + int(failure['Id']))
+        except Exception as e:
+            print(f"Erro ao publicar lote no SNS: {str(e)}")
+            failed.extend(range(start, start + len(chunk)))
+    
+    print(f"Mensagens publicadas no SNS: {len(events) - len(failed)}/{len(events)}")
+    return failed
+
+
+def request_fingerprint(data):
+    """Hash do corpo da requisição (independente da ordem das chaves)"""
+    canonical = json.dumps(data, sort_keys=True, cls=DecimalEncoder, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def get_idempotency_record(record_id):
+    """
+    Registro de idempotência ainda válido (ou None). O TTL do DynamoDB pode
+    levar horas para apagar um registro vencido, então expires_at é conferido aqui.
+    """
+    result = get_dynamodb_client().get_item(
+        TableName=IDEMPOTENCY_TABLE,
+        Key={'id': {'S': record_id}},
+        ConsistentRead=True
+    )
+    if 'Item' not in result:
+        return None
+    record = deserialize_item(result['Item'])
+    if record['expires_at'] <= time.time():
+        return None
+    return record
+
+
+def replay_response(record, fingerprint):
+    """Resposta guardada de uma requisição já atendida com a mesma Idempotency-Key"""
+    if record['fingerprint'] != fingerprint:
+        return response(422, {'error': 'Idempotency-Key já utilizada com outro corpo de requisição'})
+    headers = dict(record.get('headers') or {}, **{'Idempotent-Replayed': 'true'})
+    return raw_response(record['status_code'], record['body'], 'application/json', headers)
+
+
+def put_with_idempotency(item, record):
+    """
+    Grava a peça e o registro de idempotência em uma única transação: ou os
+    dois são gravados, ou nenhum. A condição falha se a chave já tem um
+    registro válido (outra tentativa concorrente chegou antes).
+    """
+    get_dynamodb_client().transact_write_items(TransactItems=[
+        {'Put': {'TableName': TABLE_NAME, 'Item': serialize_item(item)}},
+        {'Put': {
+            'TableName': IDEMPOTENCY_TABLE,
+            'Item': serialize_item(record),
+            'ConditionExpression': 'attribute_not_exists(id) OR expires_at <= :now',
+            'ExpressionAttributeValues': {':now': {'N': str(int(time.time()))}}
+        }}
+    ])
+
+
+def parse_body(event):
+    """Faz o parse do body do evento (string JSON ou objeto já decodificado)"""
+    if isinstance(event.get('body'), str):
+        with measure('json.decode'):
+            if event.get('isBase64Encoded'):
+                # Com binaryMediaTypes '*/*' o API Gateway entrega o body em base64
+                return json.loads(base64.b64decode(event['body']).decode('utf-8'))
+            return json.loads(event['body'])
+    return event.get('body') or {}
+
+
+def build_item(data):
+    """Monta o item do DynamoDB de uma nova peça a partir dos dados validados"""
+    timestamp = datetime.now().isoformat()
+    item = {
+        'id': str(uuid.uuid4()),
+        'nome': data['nome'],
+        'codigo': data['codigo'],
+        'preco': Decimal(str(data['preco'])),
+        'quantidade': int(data['quantidade']),
+        'descricao': data.get('descricao', ''),
+        'created_at': timestamp,
+        'updated_at': timestamp,
+        'version': 1
+    }
+    # Chave do GSI de fabricante: string vazia não é aceita, então fica sem o atributo
+    if data.get('fabricante'):
+        item['fabricante'] = data['fabricante']
+    if low_stock_flag(item['quantidade']):
+        item['estoque_baixo'] = LOW_STOCK_FLAG
+    return item
+
+
+@report_cold_start
+@instrumented
+@negotiate_compression
+def create_item(event, context):
+    """
+    POST /items - Cria uma nova peça automotiva
+    Aceita o header Idempotency-Key: uma nova tentativa com a mesma chave
+    devolve a resposta original, sem gravar outra peça nem publicar outro evento.
+    """
+    try:
+        data = parse_body(event)
+        
+        # Nova tentativa de uma requisição já atendida: devolve a resposta guardada
+        # (antes da checagem de código, que agora acusaria a própria peça criada)
+        idempotency_key = get_header(event, 'Idempotency-Key')
+        if idempotency_key is not None:
+            idempotency_key = idempotency_key.strip()
+            if not idempotency_key or len(idempotency_key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+                return response(400, {
+                    'error': f'Idempotency-Key deve ter entre 1 e {MAX_IDEMPOTENCY_KEY_LENGTH} caracteres'
+                })
+            record_id = f'create_item:{idempotency_key}'
+            fingerprint = request_fingerprint(data)
+            record = get_idempotency_record(record_id)
+            if record is not None:
+                return replay_response(record, fingerprint)
+        
+        # Validar dados
+        is_valid, error_message = validate_peca_data(data)
+        if not is_valid:
+            return response(400, {'error': error_message})
+        
+        # Código do fabricante deve ser único
+        if codigo_in_use(data['codigo']):
+            # Uma tentativa anterior com a mesma chave pode ter gravado a peça
+            # depois da primeira leitura: nesse caso a resposta é a dela
+            if idempotency_key is not None:
+                record = get_idempotency_record(record_id)
+                if record is not None:
+                    return replay_response(record, fingerprint)
+            return response(409, {'error': f"Já existe uma peça com o código {data['codigo']}"})
+        
+        # Preparar item com ID único
+        item = build_item(data)
+        result = response(201, {
+            'message': 'Peça criada com sucesso',
+            'item': item
+        }, item_headers(item))
+        
+        # Salvar no DynamoDB (o evento SNS é publicado pelo stream_publisher)
+        if idempotency_key is None:
+            get_table().put_item(Item=item)
+            return result
+        
+        try:
+            put_with_idempotency(item, {
+                'id': record_id,
+                'expires_at': int(time.time()) + IDEMPOTENCY_TTL,
+                'fingerprint': fingerprint,
+                'status_code': result['statusCode'],
+                'body': result['body'],
+                'headers': item_headers(item),
+                'item_id': item['id']
+            })
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') != 'TransactionCanceledException':
+                raise
+            # Tentativa concorrente com a mesma chave gravou primeiro
+            record = get_idempotency_record(record_id)
+            if record is None:
+                raise
+            return replay_response(record, fingerprint)
+        
+        return result
+    
+    except json.JSONDecodeError:
+        return response(400, {'error': 'JSON inválido'})
+    except Exception as e:
+        print(f"Erro ao criar item: {str(e)}")
+        return response(500, {'error': f'Erro interno do servidor: {str(e)}'})
+
+
+@report_cold_start
+@instrumented
+@negotiate_compression
+def create_items_batch(event, context):
+    """
+    POST /items/batch - Cria várias peças em uma única chamada
+    Aceita uma lista de peças ou {"items": [...]}. Cada elemento é validado
+    individualmente; os válidos são gravados com batch_writer e notificados
+    pelo stream_publisher. A resposta traz o resultado de cada elemento.
+    """
+    try:
+        data = parse_body(event)
+        entries = data.get('items') if isinstance(data, dict) else data
+        
+        if not isinstance(entries, list) or not entries:
+            return response(400, {'error': 'Envie uma lista não vazia de peças'})
+        if len(entries) > MAX_BATCH_ITEMS:
+            return response(400, {'error': f'Máximo de {MAX_BATCH_ITEMS} peças por lote'})
+        
+        results = []
+        valid = []
+        items = []
+        for index, entry in enumerate(entries):
+            if not isinstance(entry, dict):
+                results.append({'index': index, 'status': 400, 'error': 'Peça deve ser um objeto JSON'})
+                continue
+            
+            is_valid, error_message = validate_peca_data(entry)
+            if not is_valid:
+                results.append({'index': index, 'status': 400, 'error': error_message})
+                continue
+            
+            valid.append((index, entry))
+        
+        # Código do fabricante deve ser único: dentro do lote e na tabela
+        # (as consultas ao GSI rodam em paralelo)
+        codigos = list(dict.fromkeys(entry['codigo'] for _, entry in valid))
+        with ThreadPoolExecutor(max_workers=min(len(codigos), BATCH_QUERY_WORKERS) or 1) as executor:
+            futures = {codigo: submit_with_context(executor, codigo_in_use, codigo) for codigo in codigos}
+            in_use = {codigo for codigo, future in futures.items() if future.result()}
+        
+        seen = set()
+        for index, entry in valid:
+            codigo = entry['codigo']
+            if codigo in in_use or codigo in seen:
+                results.append({'index': index, 'status': 409, 'error': f'Já existe uma peça com o código {codigo}'})
+                continue
+            seen.add(codigo)
+            
+            item = build_item(entry)
+            items.append(item)
+            results.append({'index': index, 'status': 201, 'id': item['id']})
+        results.sort(key=lambda result: result['index'])
+        
+        # Salvar no DynamoDB (o batch_writer agrupa em lotes de 25 e
+        # reenvia automaticamente os UnprocessedItems)
+        if items:
+            with get_table().batch_writer() as batch:
+                for item in items:
+                    batch.put_item(Item=item)
+        
+        if not items:
+            status_code = 400
+        elif len(items) == len(entries):
+            status_code = 201
+        else:
+            status_code = 207
+        
+        return response(status_code, {
+            'message': f'{len(items)} de {len(entries)} peças criadas',
+            'created': len(items),
+            'failed': len(entries) - len(items),
+            'results': results
+        })
+    
+    except json.JSONDecodeError:
+        return response(400, {'error': 'JSON inválido'})
+    except Exception as e:
+        print(f"Erro ao criar itens em lote: {str(e)}")
+        return response(500, {'error': f'Erro interno do servidor: {str(e)}'})
+
+
+@report_cold_start
+@instrumented
+@negotiate_compression
+def lookup_items(event, context):
     """
-    Valida os dados de uma peça automotiva.
-    Campos obrigatórios: nome, codigo, preco, quantidade
+    POST /items/lookup - Busca várias peças por ID em uma única chamada
+    Body: {"ids": ["id1", "id2", ...]}
+    Retorna os itens encontrados (na ordem pedida) e os IDs não encontrados.
     """
-    required_fields = ['nome', 'codigo', 'preco', 'quantidade']
-    
-    if not is_update:
-        missing_fields = [field for field in required_fields if field not in data]
-        if missing_fields:
-            return False, f"Campos obrigatórios faltando: {', '.join(missing_fields)}"
-    
-    # Validar tipos de dados quando presentes
-    if 'preco' in data:
-        try:
-            preco = float(data['preco'])
-            if preco < 0:
-                return False, "Preço não pode ser negativo"
-        except (ValueError, TypeError):
-            return False, "Preço deve ser um número válido"
-    
-    if 'quantidade' in data:
-        try:
-            quantidade = int(data['quantidade'])
-            if quantidade < 0:
-                return False, "Quantidade não pode ser negativa"
-        except (ValueError, TypeError):
-            return False, "Quantidade deve ser um número inteiro"
+    try:
+        data = parse_body(event)
+        item_ids = data.get('ids') if isinstance(data, dict) else None
+        
+        if not isinstance(item_ids, list) or not item_ids:
+            return response(400, {'error': "Envie uma lista não vazia em 'ids'"})
+        if not all(isinstance(item_id, str) and item_id for item_id in item_ids):
+            return response(400, {'error': 'Todos os IDs devem ser strings não vazias'})
+        
+        # BatchGetItem não aceita chaves repetidas
+        item_ids = list(dict.fromkeys(item_ids))
+        if len(item_ids) > MAX_BATCH_ITEMS:
+            return response(400, {'error': f'Máximo de {MAX_BATCH_ITEMS} IDs por busca'})
+        
+        found, unprocessed = batch_get_items(item_ids)
+        pending = set(unprocessed)
+        
+        return response(200, {
+            'items': [found[item_id] for item_id in item_ids if item_id in found],
+            'missing': [
+                item_id for item_id in item_ids
+                if item_id not in found and item_id not in pending
+            ],
+            'unprocessed': unprocessed,
+            'count': len(found)
+        })
     
-    return True, None
+    except json.JSONDecodeError:
+        return response(400, {'error': 'JSON inválido'})
+    except Exception as e:
+        print(f"Erro ao buscar itens em lote: {str(e)}")
+        return response(500, {'error': f'Erro interno do servidor: {str(e)}'})
 
 
-def publish_to_sns(operation, item_data):
-    """Publica mensagem no tópico SNS"""
+@report_cold_start
+@instrumented
+@negotiate_compression
+def list_items(event, context):
+    """
+    GET /items - Lista as peças automotivas de forma paginada
+    Query params opcionais:
+      - limit: quantidade máxima de itens por página
+      - cursor: valor de 'next_cursor' retornado pela página anterior
+      - all=true: lê o catálogo completo com scan paralelo
+      - segments: número de segmentos do scan paralelo (com all=true)
+      - codigo: busca pelo código do fabricante (Query no GSI, sem Scan)
+      - fields: atributos a retornar, separados por vírgula (ex.: nome,preco)
+      - fabricante, preco_min, preco_max, estoque_baixo=true: filtros no
+        servidor (Query nos GSIs; paginados com limit/cursor)
+    O ETag vem do contador de alterações da tabela: com If-None-Match igual,
+    responde 304 sem ler os itens.
+    """
     try:
-        topic_arn = os.environ.get('SNS_TOPIC_ARN')
-        if not topic_arn:
-            print("AVISO: SNS_TOPIC_ARN não configurado")
-            return
+        params = get_query_params(event)
         
-        message = {
-            'operation': operation,
-            'timestamp': datetime.now().isoformat(),
-            'item': item_data
-        }
+        fields, error_message = parse_fields(params.get('fields'))
+        if error_message:
+            return response(400, {'error': error_message})
+        projection = projection_kwargs(fields)
         
-        sns_client.publish(
-            TopicArn=topic_arn,
-            Message=json.dumps(message, cls=DecimalEncoder),
-            Subject=f'Peça Automotiva - {operation}'
-        )
-        print(f"Mensagem publicada no SNS: {operation} - Item ID: {item_data.get('id')}")
+        filters, error_message = parse_filters(params)
+        if error_message:
+            return response(400, {'error': error_message})
+        
+        # Polling: se a tabela não mudou desde o ETag do cliente, nem lê os itens
+        headers = {'ETag': list_etag(params)}
+        if etag_matches(get_header(event, 'If-None-Match'), headers['ETag']):
+            return raw_response(304, '', 'application/json', headers)
+        
+        if params.get('codigo'):
+            items = find_by_codigo(params['codigo'], fields)
+            return response(200, {
+                'items': items,
+                'count': len(items),
+                'next_cursor': None
+            }, headers)
+        
+        if params.get('all') == 'true' and not filters:
+            total_segments, error_message = parse_segments(params.get('segments'))
+            if error_message:
+                return response(400, {'error': error_message})
+            
+            items = [
+                item
+                for page in parallel_scan(total_segments, ordered=True, **projection)
+                for item in page
+            ]
+            return response(200, {
+                'items': items,
+                'count': len(items),
+                'next_cursor': None
+            }, headers)
+        
+        limit, error_message = parse_limit(params.get('limit'))
+        if error_message:
+            return response(400, {'error': error_message})
+        
+        operation, request = build_filtered_request(filters) if filters else ('scan', {'TableName': TABLE_NAME})
+        request['Limit'] = limit
+        if projection:
+            request['ProjectionExpression'] = projection['ProjectionExpression']
+            request['ExpressionAttributeNames'] = {
+                **request.get('ExpressionAttributeNames', {}),
+                **projection['ExpressionAttributeNames']
+            }
+        if params.get('cursor'):
+            try:
+                request['ExclusiveStartKey'] = decode_cursor(params['cursor'])
+            except ValueError as e:
+                return response(400, {'error': str(e)})
+        
+        client = get_dynamodb_client()
+        try:
+            result = client.query(**request) if operation == 'query' else client.scan(**request)
+        except ClientError as e:
+            if 'ExclusiveStartKey' in request and invalid_start_key(e):
+                return response(400, {'error': 'Cursor inválido'})
+            raise
+        items = [deserialize_item(item) for item in result.get('Items', [])]
+        
+        return response(200, {
+            'items': items,
+            'count': len(items),
+            'next_cursor': encode_cursor(result.get('LastEvaluatedKey'))
+        }, headers)
+    
     except Exception as e:
-        print(f"Erro ao publicar no SNS: {str(e)}")
-        # Não falhar a operação se o SNS falhar
+        print(f"Erro ao listar itens: {str(e)}")
+        return response(500, {'error': f'Erro interno do servidor: {str(e)}'})
 
 
-def create_item(event, context):
+@report_cold_start
+@instrumented
+@negotiate_compression
+def export_items(event, context):
     """
-    POST /items - Cria uma nova peça automotiva
+    GET /items/export - Exporta o catálogo em NDJSON ou CSV, página a página
+    Query params opcionais:
+      - format: 'ndjson' (padrão) ou 'csv'
+      - limit: quantidade máxima de itens por página
+      - cursor: valor do header 'X-Next-Cursor' da página anterior
+    O CSV só traz o cabeçalho na primeira página, então as páginas podem
+    ser concatenadas diretamente.
     """
     try:
-        # Parse do body
-        if isinstance(event.get('body'), str):
-            data = json.loads(event['body'])
-        else:
-            data = event.get('body', {})
+        params = get_query_params(event)
         
-        # Validar dados
-        is_valid, error_message = validate_peca_data(data)
-        if not is_valid:
-            return response(400, {'error': error_message})
+        fmt = params.get('format', 'ndjson')
+        if fmt not in EXPORT_FORMATS:
+            return response(400, {'error': f"Formato inválido. Use: {', '.join(EXPORT_FORMATS)}"})
         
-        # Gerar ID único
-        item_id = str(uuid.uuid4())
+        limit, error_message = parse_limit(params.get('limit'))
+        if error_message:
+            return response(400, {'error': error_message})
         
-        # Preparar item
-        timestamp = datetime.now().isoformat()
-        item = {
-            'id': item_id,
-            'nome': data['nome'],
-            'codigo': data['codigo'],
-            'preco': Decimal(str(data['preco'])),
-            'quantidade': int(data['quantidade']),
-            'descricao': data.get('descricao', ''),
-            'fabricante': data.get('fabricante', ''),
-            'created_at': timestamp,
-            'updated_at': timestamp
-        }
+        scan_kwargs = {'Limit': limit}
+        if params.get('cursor'):
+            try:
+                scan_kwargs['ExclusiveStartKey'] = decode_cursor(params['cursor'])
+            except ValueError as e:
+                return response(400, {'error': str(e)})
         
-        # Salvar no DynamoDB
-        table.put_item(Item=item)
+        try:
+            result = get_dynamodb_client().scan(TableName=TABLE_NAME, **scan_kwargs)
+        except ClientError as e:
+            if 'ExclusiveStartKey' in scan_kwargs and invalid_start_key(e):
+                return response(400, {'error': 'Cursor inválido'})
+            raise
+        body = ''.join(export_lines(
+            (deserialize_item(item) for item in result.get('Items', [])),
+            fmt,
+            include_header=not params.get('cursor')
+        ))
         
-        # Publicar no SNS
-        publish_to_sns('CREATE', item)
+        headers = {}
+        next_cursor = encode_cursor(result.get('LastEvaluatedKey'))
+        if next_cursor:
+            headers['X-Next-Cursor'] = next_cursor
         
-        return response(201, {
-            'message': 'Peça criada com sucesso',
-            'item': item
-        })
+        return raw_response(200, body, EXPORT_FORMATS[fmt], headers)
     
-    except json.JSONDecodeError:
-        return response(400, {'error': 'JSON inválido'})
     except Exception as e:
-        print(f"Erro ao criar item: {str(e)}")
+        print(f"Erro ao exportar itens: {str(e)}")
         return response(500, {'error': f'Erro interno do servidor: {str(e)}'})
 
 
-def list_items(event, context):
+@report_cold_start
+@instrumented
+@negotiate_compression
+def search_items(event, context):
     """
-    GET /items - Lista todas as peças automotivas
+    GET /items/search?q=pastilha frei - Busca textual em nome, código,
+    fabricante e descrição, sem diferenciar acentos e maiúsculas.
+    Cada termo casa por prefixo e todos precisam aparecer; os resultados
+    vêm ordenados por relevância ('score').
+    Query param opcional 'limit' (padrão 20, máximo MAX_SEARCH_RESULTS).
+    No máximo MAX_SEARCH_TERMS termos distintos por consulta.
     """
     try:
-        result = table.scan()
-        items = result.get('Items', [])
+        params = get_query_params(event)
+        
+        query = params.get('q', '')
+        terms = set(search_tokens(query))
+        if not terms:
+            return response(400, {'error': "Parâmetro 'q' é obrigatório"})
+        if len(terms) > MAX_SEARCH_TERMS:
+            return response(400, {'error': f"Parâmetro 'q' aceita no máximo {MAX_SEARCH_TERMS} termos"})
+        
+        limit = params.get('limit') or '20'
+        try:
+            limit = int(limit)
+        except ValueError:
+            return response(400, {'error': "Parâmetro 'limit' deve ser um número inteiro"})
+        if limit < 1 or limit > MAX_SEARCH_RESULTS:
+            return response(400, {'error': f"Parâmetro 'limit' deve estar entre 1 e {MAX_SEARCH_RESULTS}"})
+        
+        started = time.perf_counter()
+        items, index_stats = search_catalog(query, limit)
         
         return response(200, {
+            'query': query,
             'items': items,
-            'count': len(items)
+            'count': len(items),
+            'took_ms': round((time.perf_counter() - started) * 1000, 2),
+            'index': index_stats
         })
     
     except Exception as e:
-        print(f"Erro ao listar itens: {str(e)}")
+        print(f"Erro ao buscar peças: {str(e)}")
         return response(500, {'error': f'Erro interno do servidor: {str(e)}'})
 
 
+@report_cold_start
+@instrumented
+@negotiate_compression
 def get_item(event, context):
     """
     GET /items/{id} - Busca uma peça específica por ID
+    Com ITEM_CACHE_SIZE > 0 a peça é servida do cache do container quando a
+    versão guardada ainda é a atual; o header X-Cache indica HIT ou MISS.
+    Query param opcional 'fields' limita os atributos retornados.
+    Responde 304 sem corpo quando o If-None-Match traz o ETag atual.
     """
     try:
         item_id = event['pathParameters']['id']
         
-        result = table.get_item(Key={'id': item_id})
+        fields, error_message = parse_fields(get_query_params(event).get('fields'))
+        if error_message:
+            return response(400, {'error': error_message})
+        
+        if item_cache.enabled:
+            item = item_cache.get(item_id)
+            if item is not None:
+                # Revalidação: GetItem projetando só 'version'. Custa a mesma
+                # leitura (RCU) da peça inteira, mas transfere e converte só a
+                # versão, e garante que ETag e corpo nunca ficam para trás
+                current = get_table().get_item(Key={'id': item_id}, **projection_kwargs(['version'])).get('Item')
+                if current is None:
+                    item_cache.stale(item_id)
+                    return response(404, {'error': 'Peça não encontrada'})
+                if current.get('version') == item.get('version'):
+                    return conditional_get_response(
+                        event, {'item': select_fields(item, fields)}, cache_headers(item, 'HIT', fields)
+                    )
+                item_cache.stale(item_id)
+        
+        if fields and not item_cache.enabled:
+            # 'version' vem sempre para o ETag, mesmo se não foi pedida
+            result = get_table().get_item(
+                Key={'id': item_id},
+                **projection_kwargs(fields + ['version'] if 'version' not in fields else fields)
+            )
+            if 'Item' not in result:
+                return response(404, {'error': 'Peça não encontrada'})
+            item = result['Item']
+            return conditional_get_response(event, {'item': select_fields(item, fields)}, item_headers(item, fields))
+        
+        result = get_table().get_item(Key={'id': item_id})
         
         if 'Item' not in result:
             return response(404, {'error': 'Peça não encontrada'})
         
-        return response(200, {'item': result['Item']})
+        item = result['Item']
+        if item_cache.enabled:
+            item_cache.put(item)
+            return conditional_get_response(
+                event, {'item': select_fields(item, fields)}, cache_headers(item, 'MISS', fields)
+            )
+        
+        return conditional_get_response(event, {'item': item}, item_headers(item))
     
     except Exception as e:
         print(f"Erro ao buscar item: {str(e)}")
         return response(500, {'error': f'Erro interno do servidor: {str(e)}'})
 
 
+@report_cold_start
+@instrumented
+@negotiate_compression
 def update_item(event, context):
     """
     PUT /items/{id} - Atualiza uma peça existente
+    Aceita o header If-Match com o ETag da peça para evitar sobrescrever
+    alterações concorrentes (409 se a versão não for a atual).
     """
     try:
         item_id = event['pathParameters']['id']
         
-        # Verificar se o item existe
-        result = table.get_item(Key={'id': item_id})
-        if 'Item' not in result:
-            return response(404, {'error': 'Peça não encontrada'})
+        try:
+            expected_version = parse_if_match(get_header(event, 'If-Match'))
+        except ValueError as e:
+            return response(400, {'error': str(e)})
         
         # Parse do body
-        if isinstance(event.get('body'), str):
-            data = json.loads(event['body'])
-        else:
-            data = event.get('body', {})
+        data = parse_body(event)
         
         # Validar dados
         is_valid, error_message = validate_peca_data(data, is_update=True)
         if not is_valid:
             return response(400, {'error': error_message})
         
+        # Código do fabricante deve continuar único
+        if 'codigo' in data and codigo_in_use(data['codigo'], ignore_id=item_id):
+            return response(409, {'error': f"Já existe uma peça com o código {data['codigo']}"})
+        
         # Construir expressão de atualização
         update_expression = "SET updated_at = :updated_at"
-        expression_values = {':updated_at': datetime.now().isoformat()}
-        expression_names = {}
+        expression_values = {':updated_at': datetime.now().isoformat(), ':one': 1}
         
         # Adicionar campos a atualizar
         if 'nome' in data:
@@ -255,35 +2133,61 @@ def update_item(event, context):
             update_expression += ", preco = :preco"
             expression_values[':preco'] = Decimal(str(data['preco']))
         
+        removed_attributes = []
         if 'quantidade' in data:
             update_expression += ", quantidade = :quantidade"
             expression_values[':quantidade'] = int(data['quantidade'])
+            # Mantém o índice esparso de estoque baixo em sincronia
+            if low_stock_flag(expression_values[':quantidade']):
+                update_expression += ", estoque_baixo = :estoque_baixo"
+                expression_values[':estoque_baixo'] = LOW_STOCK_FLAG
+            else:
+                removed_attributes.append('estoque_baixo')
         
         if 'descricao' in data:
             update_expression += ", descricao = :descricao"
             expression_values[':descricao'] = data['descricao']
         
-        if 'fabricante' in data:
+        if data.get('fabricante'):
             update_expression += ", fabricante = :fabricante"
             expression_values[':fabricante'] = data['fabricante']
+        elif 'fabricante' in data:
+            removed_attributes.append('fabricante')
+        
+        # Cada escrita incrementa a versão da peça
+        update_expression += " ADD version :one"
+        if removed_attributes:
+            update_expression += " REMOVE " + ", ".join(removed_attributes)
+        
+        # Escrita condicional: a peça precisa existir (e estar na versão
+        # esperada, se o cliente enviou If-Match), sem leitura prévia
+        condition_expression = "attribute_exists(id)"
+        if expected_version is not None:
+            condition_expression += " AND version = :expected_version"
+            expression_values[':expected_version'] = expected_version
         
         # Atualizar no DynamoDB
-        response_db = table.update_item(
-            Key={'id': item_id},
-            UpdateExpression=update_expression,
-            ExpressionAttributeValues=expression_values,
-            ReturnValues='ALL_NEW'
-        )
+        try:
+            response_db = get_table().update_item(
+                Key={'id': item_id},
+                UpdateExpression=update_expression,
+                ConditionExpression=condition_expression,
+                ExpressionAttributeValues=expression_values,
+                ReturnValues='ALL_NEW',
+                ReturnValuesOnConditionCheckFailure='ALL_OLD'
+            )
+        except ClientError as e:
+            current_item = conditional_check_failed(e)
+            if current_item is None:
+                return response(404, {'error': 'Peça não encontrada'})
+            return version_conflict_response(current_item)
         
         updated_item = response_db['Attributes']
         
-        # Publicar no SNS
-        publish_to_sns('UPDATE', updated_item)
-        
         return response(200, {
             'message': 'Peça atualizada com sucesso',
             'item': updated_item
-        })
+        }, item_headers(updated_item))
     
     except json.JSONDecodeError:
         return response(400, {'error': 'JSON inválido'})
@@ -292,20 +2196,149 @@ def update_item(event, context):
         return response(500, {'error': f'Erro interno do servidor: {str(e)}'})
 
 
+def sync_low_stock_flag(item):
+    """
+    Depois de um ADD no estoque, liga/desliga o atributo esparso
+    'estoque_baixo' se a nova quantidade cruzou o limite. A escrita é
+    condicionada à quantidade lida, então um ajuste concorrente (que fará
+    a própria sincronização) vence. Não altera a versão da peça.
+    A escrita é secundária: o ajuste já foi gravado, então qualquer falha
+    aqui (throttling, timeout, conexão) só é registrada no log.
+    """
+    flag = low_stock_flag(item['quantidade'])
+    if flag == item.get('estoque_baixo'):
+        return
+    
+    if flag:
+        update_expression = "SET estoque_baixo = :estoque_baixo"
+        expression_values = {':estoque_baixo': flag, ':quantidade': item['quantidade']}
+    else:
+        update_expression = "REMOVE estoque_baixo"
+        expression_values = {':quantidade': item['quantidade']}
+    
+    try:
+        get_table().update_item(
+            Key={'id': item['id']},
+            UpdateExpression=update_expression,
+            ConditionExpression="quantidade = :quantidade",
+            ExpressionAttributeValues=expression_values
+        )
+    except Exception as e:
+        # Erros de transporte do botocore (timeout, conexão) não são ClientError
+        if not (isinstance(e, ClientError)
+                and e.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException'):
+            print(f"Erro ao sincronizar estoque_baixo da peça {item['id']}: {str(e)}")
+        return
+    
+    if flag:
+        item['estoque_baixo'] = flag
+    else:
+        item.pop('estoque_baixo', None)
+
+
+@report_cold_start
+@instrumented
+@negotiate_compression
+def adjust_stock(event, context):
+    """
+    POST /items/{id}/estoque - Ajusta o estoque de uma peça de forma atômica
+    Body: {"delta": -3} (negativo para saída, positivo para entrada)
+    Aplica ADD quantidade :delta em uma única escrita condicional, que é
+    rejeitada (409) se o estoque ficaria negativo. Se a quantidade cruzar
+    LOW_STOCK_THRESHOLD, sync_low_stock_flag faz uma segunda escrita (best-effort).
+    """
+    try:
+        item_id = event['pathParameters']['id']
+        data = parse_body(event)
+        
+        delta = data.get('delta') if isinstance(data, dict) else None
+        if isinstance(delta, str):
+            try:
+                delta = int(delta)
+            except ValueError:
+                delta = None
+        if not isinstance(delta, int) or isinstance(delta, bool) or delta == 0:
+            return response(400, {'error': "Campo 'delta' deve ser um número inteiro diferente de zero"})
+        
+        condition_expression = "attribute_exists(id)"
+        expression_values = {
+            ':delta': delta,
+            ':one': 1,
+            ':updated_at': datetime.now().isoformat()
+        }
+        if delta < 0:
+            # Saída de estoque: precisa haver quantidade suficiente
+            condition_expression += " AND quantidade >= :minimo"
+            expression_values[':minimo'] = -delta
+        
+        try:
+            response_db = get_table().update_item(
+                Key={'id': item_id},
+                UpdateExpression="SET updated_at = :updated_at ADD quantidade :delta, version :one",
+                ConditionExpression=condition_expression,
+                ExpressionAttributeValues=expression_values,
+                ReturnValues='ALL_NEW',
+                ReturnValuesOnConditionCheckFailure='ALL_OLD'
+            )
+        except ClientError as e:
+            current_item = conditional_check_failed(e)
+            if current_item is None:
+                return response(404, {'error': 'Peça não encontrada'})
+            return response(409, {
+                'error': 'Estoque insuficiente',
+                'quantidade': current_item.get('quantidade')
+            }, item_headers(current_item))
+        
+        updated_item = response_db['Attributes']
+        sync_low_stock_flag(updated_item)
+        
+        return response(200, {
+            'message': 'Estoque ajustado com sucesso',
+            'id': item_id,
+            'delta': delta,
+            'quantidade': updated_item['quantidade']
+        }, item_headers(updated_item))
+    
+    except json.JSONDecodeError:
+        return response(400, {'error': 'JSON inválido'})
+    except Exception as e:
+        print(f"Erro ao ajustar estoque: {str(e)}")
+        return response(500, {'error': f'Erro interno do servidor: {str(e)}'})
+
+
+@report_cold_start
+@instrumented
+@negotiate_compression
 def delete_item(event, context):
     """
     DELETE /items/{id} - Remove uma peça
+    Aceita o header If-Match com o ETag da peça (409 se a versão mudou).
     """
     try:
         item_id = event['pathParameters']['id']
         
-        # Verificar se o item existe antes de deletar
-        result = table.get_item(Key={'id': item_id})
-        if 'Item' not in result:
-            return response(404, {'error': 'Peça não encontrada'})
+        try:
+            expected_version = parse_if_match(get_header(event, 'If-Match'))
+        except ValueError as e:
+            return response(400, {'error': str(e)})
+        
+        delete_kwargs = {
+            'Key': {'id': item_id},
+            'ConditionExpression': "attribute_exists(id)",
+            'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+        }
+        if expected_version is not None:
+            delete_kwargs['ConditionExpression'] += " AND version = :expected_version"
+            delete_kwargs['ExpressionAttributeValues'] = {':expected_version': expected_version}
         
-        # Deletar do DynamoDB
-        table.delete_item(Key={'id': item_id})
+        # Deletar do DynamoDB em uma única escrita condicional
+        try:
+            get_table().delete_item(**delete_kwargs)
+        except ClientError as e:
+            current_item = conditional_check_failed(e)
+            if current_item is None:
+                return response(404, {'error': 'Peça não encontrada'})
+            return version_conflict_response(current_item)
         
         return response(200, {
             'message': 'Peça deletada com sucesso',
@@ -317,10 +2350,415 @@ def delete_item(event, context):
         return response(500, {'error': f'Erro interno do servidor: {str(e)}'})
 
 
+@report_cold_start
+@instrumented
+@negotiate_compression
+def delete_items_batch(event, context):
+    """
+    POST /items/delete-batch - Remove várias peças em uma única chamada
+    Body: {"ids": [...]} ou um filtro {"fabricante": "...", "codigo_prefix": "..."}
+    (um ou os dois campos). As exclusões são feitas com BatchWriteItem em
+    lotes paralelos de 25, e os eventos DELETE saem em lote pelo stream_publisher.
+    A resposta traz o resultado de cada ID.
+    """
+    try:
+        data = parse_body(event)
+        if not isinstance(data, dict):
+            return response(400, {'error': "Envie 'ids' ou um filtro (fabricante, codigo_prefix)"})
+        
+        item_ids = data.get('ids')
+        fabricante = data.get('fabricante')
+        codigo_prefix = data.get('codigo_prefix')
+        has_filter = fabricante is not None or codigo_prefix is not None
+        
+        if item_ids is not None and has_filter:
+            return response(400, {'error': "Envie 'ids' ou um filtro, não os dois"})
+        
+        results = {}
+        has_more = False
+        if item_ids is not None:
+            if not isinstance(item_ids, list) or not item_ids:
+                return response(400, {'error': "Envie uma lista não vazia em 'ids'"})
+            if not all(isinstance(item_id, str) and item_id for item_id in item_ids):
+                return response(400, {'error': 'Todos os IDs devem ser strings não vazias'})
+            item_ids = list(dict.fromkeys(item_ids))
+            if len(item_ids) > MAX_BATCH_ITEMS:
+                return response(400, {'error': f'Máximo de {MAX_BATCH_ITEMS} IDs por exclusão'})
+            
+            # BatchWriteItem não informa se o item existia: uma leitura em lote
+            # (100 IDs por chamada) separa os IDs inexistentes
+            found, unprocessed = batch_get_items(item_ids)
+            for item_id in unprocessed:
+                results[item_id] = {'id': item_id, 'status': 503, 'error': 'Não foi possível verificar a peça'}
+            for item_id in item_ids:
+                if item_id not in found and item_id not in results:
+                    results[item_id] = {'id': item_id, 'status': 404, 'error': 'Peça não encontrada'}
+            to_delete = [item_id for item_id in item_ids if item_id in found]
+        elif has_filter:
+            for name, value in (('fabricante', fabricante), ('codigo_prefix', codigo_prefix)):
+                if value is not None and (not isinstance(value, str) or not value):
+                    return response(400, {'error': f"Campo '{name}' deve ser uma string não vazia"})
+            # Filtros muito amplos são removidos em várias chamadas (has_more)
+            item_ids, has_more = find_ids_by_filter(fabricante, codigo_prefix, MAX_BATCH_ITEMS)
+            to_delete = item_ids
+        else:
+            return response(400, {'error': "Envie 'ids' ou um filtro (fabricante, codigo_prefix)"})
+        
+        failed = set(batch_delete_items(to_delete))
+        for item_id in to_delete:
+            if item_id in failed:
+                results[item_id] = {'id': item_id, 'status': 503, 'error': 'Exclusão não processada, tente novamente'}
+            else:
+                results[item_id] = {'id': item_id, 'status': 200}
+        
+        deleted = len(to_delete) - len(failed)
+        return response(200 if deleted == len(item_ids) else 207, {
+            'message': f'{deleted} de {len(item_ids)} peças removidas',
+            'deleted': deleted,
+            'failed': len(item_ids) - deleted,
+            'has_more': has_more,
+            'results': [results[item_id] for item_id in item_ids]
+        })
+    
+    except json.JSONDecodeError:
+        return response(400, {'error': 'JSON inválido'})
+    except Exception as e:
+        print(f"Erro ao deletar itens em lote: {str(e)}")
+        return response(500, {'error': f'Erro interno do servidor: {str(e)}'})
+
+
+STREAM_OPERATIONS = {
+    'INSERT': 'CREATE',
+    'MODIFY': 'UPDATE',
+    'REMOVE': 'DELETE'
+}
+
+
+# Atributos calculados pela própria API (não geram notificação quando mudam sozinhos)
+DERIVED_ATTRIBUTES = ('estoque_baixo',)
+
+
+def only_derived_attributes_changed(record):
+    """True para um MODIFY que só ligou/desligou atributos derivados"""
+    if record.get('eventName') != 'MODIFY':
+        return False
+    images = record['dynamodb']
+    old_image = {k: v for k, v in images.get('OldImage', {}).items() if k not in DERIVED_ATTRIBUTES}
+    new_image = {k: v for k, v in images.get('NewImage', {}).items() if k not in DERIVED_ATTRIBUTES}
+    return old_image == new_image
+
+
+@report_cold_start
+@instrumented
+def stream_publisher(event, context):
+    """
+    Função disparada pelo DynamoDB Stream da tabela de peças.
+    Publica no SNS um evento para cada alteração (inclusive exclusões),
+    fora do caminho crítico das requisições HTTP. Registros que falharem
+    são devolvidos em batchItemFailures para serem reprocessados.
+    """
+    events = []
+    sequence_numbers = []
+    
+    for record in event.get('Records', []):
+        operation = STREAM_OPERATIONS.get(record.get('eventName'))
+        if not operation or only_derived_attributes_changed(record):
+            continue
+        
+        image = record['dynamodb'].get('OldImage' if operation == 'DELETE' else 'NewImage', {})
+        item = deserialize_item(image)
+        
+        events.append((operation, item))
+        sequence_numbers.append(record['dynamodb']['SequenceNumber'])
+    
+    failed = publish_batch_to_sns(events) if events else []
+    
+    return {
+        'batchItemFailures': [
+            {'itemIdentifier': sequence_numbers[index]} for index in failed
+        ]
+    }
+
+
+def stats_contribution(item):
+    """
+    Quanto uma peça soma nos agregados: (fabricante, quantidade, valor em estoque).
+    Aceita a peça no formato do Stream/client ({'N': '29.9'}) ou já convertida.
+    """
+    def number(value):
+        return Decimal(value['N'] if isinstance(value, dict) else str(value))
+    
+    fabricante = item.get('fabricante', '')
+    if isinstance(fabricante, dict):
+        fabricante = fabricante['S']
+    quantidade = number(item.get('quantidade', 0))
+    preco = number(item.get('preco', 0))
+    return fabricante, quantidade, preco * quantidade
+
+
+def stats_deltas(records):
+    """
+    Soma as variações dos agregados de um lote de registros do Stream:
+    INSERT soma a peça nova, REMOVE subtrai a antiga e MODIFY aplica a diferença.
+    """
+    deltas = {'item_count': 0, 'total_quantity': Decimal(0), 'stock_value': Decimal(0)}
+    fabricantes = {}
+    
+    for record in records:
+        images = record.get('dynamodb', {})
+        for image_name, sign in (('OldImage', -1), ('NewImage', 1)):
+            image = images.get(image_name)
+            if not image:
+                continue
+            fabricante, quantidade, valor = stats_contribution(image)
+            deltas['item_count'] += sign
+            deltas['total_quantity'] += sign * quantidade
+            deltas['stock_value'] += sign * valor
+            fabricantes[fabricante] = fabricantes.get(fabricante, 0) + sign
+    
+    deltas['fabricantes'] = {name: count for name, count in fabricantes.items() if count}
+    return deltas
+
+
+def apply_stats_deltas(deltas):
+    """
+    Aplica as variações no registro de agregados com ADD atômico (cria o
+    registro se não existir). Cada fabricante é um atributo de primeiro
+    nível, porque o ADD não aceita caminhos aninhados. Como a UpdateExpression
+    tem limite de 4 KB, os fabricantes vão em grupos de
+    STATS_FABRICANTES_PER_UPDATE: os totais seguem no primeiro UpdateItem e
+    os demais grupos em UpdateItems seguintes.
+    """
+    totals = []
+    totals_values = {}
+    for attribute in ('item_count', 'total_quantity', 'stock_value'):
+        if deltas[attribute]:
+            totals.append(f'{attribute} :{attribute}')
+            totals_values[f':{attribute}'] = {'N': format(Decimal(deltas[attribute]), 'f')}
+    
+    fabricantes = sorted(deltas['fabricantes'].items())
+    groups = [
+        fabricantes[start:start + STATS_FABRICANTES_PER_UPDATE]
+        for start in range(0, len(fabricantes), STATS_FABRICANTES_PER_UPDATE)
+    ] or [[]]
+    if not totals and not fabricantes:
+        return False
+    
+    client = get_dynamodb_client()
+    for group_index, group in enumerate(groups):
+        names = {}
+        values = {':updated_at': {'S': datetime.now().isoformat()}}
+        additions = []
+        if group_index == 0:
+            additions.extend(totals)
+            values.update(totals_values)
+        for index, (fabricante, count) in enumerate(group):
+            names[f'#f{index}'] = STATS_FABRICANTE_PREFIX + fabricante
+            values[f':f{index}'] = {'N': str(count)}
+            additions.append(f'#f{index} :f{index}')
+        if not additions:
+            continue
+        
+        update_kwargs = {
+            'TableName': STATS_TABLE,
+            'Key': {'id': {'S': STATS_ID}},
+            'UpdateExpression': 'SET updated_at = :updated_at ADD ' + ', '.join(additions),
+            'ExpressionAttributeValues': values
+        }
+        if names:
+            update_kwargs['ExpressionAttributeNames'] = names
+        client.update_item(**update_kwargs)
+    return True
+
+
+def bump_change_counter(changes):
+    """Soma alterações ao contador da tabela (ADD atômico)"""
+    get_dynamodb_client().update_item(
+        TableName=STATS_TABLE,
+        Key={'id': {'S': CHANGE_COUNTER_ID}},
+        UpdateExpression='ADD #counter :changes',
+        ExpressionAttributeNames={'#counter': 'counter'},
+        ExpressionAttributeValues={':changes': {'N': str(changes)}}
+    )
+
+
+def get_change_counter():
+    """Valor atual do contador de alterações da tabela (0 se ainda não existe)"""
+    result = get_dynamodb_client().get_item(
+        TableName=STATS_TABLE,
+        Key={'id': {'S': CHANGE_COUNTER_ID}}
+    )
+    return int(result.get('Item', {}).get('counter', {}).get('N', '0'))
+
+
+def list_etag(params):
+    """
+    ETag de uma listagem: contador de alterações da tabela + hash dos query
+    params (cada filtro/página é uma representação diferente). Se nada mudou
+    na tabela, o mesmo pedido gera o mesmo ETag sem precisar do Scan.
+    É um ETag fraco: não é calculado a partir do corpo devolvido, e o
+    contador acompanha as escritas com a defasagem do Stream.
+    """
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+    return f'W/"L{get_change_counter()}-{digest}"'
+
+
+def search_index_changes(records):
+    """
+    Diferença entre as entradas de busca da imagem antiga e da nova de cada
+    registro do Stream, na ordem do lote: {(prefixo, chave): peso ou None}
+    (None = remover). Um MODIFY que não mexe no texto não gera escrita.
+    """
+    changes = {}
+    for record in records:
+        images = record.get('dynamodb', {})
+        old_postings = search_postings(deserialize_item(images['OldImage'])) if images.get('OldImage') else {}
+        new_postings = search_postings(deserialize_item(images['NewImage'])) if images.get('NewImage') else {}
+        for key in old_postings.keys() - new_postings.keys():
+            changes[key] = None
+        for key, weight in new_postings.items():
+            if old_postings.get(key) != weight:
+                changes[key] = weight
+    return changes
+
+
+def search_write_requests(changes):
+    """Converte {(prefixo, chave): peso ou None} em requisições de BatchWriteItem"""
+    requests = []
+    for (prefixo, chave), weight in changes.items():
+        key = {'prefixo': {'S': prefixo}, 'chave': {'S': chave}}
+        if weight is None:
+            requests.append({'DeleteRequest': {'Key': key}})
+        else:
+            requests.append({'PutRequest': {'Item': dict(key, peso={'N': str(weight)})}})
+    return requests
+
+
+def apply_search_changes(changes):
+    """Grava as alterações no índice de busca; exceção se alguma ficar pendente"""
+    unprocessed = batch_write_requests(SEARCH_TABLE, search_write_requests(changes))
+    if unprocessed:
+        raise RuntimeError(f'{len(unprocessed)} entradas do índice de busca não foram gravadas')
+
+
+@report_cold_start
+@instrumented
+def stats_aggregator(event, context):
+    """
+    Segunda função do DynamoDB Stream: mantém os agregados do inventário,
+    o contador de alterações da tabela (ETag das listagens) e o índice de
+    busca textual (tabela -search).
+    Os agregados do lote viram um UpdateItem (mais um por grupo de
+    STATS_FABRICANTES_PER_UPDATE fabricantes); uma exceção faz o Lambda
+    reprocessar o lote. Só uma falha entre esses UpdateItems conta em dobro
+    o que já foi aplicado, e o rebuildStats corrige o desvio.
+    O contador e o índice de busca vêm antes porque reaplicá-los num
+    reprocessamento é inofensivo: o pior caso é um 200 a mais para os
+    clientes, e as entradas de busca são regravadas com o mesmo valor.
+    """
+    records = [
+        record for record in event.get('Records', [])
+        if record.get('eventName') in STREAM_OPERATIONS
+    ]
+    if records:
+        bump_change_counter(len(records))
+    search_changes = search_index_changes(records)
+    apply_search_changes(search_changes)
+    deltas = stats_deltas(records)
+    applied = apply_stats_deltas(deltas)
+    print(json.dumps({'stats_records': len(records), 'applied': applied,
+                      'item_count_delta': deltas['item_count'],
+                      'search_changes': len(search_changes)}))
+    return {'records': len(records), 'applied': applied}
+
+
+@report_cold_start
+@instrumented
+@negotiate_compression
+def get_stats(event, context):
+    """
+    GET /items/stats - Agregados do inventário: quantidade de peças, unidades
+    em estoque, valor total em estoque e peças por fabricante.
+    Lê um único registro (O(1)), mantido pelo stats_aggregator.
+    """
+    try:
+        result = get_dynamodb_client().get_item(
+            TableName=STATS_TABLE,
+            Key={'id': {'S': STATS_ID}}
+        )
+        record = deserialize_item(result.get('Item', {}))
+        
+        fabricantes = {
+            name[len(STATS_FABRICANTE_PREFIX):]: count
+            for name, count in sorted(record.items())
+            if name.startswith(STATS_FABRICANTE_PREFIX) and count
+        }
+        
+        return response(200, {
+            'item_count': record.get('item_count', 0),
+            'total_quantity': record.get('total_quantity', 0),
+            'stock_value': round(record.get('stock_value', 0), 2),
+            'fabricantes': fabricantes,
+            'updated_at': record.get('updated_at'),
+            'rebuilt_at': record.get('rebuilt_at')
+        })
+    
+    except Exception as e:
+        print(f"Erro ao buscar estatísticas: {str(e)}")
+        return response(500, {'error': f'Erro interno do servidor: {str(e)}'})
+
+
+@report_cold_start
+@instrumented
+def rebuild_stats(event, context):
+    """
+    Job sob demanda que recalcula os agregados com um scan paralelo da tabela
+    e regrava o registro inteiro (corrige qualquer desvio acumulado).
+    Alterações feitas durante o scan podem ficar de fora ou contar em dobro;
+    rode em um momento de pouca escrita.
+    Uso: serverless invoke -f rebuildStats --stage local
+    """
+    started = time.perf_counter()
+    totals = {'item_count': 0, 'total_quantity': Decimal(0), 'stock_value': Decimal(0)}
+    fabricantes = {}
+    
+    projection = projection_kwargs(['id', 'fabricante', 'preco', 'quantidade'])
+    for page in parallel_scan(**projection):
+        for item in page:
+            fabricante, quantidade, valor = stats_contribution(item)
+            totals['item_count'] += 1
+            totals['total_quantity'] += quantidade
+            totals['stock_value'] += valor
+            fabricantes[fabricante] = fabricantes.get(fabricante, 0) + 1
+    
+    timestamp = datetime.now().isoformat()
+    record = {
+        'id': {'S': STATS_ID},
+        'item_count': {'N': str(totals['item_count'])},
+        'total_quantity': {'N': format(totals['total_quantity'], 'f')},
+        'stock_value': {'N': format(totals['stock_value'], 'f')},
+        'updated_at': {'S': timestamp},
+        'rebuilt_at': {'S': timestamp}
+    }
+    for fabricante, count in fabricantes.items():
+        record[STATS_FABRICANTE_PREFIX + fabricante] = {'N': str(count)}
+    get_dynamodb_client().put_item(TableName=STATS_TABLE, Item=record)
+    
+    summary = {
+        'item_count': totals['item_count'],
+        'fabricantes': len(fabricantes),
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 2)
+    }
+    print(f"📊 Agregados recalculados: {json.dumps(summary)}")
+    return summary
+
+
+@report_cold_start
+@instrumented
 def sns_subscriber(event, context):
     """
     Função que é disparada pelo SNS Topic.
-    Apenas loga a mensagem recebida.
+    Loga a mensagem recebida.
     """
     try:
         print("=" * 80)
@@ -350,3 +2788,6 @@ def sns_subscriber(event, context):
             'statusCode': 500,
             'body': json.dumps({'error': str(e)})
         }
+
+
+init_timings['module_ms'] = round((time.perf_counter() - _MODULE_START) * 1000, 2)
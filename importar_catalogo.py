@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+"""
+Importação do Catálogo de Peças Automotivas
+Lê um arquivo CSV ou NDJSON em streaming (ex.: tabela de preços de um
+fornecedor), valida cada registro com validate_peca_data e faz upsert pelo
+código do fabricante: peças novas são criadas e as existentes recebem só os
+campos presentes no arquivo. Os lotes são processados em paralelo: as peças
+novas são gravadas com batch_writer e as existentes com um UpdateItem
+condicional que só altera os campos do arquivo, sem sobrescrever o que a API
+gravou nos demais. O progresso é salvo em um checkpoint, de modo que uma nova
+execução continua de onde a anterior parou.
+
+Uso:
+    python importar_catalogo.py fornecedor.csv
+    python importar_catalogo.py fornecedor.csv --delimitador ";" --workers 16
+    python importar_catalogo.py catalogo.ndjson --rejeitados rejeitados.ndjson
+    python importar_catalogo.py fornecedor.csv --recomecar
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from botocore.exceptions import ClientError
+
+import handler
+
+
+IMPORT_FIELDS = ['codigo', 'nome', 'preco', 'quantidade', 'descricao', 'fabricante']
+REQUIRED_FIELDS = ['nome', 'codigo', 'preco', 'quantidade']
+MAX_ERROS_EXIBIDOS = 10
+
+_local = threading.local()
+
+
+def worker_table():
+    """
+    Tabela de peças da thread atual. O resource do boto3 não é thread-safe,
+    então cada worker cria o seu (o client de baixo nível é compartilhado).
+    """
+    if handler.STORAGE_BACKEND == 'memory':
+        return handler.get_table()
+    table = getattr(_local, 'table', None)
+    if table is None:
+        import boto3
+        resource = boto3.session.Session().resource('dynamodb', **handler.get_aws_config())
+        table = _local.table = handler.instrument(resource.Table(handler.TABLE_NAME), 'dynamodb')
+    return table
+
+
+def detect_format(path):
+    """Formato pelo nome do arquivo (.csv ou NDJSON)"""
+    return 'csv' if path.lower().endswith('.csv') else 'ndjson'
+
+
+def read_rows(arquivo, formato, delimitador=','):
+    """
+    Gera os registros do arquivo, um por vez. No NDJSON as linhas saem como
+    texto e são decodificadas pelos workers, em paralelo.
+    """
+    if formato == 'csv':
+        yield from csv.DictReader(arquivo, delimiter=delimitador)
+        return
+    for line in arquivo:
+        if line.strip():
+            yield line
+
+
+def chunked(rows, size, start=0):
+    """Agrupa os registros em lotes de (número do registro, registro)"""
+    lote = []
+    for numero, row in enumerate(rows, start + 1):
+        lote.append((numero, row))
+        if len(lote) == size:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def clean_row(row):
+    """
+    Extrai e valida os campos de um registro.
+    Retorna (dados, mensagem_de_erro); os campos obrigatórios só são exigidos
+    depois, se o código ainda não existir na tabela.
+    """
+    if isinstance(row, str):
+        try:
+            row = json.loads(row)
+        except ValueError:
+            return None, "JSON inválido"
+    if not isinstance(row, dict):
+        return None, "Registro deve ser um objeto JSON"
+
+    data = {}
+    for field in IMPORT_FIELDS:
+        value = row.get(field)
+        if isinstance(value, str):
+            value = value.strip()
+        if value is None or (value == '' and field in REQUIRED_FIELDS):
+            continue
+        data[field] = value
+
+    if 'codigo' not in data:
+        return None, "Campos obrigatórios faltando: codigo"
+    data['codigo'] = str(data['codigo'])
+
+    is_valid, error_message = handler.validate_peca_data(data, is_update=True)
+    if not is_valid:
+        return None, error_message
+    return data, None
+
+
+def normalize(field, value):
+    """Valor comparável de um campo, independente de vir do arquivo ou da tabela"""
+    if field == 'preco':
+        try:
+            return Decimal(str(value))
+        except InvalidOperation:
+            return value
+    if field == 'quantidade':
+        return int(value)
+    return '' if value is None else str(value)
+
+
+def unchanged(existing, data):
+    """True se a peça já tem os valores do arquivo (não precisa ser gravada)"""
+    return all(normalize(field, existing.get(field)) == normalize(field, value) for field, value in data.items())
+
+
+def update_existing(existing, data):
+    """
+    Aplica os campos do arquivo a uma peça existente com um UpdateItem que
+    só altera esses campos (mesmas regras do update_item da API: versão
+    incrementada, estoque_baixo e fabricante vazio mantidos para os GSIs).
+    A peça vem do GSI, que é eventualmente consistente, então a escrita é
+    condicionada a ela ainda existir com o mesmo código.
+    Retorna a peça atualizada, ou None se ela foi removida ou mudou de código.
+    """
+    update_expression = "SET updated_at = :updated_at"
+    expression_values = {':updated_at': datetime.now().isoformat(), ':one': 1, ':codigo': existing['codigo']}
+    removed_attributes = []
+
+    if 'nome' in data:
+        update_expression += ", nome = :nome"
+        expression_values[':nome'] = data['nome']
+    if 'preco' in data:
+        update_expression += ", preco = :preco"
+        expression_values[':preco'] = Decimal(str(data['preco']))
+    if 'quantidade' in data:
+        update_expression += ", quantidade = :quantidade"
+        expression_values[':quantidade'] = int(data['quantidade'])
+        if handler.low_stock_flag(expression_values[':quantidade']):
+            update_expression += ", estoque_baixo = :estoque_baixo"
+            expression_values[':estoque_baixo'] = handler.LOW_STOCK_FLAG
+        else:
+            removed_attributes.append('estoque_baixo')
+    if 'descricao' in data:
+        update_expression += ", descricao = :descricao"
+        expression_values[':descricao'] = data['descricao']
+    if data.get('fabricante'):
+        update_expression += ", fabricante = :fabricante"
+        expression_values[':fabricante'] = data['fabricante']
+    elif 'fabricante' in data:
+        removed_attributes.append('fabricante')
+
+    update_expression += " ADD version :one"
+    if removed_attributes:
+        update_expression += " REMOVE " + ", ".join(removed_attributes)
+
+    try:
+        result = worker_table().update_item(
+            Key={'id': existing['id']},
+            UpdateExpression=update_expression,
+            ConditionExpression="attribute_exists(id) AND codigo = :codigo",
+            ExpressionAttributeValues=expression_values,
+            ReturnValues='ALL_NEW'
+        )
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
+            return None
+        raise
+    return result['Attributes']
+
+
+def import_chunk(lote, conhecidos):
+    """
+    Valida e grava um lote. 'conhecidos' traz as peças já gravadas por lotes
+    anteriores com os mesmos códigos (o GSI é eventualmente consistente).
+    """
+    resultado = {
+        'registros': len(lote),
+        'criados': 0,
+        'atualizados': 0,
+        'inalterados': 0,
+        'rejeitados': [],
+        'itens': {}
+    }
+
+    # Código repetido no mesmo lote: os campos se acumulam, vale o último valor
+    validos = {}
+    for numero, row in lote:
+        data, error_message = clean_row(row)
+        if error_message:
+            resultado['rejeitados'].append({'registro': numero, 'erro': error_message})
+            continue
+        anterior = validos.get(data['codigo'], (None, {}))[1]
+        validos[data['codigo']] = (numero, dict(anterior, **data))
+
+    novos = []
+    for codigo, (numero, data) in validos.items():
+        if codigo in conhecidos:
+            existing = conhecidos[codigo]
+        else:
+            existing = next(iter(handler.find_by_codigo(codigo)), None)
+
+        if existing is None:
+            is_valid, error_message = handler.validate_peca_data(data)
+            if not is_valid:
+                resultado['rejeitados'].append({'registro': numero, 'erro': error_message})
+                continue
+            item = handler.build_item(data)
+            novos.append(item)
+            resultado['criados'] += 1
+            resultado['itens'][codigo] = item
+        elif unchanged(existing, data):
+            resultado['inalterados'] += 1
+            resultado['itens'][codigo] = existing
+        else:
+            item = update_existing(existing, data)
+            if item is None:
+                resultado['rejeitados'].append({
+                    'registro': numero,
+                    'erro': f"A peça {codigo} foi removida ou mudou de código durante a importação"
+                })
+                continue
+            resultado['atualizados'] += 1
+            resultado['itens'][codigo] = item
+
+    # Peças novas não têm o que preservar: vão inteiras, em lotes de 25
+    if novos:
+        with worker_table().batch_writer() as batch:
+            for item in novos:
+                batch.put_item(Item=item)
+    return resultado
+
+
+def file_signature(path):
+    """Identifica a versão do arquivo importado (para não retomar outro arquivo)"""
+    stat = os.stat(path)
+    return {'arquivo': os.path.abspath(path), 'tamanho': stat.st_size, 'modificado': stat.st_mtime}
+
+
+def load_checkpoint(path, signature):
+    """Checkpoint salvo para o mesmo arquivo (ou None)"""
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as arquivo:
+        checkpoint = json.load(arquivo)
+    if {key: checkpoint.get(key) for key in signature} != signature:
+        raise ValueError(f"O checkpoint {path} é de outro arquivo ou de uma versão anterior dele "
+                         f"(use --recomecar para importar do início)")
+    return checkpoint
+
+
+class Importador:
+    """
+    Envia os lotes a um pool de workers e confirma os resultados na ordem do
+    arquivo: o checkpoint só avança até o último lote contínuo gravado, então
+    um lote interrompido é refeito na próxima execução (o upsert por código
+    torna a repetição inofensiva).
+    """
+
+    def __init__(self, workers, checkpoint_path, signature, checkpoint=None, rejeitados=None, intervalo=5):
+        self.workers = workers
+        self.checkpoint_path = checkpoint_path
+        self.signature = signature
+        self.rejeitados = rejeitados
+        self.intervalo = intervalo
+        checkpoint = checkpoint or {}
+        self.inicio = checkpoint.get('registros', 0)
+        self.totais = {
+            key: checkpoint.get(key, 0)
+            for key in ('registros', 'criados', 'atualizados', 'inalterados', 'rejeitados')
+        }
+        self.futures = {}      # future -> (índice do lote, códigos do lote)
+        self.concluidos = {}   # índice do lote -> resultado, aguardando os anteriores
+        self.pendentes = {}    # código -> future do último lote que o contém
+        self.proximo = 0
+        self.erros_exibidos = 0
+        self.started = time.perf_counter()
+        self.ultimo_relatorio = time.monotonic()
+
+    def run(self, lotes):
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            try:
+                for index, lote in enumerate(lotes):
+                    codigos = chunk_codigos(lote)
+                    conhecidos = self.wait_dependencies(codigos)
+                    while len(self.futures) >= self.workers * 2:
+                        self.collect(wait(self.futures, return_when=FIRST_COMPLETED).done)
+                    future = executor.submit(import_chunk, lote, conhecidos)
+                    self.futures[future] = (index, codigos)
+                    for codigo in codigos:
+                        self.pendentes[codigo] = future
+                while self.futures:
+                    self.collect(wait(self.futures, return_when=FIRST_COMPLETED).done)
+            finally:
+                for future in self.futures:
+                    future.cancel()
+        self.report(final=True)
+        return self.totais
+
+    def wait_dependencies(self, codigos):
+        """
+        Espera os lotes em andamento com os mesmos códigos e devolve as peças
+        que eles gravaram, para que o mesmo código não vire duas peças
+        e a última ocorrência no arquivo prevaleça.
+        """
+        conhecidos = {}
+        for codigo in codigos:
+            future = self.pendentes.get(codigo)
+            if future is None:
+                continue
+            itens = future.result()['itens']
+            if codigo in itens:
+                conhecidos[codigo] = itens[codigo]
+        return conhecidos
+
+    def collect(self, done):
+        for future in done:
+            index, codigos = self.futures.pop(future)
+            self.concluidos[index] = (future.result(), future, codigos)
+
+        advanced = False
+        while self.proximo in self.concluidos:
+            resultado, future, codigos = self.concluidos.pop(self.proximo)
+            for codigo in codigos:
+                if self.pendentes.get(codigo) is future:
+                    del self.pendentes[codigo]
+            for key in ('registros', 'criados', 'atualizados', 'inalterados'):
+                self.totais[key] += resultado[key]
+            self.totais['rejeitados'] += len(resultado['rejeitados'])
+            self.write_rejected(resultado['rejeitados'])
+            self.proximo += 1
+            advanced = True
+
+        if advanced:
+            self.save_checkpoint()
+        if time.monotonic() - self.ultimo_relatorio >= self.intervalo:
+            self.report()
+
+    def write_rejected(self, rejeitados):
+        for rejeitado in rejeitados:
+            if self.rejeitados:
+                self.rejeitados.write(json.dumps(rejeitado, ensure_ascii=False) + '\n')
+            elif self.erros_exibidos < MAX_ERROS_EXIBIDOS:
+                print(f"⚠️  Registro {rejeitado['registro']}: {rejeitado['erro']}")
+                self.erros_exibidos += 1
+        if self.rejeitados:
+            self.rejeitados.flush()
+
+    def save_checkpoint(self):
+        """Grava o checkpoint de forma atômica (arquivo temporário + rename)"""
+        checkpoint = dict(self.signature, **self.totais, atualizado_em=datetime.now().isoformat())
+        temporario = f"{self.checkpoint_path}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            json.dump(checkpoint, arquivo, indent=2)
+        os.replace(temporario, self.checkpoint_path)
+
+    def report(self, final=False):
+        self.ultimo_relatorio = time.monotonic()
+        duracao = time.perf_counter() - self.started
+        processados = self.totais['registros'] - self.inicio
+        taxa = processados / duracao if duracao > 0 else 0
+        prefixo = "✅ Concluído:" if final else "⏳"
+        print(f"{prefixo} {self.totais['registros']} registros ({taxa:.0f} registros/s nesta execução, "
+              f"{duracao:.1f}s) | {self.totais['criados']} criados, {self.totais['atualizados']} atualizados, "
+              f"{self.totais['inalterados']} inalterados, {self.totais['rejeitados']} rejeitados")
+
+
+def chunk_codigos(lote):
+    """Códigos presentes em um lote (sem validar; usado só para ordenar os lotes)"""
+    codigos = set()
+    for _, row in lote:
+        if isinstance(row, str):
+            try:
+                row = json.loads(row)
+            except ValueError:
+                continue
+        if isinstance(row, dict) and row.get('codigo') not in (None, ''):
+            codigos.add(str(row['codigo']).strip())
+    return codigos
+
+
+def main():
+    """
+    Função principal
+    """
+    parser = argparse.ArgumentParser(description="Importa peças de um arquivo CSV ou NDJSON (upsert por código)")
+    parser.add_argument('arquivo', help="Arquivo a importar (.csv ou NDJSON)")
+    parser.add_argument('--formato', choices=sorted(handler.EXPORT_FORMATS),
+                        help="Formato do arquivo (padrão: pela extensão)")
+    parser.add_argument('--delimitador', default=',', help="Separador do CSV (padrão: ',')")
+    parser.add_argument('--encoding', default='utf-8-sig', help="Codificação do arquivo (padrão: utf-8-sig)")
+    parser.add_argument('--lote', type=int, default=500, help="Registros por lote (padrão: 500)")
+    parser.add_argument('--workers', type=int, default=8, help="Lotes gravados em paralelo (padrão: 8)")
+    parser.add_argument('--checkpoint', help="Arquivo de checkpoint (padrão: <arquivo>.checkpoint.json)")
+    parser.add_argument('--recomecar', action='store_true', help="Ignora o checkpoint e importa do início")
+    parser.add_argument('--rejeitados', help="Grava os registros rejeitados (NDJSON) neste arquivo")
+    parser.add_argument('--intervalo', type=float, default=5,
+                        help="Segundos entre as mensagens de progresso (padrão: 5)")
+    args = parser.parse_args()
+
+    formato = args.formato or detect_format(args.arquivo)
+    checkpoint_path = args.checkpoint or f"{args.arquivo}.checkpoint.json"
+    signature = file_signature(args.arquivo)
+
+    checkpoint = None
+    if not args.recomecar:
+        try:
+            checkpoint = load_checkpoint(checkpoint_path, signature)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 1
+    inicio = checkpoint['registros'] if checkpoint else 0
+    if inicio:
+        print(f"↪️  Retomando a partir do registro {inicio + 1} ({checkpoint_path})")
+
+    rejeitados = None
+    if args.rejeitados:
+        rejeitados = open(args.rejeitados, 'a' if inicio else 'w', encoding='utf-8')
+    importador = Importador(args.workers, checkpoint_path, signature, checkpoint, rejeitados, args.intervalo)
+
+    try:
+        with open(args.arquivo, encoding=args.encoding, newline='') as arquivo:
+            rows = read_rows(arquivo, formato, args.delimitador)
+            # Registros já confirmados no checkpoint são só lidos e descartados
+            for _ in range(inicio):
+                if next(rows, None) is None:
+                    break
+            importador.run(chunked(rows, args.lote, inicio))
+    except KeyboardInterrupt:
+        importador.report()
+        print(f"⏸️  Interrompido. Execute novamente para continuar do registro {importador.totais['registros'] + 1}")
+        return 130
+    except Exception as e:
+        importador.report()
+        print(f"❌ Erro na importação: {str(e)}")
+        print(f"   Execute novamente para continuar do registro {importador.totais['registros'] + 1}")
+        return 1
+    finally:
+        if rejeitados:
+            rejeitados.close()
+
+    # Importação completa: a próxima execução começa do início
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,996 @@
+"""
+Backend em memória para DynamoDB e SNS
+Substitui a tabela, o client de baixo nível do DynamoDB e o client do SNS
+usados pelo handler.py, para executar e medir os handlers sem LocalStack nem AWS.
+
+Ativado com STORAGE_BACKEND=memory. Implementa o subconjunto da API usado
+pelo handler: put/get/update/delete com expressões de condição e atualização,
+scan (Limit, ExclusiveStartKey, Segment/TotalSegments, FilterExpression),
+query em índices secundários, batch_get_item, batch_write_item, batch_writer e
+transact_write_items (Put/Update/Delete/ConditionCheck, tudo ou nada),
+além de publish/publish_batch no SNS (as mensagens ficam gravadas em memória).
+As expressões precisam ser strings (não há suporte aos objetos Key()/Attr()).
+"""
+
+import bisect
+import contextlib
+import re
+import threading
+import zlib
+from decimal import Decimal
+
+from botocore.exceptions import ClientError
+
+
+_MISSING = object()
+
+
+# ---------------------------------------------------------------------------
+# Conversão entre o formato do DynamoDB ({'S': 'x'}) e tipos Python
+# ---------------------------------------------------------------------------
+
+def normalize(value):
+    """Converte um valor Python para os tipos que o DynamoDB armazena (números em Decimal)"""
+    if isinstance(value, bool) or value is None or isinstance(value, (str, bytes)):
+        return value
+    if isinstance(value, int):
+        return Decimal(value)
+    if isinstance(value, float):
+        raise TypeError("Float types are not supported. Use Decimal types instead.")
+    if isinstance(value, Decimal):
+        return value
+    if isinstance(value, dict):
+        return {key: normalize(element) for key, element in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize(element) for element in value]
+    if isinstance(value, set):
+        return set(normalize(element) for element in value)
+    raise TypeError(f"Tipo não suportado: {type(value).__name__}")
+
+
+def to_attribute(value):
+    """Converte um valor Python (normalizado) para o formato do DynamoDB"""
+    if isinstance(value, bool):
+        return {'BOOL': value}
+    if value is None:
+        return {'NULL': True}
+    if isinstance(value, str):
+        return {'S': value}
+    if isinstance(value, bytes):
+        return {'B': value}
+    if isinstance(value, Decimal):
+        return {'N': str(value)}
+    if isinstance(value, dict):
+        return {'M': {key: to_attribute(element) for key, element in value.items()}}
+    if isinstance(value, list):
+        return {'L': [to_attribute(element) for element in value]}
+    if isinstance(value, set):
+        elements = list(value)
+        if all(isinstance(element, str) for element in elements):
+            return {'SS': elements}
+        if all(isinstance(element, Decimal) for element in elements):
+            return {'NS': [str(element) for element in elements]}
+        return {'BS': elements}
+    raise TypeError(f"Tipo não suportado: {type(value).__name__}")
+
+
+def from_attribute(attribute):
+    """Converte um atributo no formato do DynamoDB para Python (números em Decimal)"""
+    (attribute_type, value), = attribute.items()
+    if attribute_type in ('S', 'B', 'BOOL'):
+        return value
+    if attribute_type == 'N':
+        return Decimal(value)
+    if attribute_type == 'NULL':
+        return None
+    if attribute_type == 'M':
+        return {key: from_attribute(element) for key, element in value.items()}
+    if attribute_type == 'L':
+        return [from_attribute(element) for element in value]
+    if attribute_type == 'SS' or attribute_type == 'BS':
+        return set(value)
+    if attribute_type == 'NS':
+        return set(Decimal(element) for element in value)
+    raise ValueError(f"Tipo DynamoDB não suportado: {attribute_type}")
+
+
+def to_image(item):
+    """Item Python -> item no formato do DynamoDB"""
+    return {key: to_attribute(value) for key, value in item.items()}
+
+
+def from_image(image):
+    """Item no formato do DynamoDB -> item Python"""
+    return {key: from_attribute(value) for key, value in image.items()}
+
+
+def client_error(code, message, operation, **extra):
+    """Cria um ClientError no mesmo formato devolvido pelo botocore"""
+    error_response = {'Error': {'Code': code, 'Message': message}}
+    error_response.update(extra)
+    return ClientError(error_response, operation)
+
+
+# ---------------------------------------------------------------------------
+# Expressões (ConditionExpression, KeyConditionExpression, FilterExpression,
+# UpdateExpression e ProjectionExpression)
+# ---------------------------------------------------------------------------
+
+_TOKEN_PATTERN = re.compile(r"""
+    \s*(?:
+        (?P<op><>|<=|>=|=|<|>)
+      | (?P<punct>[(),+\-\[\]])
+      | (?P<value>:[A-Za-z0-9_]+)
+      | (?P<name>\#?[A-Za-z_][A-Za-z0-9_]*(?:\.\#?[A-Za-z_][A-Za-z0-9_]*)*)
+    )""", re.VERBOSE)
+
+_KEYWORDS = {'AND', 'OR', 'NOT', 'BETWEEN', 'IN', 'SET', 'ADD', 'REMOVE', 'DELETE'}
+
+
+def tokenize(expression):
+    """Divide uma expressão em tokens (tipo, texto)"""
+    tokens = []
+    position = 0
+    expression = expression.strip()
+    while position < len(expression):
+        match = _TOKEN_PATTERN.match(expression, position)
+        if not match or match.end() == position:
+            raise ValueError(f"Expressão inválida perto de: {expression[position:]!r}")
+        position = match.end()
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == 'name' and text.upper() in _KEYWORDS:
+            kind, text = 'keyword', text.upper()
+        tokens.append((kind, text))
+    return tokens
+
+
+class _Parser:
+    """Parser descendente das expressões do DynamoDB"""
+
+    def __init__(self, expression, names, values):
+        self.tokens = tokenize(expression)
+        self.position = 0
+        self.names = names or {}
+        self.values = values or {}
+
+    # -- utilitários -------------------------------------------------------
+
+    def peek(self, offset=0):
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def take(self, kind=None, text=None):
+        token = self.peek()
+        if token[0] is None or (kind and token[0] != kind) or (text and token[1] != text):
+            raise ValueError(f"Esperado {text or kind}, encontrado {token[1]!r}")
+        self.position += 1
+        return token
+
+    def accept(self, kind, text=None):
+        token = self.peek()
+        if token[0] == kind and (text is None or token[1] == text):
+            self.position += 1
+            return True
+        return False
+
+    def done(self):
+        return self.position >= len(self.tokens)
+
+    def path(self):
+        """Caminho de atributo (com placeholders #nome resolvidos)"""
+        _, text = self.take('name')
+        parts = []
+        for part in text.split('.'):
+            if part.startswith('#'):
+                if part not in self.names:
+                    raise ValueError(f"ExpressionAttributeNames não define {part}")
+                part = self.names[part]
+            parts.append(part)
+        return tuple(parts)
+
+    def value(self):
+        _, text = self.take('value')
+        if text not in self.values:
+            raise ValueError(f"ExpressionAttributeValues não define {text}")
+        return self.values[text]
+
+    # -- operandos ----------------------------------------------------------
+
+    def operand(self):
+        """Retorna uma função item -> valor"""
+        kind, text = self.peek()
+        if kind == 'value':
+            value = self.value()
+            return lambda item: value
+        if kind == 'name' and text == 'size' and self.peek(1) == ('punct', '('):
+            self.position += 2
+            path = self.path()
+            self.take('punct', ')')
+
+            def size(item):
+                value = get_path(item, path)
+                if value is _MISSING:
+                    return _MISSING
+                if isinstance(value, (str, bytes, list, dict, set)):
+                    return Decimal(len(value))
+                return _MISSING
+            return size
+        path = self.path()
+        return lambda item: get_path(item, path)
+
+    # -- condições ----------------------------------------------------------
+
+    def condition(self):
+        left = self.conjunction()
+        while self.accept('keyword', 'OR'):
+            right = self.conjunction()
+            left = (lambda a, b: lambda item: a(item) or b(item))(left, right)
+        return left
+
+    def conjunction(self):
+        left = self.negation()
+        while self.accept('keyword', 'AND'):
+            right = self.negation()
+            left = (lambda a, b: lambda item: a(item) and b(item))(left, right)
+        return left
+
+    def negation(self):
+        if self.accept('keyword', 'NOT'):
+            inner = self.negation()
+            return lambda item: not inner(item)
+        return self.predicate()
+
+    def predicate(self):
+        if self.accept('punct', '('):
+            inner = self.condition()
+            self.take('punct', ')')
+            return inner
+
+        kind, text = self.peek()
+        if kind == 'name' and self.peek(1) == ('punct', '(') and text != 'size':
+            return self.function()
+
+        left = self.operand()
+        kind, text = self.peek()
+        if kind == 'op':
+            self.position += 1
+            right = self.operand()
+            return lambda item: compare(text, left(item), right(item))
+        if kind == 'keyword' and text == 'BETWEEN':
+            self.position += 1
+            low = self.operand()
+            self.take('keyword', 'AND')
+            high = self.operand()
+            return lambda item: (
+                compare('>=', left(item), low(item)) and compare('<=', left(item), high(item))
+            )
+        if kind == 'keyword' and text == 'IN':
+            self.position += 1
+            self.take('punct', '(')
+            options = [self.operand()]
+            while self.accept('punct', ','):
+                options.append(self.operand())
+            self.take('punct', ')')
+            return lambda item: any(compare('=', left(item), option(item)) for option in options)
+        raise ValueError(f"Condição inválida perto de {text!r}")
+
+    def function(self):
+        _, name = self.take('name')
+        self.take('punct', '(')
+        if name == 'attribute_exists':
+            path = self.path()
+            self.take('punct', ')')
+            return lambda item: get_path(item, path) is not _MISSING
+        if name == 'attribute_not_exists':
+            path = self.path()
+            self.take('punct', ')')
+            return lambda item: get_path(item, path) is _MISSING
+        if name in ('begins_with', 'contains'):
+            path = self.path()
+            self.take('punct', ',')
+            operand = self.operand()
+            self.take('punct', ')')
+            if name == 'begins_with':
+                def begins_with(item):
+                    value, prefix = get_path(item, path), operand(item)
+                    return isinstance(value, str) and isinstance(prefix, str) and value.startswith(prefix)
+                return begins_with
+
+            def contains(item):
+                value, element = get_path(item, path), operand(item)
+                if isinstance(value, str) and isinstance(element, str):
+                    return element in value
+                if isinstance(value, (list, set)):
+                    return element in value
+                return False
+            return contains
+        raise ValueError(f"Função não suportada: {name}")
+
+    # -- atualização --------------------------------------------------------
+
+    def update(self):
+        """Retorna lista de ações (tipo, caminho, função) e os caminhos alterados"""
+        actions = []
+        while not self.done():
+            _, clause = self.take('keyword')
+            while True:
+                if clause == 'SET':
+                    path = self.path()
+                    self.take('op', '=')
+                    actions.append(('SET', path, self.set_value()))
+                elif clause == 'REMOVE':
+                    actions.append(('REMOVE', self.path(), None))
+                elif clause in ('ADD', 'DELETE'):
+                    path = self.path()
+                    actions.append((clause, path, self.operand()))
+                else:
+                    raise ValueError(f"Cláusula não suportada: {clause}")
+                if not self.accept('punct', ','):
+                    break
+        return actions
+
+    def set_value(self):
+        kind, text = self.peek()
+        if kind == 'name' and text in ('if_not_exists', 'list_append') and self.peek(1) == ('punct', '('):
+            self.position += 2
+            if text == 'if_not_exists':
+                path = self.path()
+                self.take('punct', ',')
+                default = self.operand()
+                self.take('punct', ')')
+
+                def if_not_exists(item):
+                    value = get_path(item, path)
+                    return default(item) if value is _MISSING else value
+                result = if_not_exists
+            else:
+                first = self.operand()
+                self.take('punct', ',')
+                second = self.operand()
+                self.take('punct', ')')
+                result = lambda item: list(first(item)) + list(second(item))
+        else:
+            result = self.operand()
+
+        if self.peek() in (('punct', '+'), ('punct', '-')):
+            _, sign = self.take('punct')
+            right = self.set_value()
+            left = result
+            if sign == '+':
+                return lambda item: left(item) + right(item)
+            return lambda item: left(item) - right(item)
+        return result
+
+    def projection(self):
+        paths = [self.path()]
+        while self.accept('punct', ','):
+            paths.append(self.path())
+        return paths
+
+
+def get_path(item, path):
+    """Lê um atributo (possivelmente aninhado) ou retorna _MISSING"""
+    value = item
+    for part in path:
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def set_path(item, path, value):
+    target = item
+    for part in path[:-1]:
+        target = target.setdefault(part, {})
+    target[path[-1]] = value
+
+
+def remove_path(item, path):
+    target = item
+    for part in path[:-1]:
+        target = target.get(part)
+        if not isinstance(target, dict):
+            return
+    target.pop(path[-1], None)
+
+
+def compare(operator, left, right):
+    if left is _MISSING or right is _MISSING:
+        return operator == '<>' and not (left is _MISSING and right is _MISSING)
+    if operator == '=':
+        return left == right
+    if operator == '<>':
+        return left != right
+    if type(left) is not type(right):
+        return False
+    if operator == '<':
+        return left < right
+    if operator == '<=':
+        return left <= right
+    if operator == '>':
+        return left > right
+    return left >= right
+
+
+def parse_condition(expression, names=None, values=None):
+    """Compila uma ConditionExpression/FilterExpression em função item -> bool"""
+    parser = _Parser(expression, names, values)
+    condition = parser.condition()
+    if not parser.done():
+        raise ValueError(f"Expressão inválida: {expression!r}")
+    return condition
+
+
+def parse_update(expression, names=None, values=None):
+    """Compila uma UpdateExpression em lista de ações"""
+    return _Parser(expression, names, values).update()
+
+
+def parse_projection(expression, names=None):
+    """Compila uma ProjectionExpression em lista de caminhos"""
+    return _Parser(expression, names, None).projection()
+
+
+def project(item, paths):
+    """Mantém apenas os atributos pedidos na ProjectionExpression"""
+    if paths is None:
+        return item
+    result = {}
+    for path in paths:
+        value = get_path(item, path)
+        if value is not _MISSING:
+            set_path(result, path, value)
+    return result
+
+
+def apply_update(item, actions):
+    """Aplica as ações de uma UpdateExpression e retorna os caminhos alterados"""
+    changed = []
+    for action, path, operand in actions:
+        if action == 'SET':
+            set_path(item, path, normalize(operand(item)))
+        elif action == 'REMOVE':
+            remove_path(item, path)
+        elif action == 'ADD':
+            amount = normalize(operand(item))
+            current = get_path(item, path)
+            if current is _MISSING:
+                set_path(item, path, amount)
+            elif isinstance(current, set):
+                set_path(item, path, current | amount)
+            else:
+                set_path(item, path, current + amount)
+        elif action == 'DELETE':
+            current = get_path(item, path)
+            if isinstance(current, set):
+                remaining = current - normalize(operand(item))
+                if remaining:
+                    set_path(item, path, remaining)
+                else:
+                    remove_path(item, path)
+        changed.append(path)
+    return changed
+
+
+# ---------------------------------------------------------------------------
+# Tabela
+# ---------------------------------------------------------------------------
+
+class MemoryTable:
+    """
+    Tabela DynamoDB em memória com a mesma interface do boto3 Table (resource).
+    indexes: {nome_do_indice: (atributo_hash, atributo_range_ou_None)}
+    range_key: chave de ordenação da tabela (os itens passam a ser
+    identificados pela tupla (hash, range))
+    """
+
+    def __init__(self, name, key='id', indexes=None, range_key=None):
+        self.name = name
+        self.key = key
+        self.range_key = range_key
+        self.indexes = dict(indexes or {})
+        self.items = {}
+        self.sorted_keys = []
+        self.index_entries = {index: {} for index in self.indexes}
+        # Funções que recebem cada alteração como evento do DynamoDB Stream
+        self.stream_listeners = []
+        self.sequence_number = 0
+        self.lock = threading.RLock()
+
+    # -- estado interno -----------------------------------------------------
+
+    @property
+    def _key_attributes(self):
+        return (self.key, self.range_key) if self.range_key else (self.key,)
+
+    def _item_key(self, item):
+        """Valor interno da chave primária de um item (ou de uma chave)"""
+        if self.range_key:
+            return (item[self.key], item[self.range_key])
+        return item[self.key]
+
+    def _key_dict(self, key_value):
+        if self.range_key:
+            return {self.key: key_value[0], self.range_key: key_value[1]}
+        return {self.key: key_value}
+
+    def _key_of(self, key):
+        if set(key) != set(self._key_attributes):
+            raise client_error('ValidationException', 'The provided key element does not match the schema', 'GetItem')
+        return self._item_key(key)
+
+    def _start_key(self, kwargs, operation):
+        """ExclusiveStartKey validado como o DynamoDB faz (precisa da chave da tabela)"""
+        start_key = normalize(kwargs['ExclusiveStartKey'])
+        if not set(self._key_attributes) <= set(start_key):
+            raise client_error('ValidationException',
+                               'The provided starting key is invalid: '
+                               'The provided key element does not match the schema', operation)
+        return self._item_key(start_key)
+
+    def _store(self, item):
+        """Grava o item e atualiza índices e stream. Retorna o item anterior."""
+        key_value = self._item_key(item)
+        old_item = self.items.get(key_value)
+        if old_item is None:
+            bisect.insort(self.sorted_keys, key_value)
+        else:
+            self._unindex(old_item)
+        self.items[key_value] = item
+        self._index(item)
+        self._emit('MODIFY' if old_item is not None else 'INSERT', old_item, item)
+        return old_item
+
+    def _remove(self, key_value):
+        old_item = self.items.pop(key_value, None)
+        if old_item is not None:
+            del self.sorted_keys[bisect.bisect_left(self.sorted_keys, key_value)]
+            self._unindex(old_item)
+            self._emit('REMOVE', old_item, None)
+        return old_item
+
+    def _index(self, item):
+        for index, (hash_key, range_key) in self.indexes.items():
+            if hash_key in item and (range_key is None or range_key in item):
+                self.index_entries[index].setdefault(item[hash_key], set()).add(self._item_key(item))
+
+    def _unindex(self, item):
+        for index, (hash_key, _) in self.indexes.items():
+            bucket = self.index_entries[index].get(item.get(hash_key))
+            if bucket is not None:
+                bucket.discard(self._item_key(item))
+                if not bucket:
+                    del self.index_entries[index][item[hash_key]]
+
+    def _emit(self, event_name, old_item, new_item):
+        """Entrega um registro no formato do DynamoDB Stream aos listeners"""
+        if not self.stream_listeners:
+            return
+        self.sequence_number += 1
+        record = {
+            'eventName': event_name,
+            'dynamodb': {
+                'Keys': to_image(self._key_dict(self._item_key(new_item or old_item))),
+                'SequenceNumber': str(self.sequence_number)
+            }
+        }
+        if new_item is not None:
+            record['dynamodb']['NewImage'] = to_image(new_item)
+        if old_item is not None:
+            record['dynamodb']['OldImage'] = to_image(old_item)
+        # Como no DynamoDB Stream, falhas do consumidor não afetam a escrita
+        for listener in self.stream_listeners:
+            try:
+                listener({'Records': [record]})
+            except Exception as e:
+                print(f"Erro no listener do stream: {str(e)}")
+
+    def _check(self, operation, current, kwargs):
+        """Avalia a ConditionExpression e lança ConditionalCheckFailedException"""
+        expression = kwargs.get('ConditionExpression')
+        if not expression:
+            return
+        condition = parse_condition(
+            expression,
+            kwargs.get('ExpressionAttributeNames'),
+            normalize(kwargs.get('ExpressionAttributeValues') or {})
+        )
+        if not condition(current or {}):
+            extra = {}
+            if kwargs.get('ReturnValuesOnConditionCheckFailure') == 'ALL_OLD' and current:
+                extra['Item'] = to_image(current)
+            raise client_error('ConditionalCheckFailedException', 'The conditional request failed', operation, **extra)
+
+    def _returned(self, mode, old_item, new_item, changed=()):
+        if mode == 'ALL_NEW':
+            return dict(new_item)
+        if mode == 'ALL_OLD':
+            return dict(old_item) if old_item else None
+        if mode == 'UPDATED_NEW':
+            return project(new_item, list(changed))
+        if mode == 'UPDATED_OLD':
+            return project(old_item or {}, list(changed))
+        return None
+
+    # -- operações unitárias --------------------------------------------------
+
+    def put_item(self, Item, **kwargs):
+        item = normalize(Item)
+        missing = [attribute for attribute in self._key_attributes if attribute not in item]
+        if missing:
+            raise client_error('ValidationException', f'Missing the key {missing[0]} in the item', 'PutItem')
+        with self.lock:
+            current = self.items.get(self._item_key(item))
+            self._check('PutItem', current, kwargs)
+            old_item = self._store(item)
+        result = {}
+        if kwargs.get('ReturnValues') == 'ALL_OLD' and old_item:
+            result['Attributes'] = dict(old_item)
+        return result
+
+    def get_item(self, Key, ProjectionExpression=None, ExpressionAttributeNames=None, **kwargs):
+        key_value = self._key_of(normalize(Key))
+        with self.lock:
+            item = self.items.get(key_value)
+        if item is None:
+            return {}
+        paths = parse_projection(ProjectionExpression, ExpressionAttributeNames) if ProjectionExpression else None
+        return {'Item': project(dict(item), paths)}
+
+    def update_item(self, Key, UpdateExpression, **kwargs):
+        key = normalize(Key)
+        key_value = self._key_of(key)
+        actions = parse_update(
+            UpdateExpression,
+            kwargs.get('ExpressionAttributeNames'),
+            normalize(kwargs.get('ExpressionAttributeValues') or {})
+        )
+        with self.lock:
+            current = self.items.get(key_value)
+            self._check('UpdateItem', current, kwargs)
+            new_item = dict(current) if current else dict(key)
+            changed = apply_update(new_item, actions)
+            self._store(new_item)
+        attributes = self._returned(kwargs.get('ReturnValues', 'NONE'), current, new_item, changed)
+        return {'Attributes': attributes} if attributes is not None else {}
+
+    def delete_item(self, Key, **kwargs):
+        key_value = self._key_of(normalize(Key))
+        with self.lock:
+            current = self.items.get(key_value)
+            self._check('DeleteItem', current, kwargs)
+            old_item = self._remove(key_value)
+        if kwargs.get('ReturnValues') == 'ALL_OLD' and old_item:
+            return {'Attributes': dict(old_item)}
+        return {}
+
+    # -- leituras em massa ------------------------------------------------------
+
+    def _page(self, keys, kwargs):
+        """Avalia até Limit itens de 'keys' e monta a página no formato do boto3"""
+        limit = kwargs.get('Limit')
+        names = kwargs.get('ExpressionAttributeNames')
+        values = normalize(kwargs.get('ExpressionAttributeValues') or {})
+        filter_expression = kwargs.get('FilterExpression')
+        condition = parse_condition(filter_expression, names, values) if filter_expression else None
+        projection = kwargs.get('ProjectionExpression')
+        paths = parse_projection(projection, names) if projection else None
+
+        items = []
+        scanned = 0
+        last_key = None
+        for key_value in keys:
+            item = self.items.get(key_value)
+            if item is None:
+                continue
+            if limit is not None and scanned >= limit:
+                break
+            scanned += 1
+            last_key = key_value
+            if condition is None or condition(item):
+                items.append(project(dict(item), paths))
+        else:
+            last_key = None
+
+        result = {'Items': items, 'Count': len(items), 'ScannedCount': scanned}
+        if last_key is not None:
+            result['LastEvaluatedKey'] = self._key_dict(last_key)
+        return result
+
+    def scan(self, **kwargs):
+        with self.lock:
+            start = 0
+            if kwargs.get('ExclusiveStartKey'):
+                start_key = self._start_key(kwargs, 'Scan')
+                start = bisect.bisect_right(self.sorted_keys, start_key)
+            keys = self.sorted_keys[start:]
+
+            total_segments = kwargs.get('TotalSegments')
+            if total_segments:
+                segment = kwargs['Segment']
+                keys = [key for key in keys if segment_of(key, total_segments) == segment]
+
+            return self._page(keys, kwargs)
+
+    def query(self, KeyConditionExpression, IndexName=None, **kwargs):
+        names = kwargs.get('ExpressionAttributeNames')
+        values = normalize(kwargs.get('ExpressionAttributeValues') or {})
+        if not isinstance(KeyConditionExpression, str):
+            raise TypeError("O backend em memória só aceita expressões em string")
+        condition = parse_condition(KeyConditionExpression, names, values)
+
+        with self.lock:
+            if IndexName:
+                if IndexName not in self.indexes:
+                    raise client_error('ValidationException', f'The table does not have the specified index: {IndexName}', 'Query')
+                hash_key, range_key = self.indexes[IndexName]
+                hash_value = self._hash_value(KeyConditionExpression, hash_key, names, values)
+                candidates = self.index_entries[IndexName].get(hash_value, ())
+            elif self.range_key:
+                # Chave composta: itens da partição, contíguos em sorted_keys
+                range_key = None
+                hash_value = self._hash_value(KeyConditionExpression, self.key, names, values)
+                start = bisect.bisect_left(self.sorted_keys, (hash_value,))
+                candidates = []
+                for key_value in self.sorted_keys[start:]:
+                    if key_value[0] != hash_value:
+                        break
+                    candidates.append(key_value)
+            else:
+                range_key = None
+                candidates = [self._hash_value(KeyConditionExpression, self.key, names, values)]
+
+            matches = [
+                key_value for key_value in candidates
+                if key_value in self.items and condition(self.items[key_value])
+            ]
+            sort_key = (lambda key_value: (self.items[key_value][range_key], key_value)) if range_key else None
+            matches.sort(key=sort_key)
+            if kwargs.get('ScanIndexForward') is False:
+                matches.reverse()
+
+            if kwargs.get('ExclusiveStartKey'):
+                start_key = self._start_key(kwargs, 'Query')
+                if start_key in matches:
+                    matches = matches[matches.index(start_key) + 1:]
+
+            result = self._page(matches, kwargs)
+            if 'LastEvaluatedKey' in result and IndexName:
+                last_item = self.items[self._item_key(result['LastEvaluatedKey'])]
+                result['LastEvaluatedKey'].update(
+                    {attribute: last_item[attribute] for attribute in (hash_key, range_key) if attribute}
+                )
+            return result
+
+    @staticmethod
+    def _hash_value(expression, hash_key, names, values):
+        """Extrai o valor da chave de partição de uma KeyConditionExpression"""
+        aliases = [hash_key] + [alias for alias, name in (names or {}).items() if name == hash_key]
+        for alias in aliases:
+            match = re.search(rf'(?<![\w#]){re.escape(alias)}\s*=\s*(:\w+)', expression)
+            if match:
+                return values[match.group(1)]
+        raise client_error('ValidationException', f'Query condition missed key schema element: {hash_key}', 'Query')
+
+    def batch_writer(self, overwrite_by_pkeys=None):
+        return _MemoryBatchWriter(self)
+
+
+class _MemoryBatchWriter:
+    """Equivalente ao table.batch_writer() do boto3 (grava imediatamente)"""
+
+    def __init__(self, table):
+        self.table = table
+
+    def put_item(self, Item):
+        self.table.put_item(Item=Item)
+
+    def delete_item(self, Key):
+        self.table.delete_item(Key=Key)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+def segment_of(key_value, total_segments):
+    """Segmento (estável) de uma chave no Scan paralelo"""
+    return zlib.crc32(str(key_value).encode('utf-8')) % total_segments
+
+
+# ---------------------------------------------------------------------------
+# Clients
+# ---------------------------------------------------------------------------
+
+class MemoryDynamoDBClient:
+    """Client de baixo nível do DynamoDB (atributos no formato {'S': ...})"""
+
+    def _table(self, name):
+        return get_table(name)
+
+    @staticmethod
+    def _values(kwargs):
+        converted = dict(kwargs)
+        if 'ExpressionAttributeValues' in converted:
+            converted['ExpressionAttributeValues'] = from_image(converted['ExpressionAttributeValues'])
+        for key in ('ExclusiveStartKey', 'Key'):
+            if key in converted:
+                converted[key] = from_image(converted[key])
+        if 'Item' in converted:
+            converted['Item'] = from_image(converted['Item'])
+        return converted
+
+    @staticmethod
+    def _result(result):
+        converted = dict(result)
+        if 'Items' in converted:
+            converted['Items'] = [to_image(item) for item in converted['Items']]
+        for key in ('Item', 'Attributes', 'LastEvaluatedKey'):
+            if converted.get(key) is not None:
+                converted[key] = to_image(converted[key])
+        return converted
+
+    def scan(self, TableName, **kwargs):
+        return self._result(self._table(TableName).scan(**self._values(kwargs)))
+
+    def query(self, TableName, **kwargs):
+        return self._result(self._table(TableName).query(**self._values(kwargs)))
+
+    def get_item(self, TableName, **kwargs):
+        return self._result(self._table(TableName).get_item(**self._values(kwargs)))
+
+    def put_item(self, TableName, **kwargs):
+        return self._result(self._table(TableName).put_item(**self._values(kwargs)))
+
+    def update_item(self, TableName, **kwargs):
+        return self._result(self._table(TableName).update_item(**self._values(kwargs)))
+
+    def delete_item(self, TableName, **kwargs):
+        return self._result(self._table(TableName).delete_item(**self._values(kwargs)))
+
+    def batch_get_item(self, RequestItems, **kwargs):
+        responses = {}
+        for table_name, request in RequestItems.items():
+            table = self._table(table_name)
+            names = request.get('ExpressionAttributeNames')
+            projection = request.get('ProjectionExpression')
+            paths = parse_projection(projection, names) if projection else None
+            found = responses.setdefault(table_name, [])
+            for key in request['Keys']:
+                item = table.get_item(Key=from_image(key)).get('Item')
+                if item is not None:
+                    found.append(to_image(project(item, paths)))
+        return {'Responses': responses, 'UnprocessedKeys': {}}
+
+    def batch_write_item(self, RequestItems, **kwargs):
+        for table_name, requests in RequestItems.items():
+            table = self._table(table_name)
+            for request in requests:
+                if 'PutRequest' in request:
+                    table.put_item(Item=from_image(request['PutRequest']['Item']))
+                else:
+                    table.delete_item(Key=from_image(request['DeleteRequest']['Key']))
+        return {'UnprocessedItems': {}}
+
+    def transact_write_items(self, TransactItems, **kwargs):
+        operations = []
+        for entry in TransactItems:
+            (action, request), = entry.items()
+            table = self._table(request['TableName'])
+            request = self._values({key: value for key, value in request.items() if key != 'TableName'})
+            key_value = table._item_key(request['Item']) if action == 'Put' else table._key_of(request['Key'])
+            operations.append((action, table, key_value, request))
+
+        tables = sorted({id(table): table for _, table, _, _ in operations}.values(), key=lambda table: table.name)
+        with contextlib.ExitStack() as stack:
+            for table in tables:
+                stack.enter_context(table.lock)
+
+            # Todas as condições são avaliadas antes de qualquer escrita
+            reasons = []
+            for action, table, key_value, request in operations:
+                try:
+                    table._check(action, table.items.get(key_value), request)
+                    reasons.append({'Code': 'None'})
+                except ClientError as e:
+                    reason = {'Code': 'ConditionalCheckFailed', 'Message': e.response['Error']['Message']}
+                    if 'Item' in e.response:
+                        reason['Item'] = e.response['Item']
+                    reasons.append(reason)
+            if any(reason['Code'] != 'None' for reason in reasons):
+                codes = ', '.join(reason['Code'] for reason in reasons)
+                raise client_error('TransactionCanceledException',
+                                   f'Transaction cancelled, please refer cancellation reasons for specific reasons [{codes}]',
+                                   'TransactWriteItems', CancellationReasons=reasons)
+
+            for action, table, key_value, request in operations:
+                if action == 'Put':
+                    table.put_item(Item=request['Item'])
+                elif action == 'Delete':
+                    table.delete_item(Key=request['Key'])
+                elif action == 'Update':
+                    table.update_item(
+                        Key=request['Key'],
+                        UpdateExpression=request['UpdateExpression'],
+                        ExpressionAttributeNames=request.get('ExpressionAttributeNames'),
+                        ExpressionAttributeValues=request.get('ExpressionAttributeValues')
+                    )
+        return {}
+
+
+class MemorySNSClient:
+    """Client do SNS que grava as mensagens publicadas (e repassa aos assinantes)"""
+
+    def __init__(self):
+        self.messages = []
+        self.subscribers = []
+        self.lock = threading.Lock()
+
+    def subscribe(self, callback):
+        """Registra uma função que recebe eventos no formato do SNS -> Lambda"""
+        self.subscribers.append(callback)
+
+    def _deliver(self, topic_arn, message, subject):
+        with self.lock:
+            self.messages.append({'TopicArn': topic_arn, 'Message': message, 'Subject': subject})
+            message_id = f'memory-{len(self.messages)}'
+        if self.subscribers:
+            event = {'Records': [{
+                'EventSource': 'aws:sns',
+                'Sns': {'MessageId': message_id, 'TopicArn': topic_arn, 'Subject': subject, 'Message': message}
+            }]}
+            for subscriber in self.subscribers:
+                try:
+                    subscriber(event)
+                except Exception as e:
+                    print(f"Erro no assinante do SNS: {str(e)}")
+        return message_id
+
+    def publish(self, TopicArn, Message, Subject=None, **kwargs):
+        return {'MessageId': self._deliver(TopicArn, Message, Subject)}
+
+    def publish_batch(self, TopicArn, PublishBatchRequestEntries, **kwargs):
+        if len(PublishBatchRequestEntries) > 10:
+            raise client_error('TooManyEntriesInBatchRequest', 'The batch request contains more entries than permissible.', 'PublishBatch')
+        successful = [
+            {'Id': entry['Id'], 'MessageId': self._deliver(TopicArn, entry['Message'], entry.get('Subject'))}
+            for entry in PublishBatchRequestEntries
+        ]
+        return {'Successful': successful, 'Failed': []}
+
+
+# ---------------------------------------------------------------------------
+# Registro global (compartilhado por todos os handlers do processo)
+# ---------------------------------------------------------------------------
+
+_tables = {}
+_tables_lock = threading.Lock()
+dynamodb_client = MemoryDynamoDBClient()
+sns_client = MemorySNSClient()
+
+
+def ensure_table(name, indexes=None, key='id', range_key=None):
+    """Cria a tabela na primeira chamada e a retorna"""
+    with _tables_lock:
+        if name not in _tables:
+            _tables[name] = MemoryTable(name, key=key, indexes=indexes, range_key=range_key)
+        return _tables[name]
+
+
+def get_table(name):
+    table = _tables.get(name)
+    if table is None:
+        raise client_error('ResourceNotFoundException', f'Requested resource not found: Table: {name} not found', 'DescribeTable')
+    return table
+
+
+def reset():
+    """Apaga todas as tabelas e mensagens (útil entre benchmarks)"""
+    with _tables_lock:
+        _tables.clear()
+    with sns_client.lock:
+        sns_client.messages.clear()
+    sns_client.subscribers.clear()
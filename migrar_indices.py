@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Migração das Peças para os Índices de Fabricante e Estoque Baixo
+Prepara os itens gravados antes desses GSIs:
+  - remove o atributo 'fabricante' quando ele é uma string vazia (o create_item
+    original sempre gravava fabricante: ''), porque string vazia não pode ser
+    chave de índice e as escritas nesses itens seriam rejeitadas;
+  - liga/desliga o atributo esparso 'estoque_baixo' conforme a quantidade,
+    para que as peças antigas apareçam no índice de estoque baixo.
+Não altera a versão das peças. Cada escrita é condicionada aos valores lidos,
+então uma escrita concorrente da API vence. Pode ser executado mais de uma vez.
+
+Uso (ordem completa no README, "Migração dos índices"):
+    python migrar_indices.py --simular
+    python migrar_indices.py --workers 16
+"""
+
+import argparse
+import contextlib
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+import handler
+
+
+def plan_update(item):
+    """
+    Monta a atualização de um item (kwargs do update_item do client de baixo
+    nível) ou None se ele já está no formato esperado pelos índices.
+    """
+    names = {}
+    values = {}
+    set_actions = []
+    remove_actions = []
+    conditions = []
+
+    if item.get('fabricante') == '':
+        names['#fabricante'] = 'fabricante'
+        values[':vazio'] = {'S': ''}
+        remove_actions.append('#fabricante')
+        conditions.append('#fabricante = :vazio')
+
+    quantidade = item.get('quantidade')
+    if isinstance(quantidade, int):
+        flag = handler.low_stock_flag(quantidade)
+        if flag != item.get('estoque_baixo'):
+            names['#estoque_baixo'] = 'estoque_baixo'
+            names['#quantidade'] = 'quantidade'
+            values[':quantidade'] = {'N': str(quantidade)}
+            conditions.append('#quantidade = :quantidade')
+            if flag:
+                values[':estoque_baixo'] = {'S': flag}
+                set_actions.append('#estoque_baixo = :estoque_baixo')
+            else:
+                remove_actions.append('#estoque_baixo')
+
+    if not set_actions and not remove_actions:
+        return None
+
+    update_expression = []
+    if set_actions:
+        update_expression.append('SET ' + ', '.join(set_actions))
+    if remove_actions:
+        update_expression.append('REMOVE ' + ', '.join(remove_actions))
+    return {
+        'TableName': handler.TABLE_NAME,
+        'Key': {'id': {'S': item['id']}},
+        'UpdateExpression': ' '.join(update_expression),
+        'ConditionExpression': ' AND '.join(conditions),
+        'ExpressionAttributeNames': names,
+        'ExpressionAttributeValues': values
+    }
+
+
+def apply_update(update):
+    """Aplica uma atualização; False se o item mudou depois da leitura"""
+    try:
+        handler.get_dynamodb_client().update_item(**update)
+        return True
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
+            return False
+        raise
+
+
+def migrar(workers, segmentos, simular=False):
+    """Percorre a tabela com scan paralelo e corrige os itens. Retorna os totais."""
+    totais = {'lidos': 0, 'corrigidos': 0, 'alterados_durante': 0}
+    fields = ['id', 'fabricante', 'quantidade', 'estoque_baixo']
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for page in handler.parallel_scan(segmentos, **handler.projection_kwargs(fields)):
+            totais['lidos'] += len(page)
+            updates = [update for update in map(plan_update, page) if update]
+            if simular:
+                totais['corrigidos'] += len(updates)
+                continue
+            for applied in executor.map(apply_update, updates):
+                totais['corrigidos' if applied else 'alterados_durante'] += 1
+
+    return totais
+
+
+def main():
+    """
+    Função principal
+    """
+    parser = argparse.ArgumentParser(description="Prepara as peças antigas para os GSIs de fabricante e estoque baixo")
+    parser.add_argument('--workers', type=int, default=8, help="Escritas em paralelo (padrão: 8)")
+    parser.add_argument('--segmentos', type=int, default=handler.SCAN_SEGMENTS,
+                        help=f"Segmentos do scan paralelo (padrão: {handler.SCAN_SEGMENTS})")
+    parser.add_argument('--simular', action='store_true', help="Só conta os itens que seriam corrigidos")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(sys.stderr):
+        totais = migrar(args.workers, args.segmentos, args.simular)
+    duracao = time.perf_counter() - inicio
+
+    acao = "a corrigir" if args.simular else "corrigidos"
+    print(f"✅ {totais['lidos']} itens lidos, {totais['corrigidos']} {acao}, "
+          f"{totais['alterados_durante']} alterados pela API durante a migração ({duracao:.2f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Reconstrução do Índice de Busca Textual
+Grava na tabela -search as entradas de todas as peças, lidas com scan
+paralelo da tabela de peças. Usado para popular o índice na primeira
+implantação (ou depois de mudar SEARCH_WEIGHTS); depois o statsAggregator o
+mantém pelo DynamoDB Stream.
+Cada segmento do scan salva o seu cursor (LastEvaluatedKey) no checkpoint
+depois de gravar a página, então uma nova execução continua de onde a
+anterior parou. Regravar uma entrada é inofensivo (mesma chave e peso).
+Não remove entradas órfãs: a busca já descarta as que não batem com a peça lida.
+
+Uso:
+    python reindexar_busca.py
+    python reindexar_busca.py --segmentos 32
+    python reindexar_busca.py --recomecar
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import handler
+
+
+def load_checkpoint(path, segmentos):
+    """Checkpoint salvo para a mesma tabela e número de segmentos (ou None)"""
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as arquivo:
+        checkpoint = json.load(arquivo)
+    if checkpoint.get('tabela') != handler.TABLE_NAME or checkpoint.get('segmentos') != segmentos:
+        raise ValueError(f"O checkpoint {path} é da tabela {checkpoint.get('tabela')} com "
+                         f"{checkpoint.get('segmentos')} segmentos (use os mesmos --segmentos "
+                         f"ou --recomecar)")
+    return checkpoint
+
+
+class Reindexador:
+    """
+    Um worker por segmento do scan. Depois de cada página gravada no índice,
+    o cursor do segmento vai para o checkpoint (gravação atômica), de modo que
+    uma interrupção só refaz a página em andamento de cada segmento.
+    """
+
+    def __init__(self, segmentos, checkpoint_path, checkpoint=None, intervalo=5):
+        self.segmentos = segmentos
+        self.checkpoint_path = checkpoint_path
+        self.intervalo = intervalo
+        checkpoint = checkpoint or {}
+        # Cursor de cada segmento: None = do início, 'fim' = concluído
+        self.cursores = checkpoint.get('cursores') or {str(segment): None for segment in range(segmentos)}
+        self.totais = {key: checkpoint.get(key, 0) for key in ('pecas', 'entradas')}
+        self.inicio = dict(self.totais)
+        self.lock = threading.Lock()
+        self.stop = threading.Event()
+        self.started = time.perf_counter()
+        self.ultimo_relatorio = time.monotonic()
+
+    def run(self):
+        pendentes = [int(segment) for segment, cursor in self.cursores.items() if cursor != 'fim']
+        if not pendentes:
+            return self.totais
+        with ThreadPoolExecutor(max_workers=len(pendentes)) as executor:
+            futures = [executor.submit(self.index_segment, segment) for segment in pendentes]
+            try:
+                for future in futures:
+                    future.result()
+            except BaseException:
+                self.stop.set()
+                raise
+        self.report(final=True)
+        return self.totais
+
+    def index_segment(self, segment):
+        """Lê um segmento página a página e grava as entradas de busca de cada uma"""
+        client = handler.get_dynamodb_client()
+        scan_kwargs = dict(
+            handler.projection_kwargs(['id'] + list(handler.SEARCH_WEIGHTS)),
+            TableName=handler.TABLE_NAME
+        )
+        if self.segmentos > 1:
+            scan_kwargs['Segment'] = segment
+            scan_kwargs['TotalSegments'] = self.segmentos
+        cursor = self.cursores[str(segment)]
+        if cursor:
+            scan_kwargs['ExclusiveStartKey'] = cursor
+
+        while not self.stop.is_set():
+            result = client.scan(**scan_kwargs)
+            changes = {}
+            items = [handler.deserialize_item(item) for item in result.get('Items', [])]
+            for item in items:
+                changes.update(handler.search_postings(item))
+
+            unprocessed = handler.batch_write_requests(handler.SEARCH_TABLE, handler.search_write_requests(changes))
+            if unprocessed:
+                raise RuntimeError(f"{len(unprocessed)} entradas do segmento {segment} não foram gravadas")
+
+            last_key = result.get('LastEvaluatedKey')
+            self.advance(segment, last_key or 'fim', len(items), len(changes))
+            if not last_key:
+                return
+            scan_kwargs['ExclusiveStartKey'] = last_key
+
+    def advance(self, segment, cursor, pecas, entradas):
+        with self.lock:
+            self.cursores[str(segment)] = cursor
+            self.totais['pecas'] += pecas
+            self.totais['entradas'] += entradas
+            self.save_checkpoint()
+            if time.monotonic() - self.ultimo_relatorio >= self.intervalo:
+                self.report()
+
+    def save_checkpoint(self):
+        """Grava o checkpoint de forma atômica (arquivo temporário + rename)"""
+        checkpoint = dict(
+            tabela=handler.TABLE_NAME,
+            segmentos=self.segmentos,
+            cursores=self.cursores,
+            **self.totais,
+            atualizado_em=datetime.now().isoformat()
+        )
+        temporario = f"{self.checkpoint_path}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            json.dump(checkpoint, arquivo, indent=2)
+        os.replace(temporario, self.checkpoint_path)
+
+    def report(self, final=False):
+        self.ultimo_relatorio = time.monotonic()
+        duracao = time.perf_counter() - self.started
+        processadas = self.totais['pecas'] - self.inicio['pecas']
+        taxa = processadas / duracao if duracao > 0 else 0
+        concluidos = sum(1 for cursor in self.cursores.values() if cursor == 'fim')
+        prefixo = "✅ Concluído:" if final else "⏳"
+        print(f"{prefixo} {self.totais['pecas']} peças, {self.totais['entradas']} entradas "
+              f"({taxa:.0f} peças/s nesta execução, {duracao:.1f}s) | "
+              f"{concluidos}/{self.segmentos} segmentos concluídos", file=sys.stderr)
+
+
+def main():
+    """
+    Função principal
+    """
+    parser = argparse.ArgumentParser(description="Popula o índice de busca textual a partir da tabela de peças")
+    parser.add_argument('--segmentos', type=int, default=handler.SCAN_SEGMENTS,
+                        help=f"Segmentos do scan paralelo (padrão: {handler.SCAN_SEGMENTS})")
+    parser.add_argument('--checkpoint', help="Arquivo de checkpoint (padrão: <tabela>.busca.checkpoint.json)")
+    parser.add_argument('--recomecar', action='store_true', help="Ignora o checkpoint e reindexa do início")
+    parser.add_argument('--intervalo', type=float, default=5,
+                        help="Segundos entre as mensagens de progresso (padrão: 5)")
+    args = parser.parse_args()
+
+    checkpoint_path = args.checkpoint or f"{handler.TABLE_NAME}.busca.checkpoint.json"
+    checkpoint = None
+    if not args.recomecar:
+        try:
+            checkpoint = load_checkpoint(checkpoint_path, args.segmentos)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 1
+    if checkpoint:
+        print(f"↪️  Retomando de {checkpoint_path} ({checkpoint.get('pecas', 0)} peças já indexadas)")
+
+    reindexador = Reindexador(args.segmentos, checkpoint_path, checkpoint, args.intervalo)
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            reindexador.run()
+    except KeyboardInterrupt:
+        reindexador.report()
+        print("⏸️  Interrompido. Execute novamente para continuar")
+        return 130
+    except Exception as e:
+        reindexador.report()
+        print(f"❌ Erro na reindexação: {str(e)}")
+        print("   Execute novamente para continuar")
+        return 1
+
+    # Reindexação completa: a próxima execução começa do início
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Servidor HTTP Local da API de Peças Automotivas
+Lê as rotas HTTP do serverless.yml, monta eventos no formato do API Gateway
+(proxy) e chama os handlers do handler.py diretamente no mesmo processo,
+sem passar pela emulação de API Gateway/Lambda do LocalStack.
+
+Uso:
+    python servidor_local.py                      # DynamoDB/SNS do LocalStack
+    python servidor_local.py --backend memory     # sem nenhum serviço externo
+    python servidor_local.py --backend memory --eventos --porta 8000
+    python servidor_local.py --backend memory --metricas | python coletor_metricas.py
+
+Depois:
+    python teste_api.py --base-url http://localhost:8000
+    python teste_api.py --base-url http://localhost:8000 --carga --concorrencia 20
+"""
+
+import argparse
+import base64
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+
+SERVERLESS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'serverless.yml')
+
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type,If-Match,If-None-Match,Idempotency-Key,Accept-Encoding'
+}
+
+
+def load_routes(path=SERVERLESS_FILE):
+    """
+    Extrai as rotas HTTP da seção 'functions' do serverless.yml.
+    Retorna uma lista de dicts com função, handler, método e caminho.
+    O serverless.yml usa tags do CloudFormation (!Ref, !GetAtt), então em vez
+    de um parser YAML completo lemos apenas as chaves necessárias.
+    """
+    routes = []
+    in_functions = False
+    function_name = handler_name = method = route_path = None
+
+    def flush():
+        if function_name and handler_name and method and route_path:
+            routes.append({
+                'function': function_name,
+                'handler': handler_name,
+                'method': method.upper(),
+                'path': '/' + route_path.strip('/')
+            })
+
+    with open(path, encoding='utf-8') as arquivo:
+        for raw_line in arquivo:
+            line = raw_line.rstrip()
+            if not line.strip() or line.lstrip().startswith('#'):
+                continue
+            indent = len(line) - len(line.lstrip())
+            text = line.strip()
+
+            if indent == 0:
+                flush()
+                function_name = handler_name = method = route_path = None
+                in_functions = text == 'functions:'
+                continue
+            if not in_functions:
+                continue
+
+            if indent == 2 and text.endswith(':'):
+                flush()
+                function_name, handler_name, method, route_path = text[:-1], None, None, None
+            elif text.startswith('handler:'):
+                handler_name = text.split(':', 1)[1].strip()
+            elif text.startswith('- http:'):
+                flush()
+                method = route_path = None
+            elif text.startswith('path:'):
+                route_path = text.split(':', 1)[1].strip()
+            elif text.startswith('method:'):
+                method = text.split(':', 1)[1].strip()
+        flush()
+
+    return routes
+
+
+def compile_routes(routes, handler_module):
+    """
+    Converte 'items/{id}' em regex e associa cada rota à função do handler.
+    Rotas estáticas (ex.: /items/export) têm prioridade sobre /items/{id},
+    como no API Gateway.
+    """
+    compiled = []
+    for route in routes:
+        module_name, _, function = route['handler'].rpartition('.')
+        if module_name != handler_module.__name__:
+            continue
+        pattern = ''.join(
+            f'(?P<{part[1:-1]}>[^/]+)' if part.startswith('{') else re.escape(part)
+            for part in re.split(r'(\{\w+\})', route['path'])
+        )
+        compiled.append({
+            **route,
+            'regex': re.compile(f'^{pattern}$'),
+            'function_ref': getattr(handler_module, function),
+            'params': route['path'].count('{')
+        })
+    compiled.sort(key=lambda route: route['params'])
+    return compiled
+
+
+def build_event(method, route, path, path_params, query, headers, body):
+    """
+    Monta o evento no formato do API Gateway REST (integração Lambda proxy)
+    """
+    multi_query = parse_qs(query, keep_blank_values=True)
+    is_base64 = False
+    if body:
+        try:
+            body = body.decode('utf-8')
+        except UnicodeDecodeError:
+            body = base64.b64encode(body).decode('ascii')
+            is_base64 = True
+    else:
+        body = None
+
+    return {
+        'resource': route['path'],
+        'path': path,
+        'httpMethod': method,
+        'headers': headers,
+        'multiValueHeaders': {key: [value] for key, value in headers.items()},
+        'queryStringParameters': {key: values[-1] for key, values in multi_query.items()} or None,
+        'multiValueQueryStringParameters': multi_query or None,
+        'pathParameters': path_params or None,
+        'stageVariables': None,
+        'requestContext': {
+            'resourcePath': route['path'],
+            'httpMethod': method,
+            'path': path,
+            'stage': 'local',
+            'requestId': str(uuid.uuid4()),
+            'requestTimeEpoch': int(time.time() * 1000)
+        },
+        'body': body,
+        'isBase64Encoded': is_base64
+    }
+
+
+class LambdaContext:
+    """Contexto mínimo no formato do objeto 'context' do Lambda"""
+    def __init__(self, function_name):
+        self.function_name = function_name
+        self.aws_request_id = str(uuid.uuid4())
+        self.memory_limit_in_mb = 1024
+
+    def get_remaining_time_in_millis(self):
+        return 30000
+
+
+def make_request_handler(routes, verbose):
+    """Cria a classe de tratamento de requisições com as rotas carregadas"""
+
+    class ApiGatewayHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'      # keep-alive
+        disable_nagle_algorithm = True     # respostas pequenas sem atraso do Nagle
+        server_version = 'PecasLocal/1.0'
+
+        def log_message(self, format, *args):
+            if verbose:
+                super().log_message(format, *args)
+
+        def send_lambda_response(self, status_code, headers, body):
+            self.send_response(status_code)
+            for key, value in headers.items():
+                self.send_header(key, str(value))
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if self.command != 'HEAD':
+                self.wfile.write(body)
+
+        def dispatch(self):
+            url = urlsplit(self.path)
+            path = unquote(url.path)
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length) if length else b''
+
+            if self.command == 'OPTIONS':
+                self.send_lambda_response(200, CORS_HEADERS, b'')
+                return
+
+            path_matched = False
+            for route in routes:
+                match = route['regex'].match(path)
+                if not match:
+                    continue
+                path_matched = True
+                if route['method'] != self.command:
+                    continue
+
+                event = build_event(self.command, route, path, match.groupdict(), url.query,
+                                    dict(self.headers.items()), body)
+                try:
+                    result = route['function_ref'](event, LambdaContext(route['function']))
+                except Exception as e:
+                    print(f"❌ Erro não tratado em {route['handler']}: {e}", file=sys.stderr)
+                    result = {'statusCode': 502, 'body': json.dumps({'message': 'Internal server error'})}
+
+                response_body = result.get('body') or ''
+                if result.get('isBase64Encoded'):
+                    response_body = base64.b64decode(response_body)
+                elif isinstance(response_body, str):
+                    response_body = response_body.encode('utf-8')
+                self.send_lambda_response(result.get('statusCode', 200), result.get('headers') or {}, response_body)
+                return
+
+            # Mesmas respostas do API Gateway para rota/método inexistente
+            status_code = 403 if not path_matched else 405
+            message = 'Missing Authentication Token' if not path_matched else 'Method Not Allowed'
+            self.send_lambda_response(status_code, {'Content-Type': 'application/json'},
+                                      json.dumps({'message': message}).encode('utf-8'))
+
+        do_GET = do_POST = do_PUT = do_DELETE = do_PATCH = do_HEAD = do_OPTIONS = dispatch
+
+    return ApiGatewayHandler
+
+
+def start_event_pipeline(handler_module, publish_events):
+    """
+    No backend em memória, reproduz o fluxo assíncrono da AWS em uma thread
+    separada, para não atrasar as respostas HTTP: alterações da tabela ->
+    stats_aggregator (agregados, contador de alterações e índice de busca,
+    sempre) e, com publish_events, stream_publisher -> SNS -> sns_subscriber.
+    Um erro em um consumidor é registrado e não derruba a thread.
+    """
+    import memory_backend
+
+    records = queue.Queue()
+
+    def worker():
+        while True:
+            event = records.get()
+            try:
+                handler_module.stats_aggregator(event, LambdaContext('statsAggregator'))
+            except Exception as e:
+                print(f"❌ Erro no stats_aggregator: {e}", file=sys.stderr)
+            if publish_events:
+                try:
+                    handler_module.stream_publisher(event, LambdaContext('streamPublisher'))
+                except Exception as e:
+                    print(f"❌ Erro no stream_publisher: {e}", file=sys.stderr)
+
+    threading.Thread(target=worker, name='dynamodb-stream', daemon=True).start()
+    handler_module.get_table().stream_listeners.append(records.put)
+    if publish_events:
+        memory_backend.sns_client.subscribe(
+            lambda event: handler_module.sns_subscriber(event, LambdaContext('snsSubscriber'))
+        )
+
+
+def main():
+    """
+    Função principal
+    """
+    parser = argparse.ArgumentParser(description="Servidor HTTP local para os handlers da API")
+    parser.add_argument('--host', default='127.0.0.1', help="Endereço (padrão: 127.0.0.1)")
+    parser.add_argument('--porta', type=int, default=8000, help="Porta (padrão: 8000)")
+    parser.add_argument('--backend', choices=['aws', 'memory'], default=os.environ.get('STORAGE_BACKEND', 'aws'),
+                        help="Armazenamento: 'aws' (LocalStack/AWS) ou 'memory' (em memória)")
+    parser.add_argument('--eventos', action='store_true',
+                        help="No backend em memória, executa stream_publisher e sns_subscriber")
+    parser.add_argument('--metricas', action='store_true',
+                        help="Liga METRICS_ENABLED: uma linha EMF por invocação (ver coletor_metricas.py)")
+    parser.add_argument('--verbose', action='store_true', help="Loga cada requisição")
+    args = parser.parse_args()
+
+    # Precisam estar definidos antes de importar o handler
+    os.environ['STORAGE_BACKEND'] = args.backend
+    if args.metricas:
+        os.environ['METRICS_ENABLED'] = 'true'
+    os.environ.setdefault('DYNAMODB_TABLE', 'pecas-automotivas-api-local')
+    if args.backend == 'memory':
+        os.environ.setdefault('SNS_TOPIC_ARN', 'arn:aws:sns:us-east-1:000000000000:pecas-automotivas-topic')
+    import handler
+
+    routes = compile_routes(load_routes(), handler)
+    if args.backend == 'memory':
+        start_event_pipeline(handler, args.eventos)
+
+    server = ThreadingHTTPServer((args.host, args.porta), make_request_handler(routes, args.verbose))
+    server.daemon_threads = True
+
+    print(f"🚗 Servidor local em http://{args.host}:{args.porta} (backend: {args.backend})")
+    for route in sorted(routes, key=lambda route: (route['path'], route['method'])):
+        print(f"   {route['method']:<7} {route['path']:<24} -> {route['handler']}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nServidor encerrado.")
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
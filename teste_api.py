@@ -5,11 +5,16 @@ Execute após fazer o deploy no LocalStack para validar todos os endpoints
 """
 
 import requests
+import argparse
 import json
+import random
+import threading
 import time
 import sys
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
 # Configuração da API
 API_BASE_URL = "http://localhost:4566/restapis/{api_id}/local/_user_request_"
@@ -84,25 +89,36 @@ def get_api_id() -> Optional[str]:
     return None
 
 
-def make_request(method: str, endpoint: str, data: Optional[Dict] = None) -> tuple:
+def make_request(method: str, endpoint: str, data: Optional[Dict] = None,
+                 session: Optional[requests.Session] = None,
+                 params: Optional[Dict] = None,
+                 extra_headers: Optional[Dict] = None,
+                 response_headers: Optional[Dict] = None) -> tuple:
     """
     Faz uma requisição HTTP e retorna o status e resposta
+    Com 'session' a conexão HTTP é reaproveitada entre as requisições (keep-alive)
+    'extra_headers' vai junto com a requisição; se 'response_headers' for um
+    dict, recebe os headers da resposta (ex.: ETag)
     """
     url = f"{API_BASE_URL}{endpoint}"
-    headers = {"Content-Type": "application/json"}
+    headers = {"Content-Type": "application/json", **(extra_headers or {})}
+    client = session or requests
     
     try:
         if method == "GET":
-            response = requests.get(url, headers=headers, timeout=10)
+            response = client.get(url, headers=headers, params=params, timeout=10)
         elif method == "POST":
-            response = requests.post(url, json=data, headers=headers, timeout=10)
+            response = client.post(url, json=data, headers=headers, params=params, timeout=10)
         elif method == "PUT":
-            response = requests.put(url, json=data, headers=headers, timeout=10)
+            response = client.put(url, json=data, headers=headers, params=params, timeout=10)
         elif method == "DELETE":
-            response = requests.delete(url, headers=headers, timeout=10)
+            response = client.delete(url, headers=headers, params=params, timeout=10)
         else:
             return None, {"error": f"Método {method} não suportado"}
         
+        if response_headers is not None:
+            response_headers.update(response.headers)
+        
         try:
             response_data = response.json()
         except:
@@ -269,6 +285,116 @@ def test_validation_errors():
         print_error(f"Tratamento falhou. Status esperado: 404, recebido: {status}")
 
 
+def check(description: str, ok: bool, detail: Any = None) -> bool:
+    """
+    Imprime o resultado de uma verificação e o devolve
+    """
+    if ok:
+        print_success(description)
+    else:
+        print_error(description)
+        if detail is not None:
+            print(f"   Resposta: {json.dumps(detail, indent=2, ensure_ascii=False)}")
+    return ok
+
+
+def test_if_match_conflict(item_id: str) -> bool:
+    """
+    PUT com If-Match: o ETag atual é aceito e, depois disso, o mesmo ETag
+    (agora desatualizado) recebe 409
+    """
+    print_info(f"Testando PUT /items/{item_id} com If-Match")
+    headers = {}
+    make_request("GET", f"/items/{item_id}", response_headers=headers)
+    etag = headers.get("ETag")
+    if not check(f"GET devolveu ETag: {etag}", bool(etag)):
+        return False
+    
+    status, response = make_request("PUT", f"/items/{item_id}", {"preco": 31.50}, extra_headers={"If-Match": etag})
+    if not check(f"PUT com o ETag atual: {status} (esperado 200)", status == 200, response):
+        return False
+    status, response = make_request("PUT", f"/items/{item_id}", {"preco": 32.50}, extra_headers={"If-Match": etag})
+    return check(f"PUT com o ETag desatualizado: {status} (esperado 409)", status == 409, response)
+
+
+def test_stock_below_zero(item_id: str) -> bool:
+    """
+    Uma saída maior que o estoque deve ser rejeitada com 409 sem alterar a quantidade
+    """
+    print_info(f"Testando POST /items/{item_id}/estoque abaixo de zero")
+    status, response = make_request("GET", f"/items/{item_id}")
+    quantidade = response.get("item", {}).get("quantidade")
+    if not check(f"Quantidade atual: {quantidade}", status == 200 and quantidade is not None, response):
+        return False
+    
+    status, response = make_request("POST", f"/items/{item_id}/estoque", {"delta": -(int(quantidade) + 1)})
+    if not check(f"Saída de {int(quantidade) + 1} unidades: {status} (esperado 409)", status == 409, response):
+        return False
+    status, response = make_request("GET", f"/items/{item_id}")
+    return check("Quantidade não foi alterada", response.get("item", {}).get("quantidade") == quantidade, response)
+
+
+def test_if_none_match(item_id: str) -> bool:
+    """
+    GET com If-None-Match igual ao ETag atual deve responder 304 sem corpo
+    """
+    print_info(f"Testando GET /items/{item_id} com If-None-Match")
+    headers = {}
+    make_request("GET", f"/items/{item_id}", response_headers=headers)
+    etag = headers.get("ETag")
+    if not check(f"GET devolveu ETag: {etag}", bool(etag)):
+        return False
+    status, response = make_request("GET", f"/items/{item_id}", extra_headers={"If-None-Match": etag})
+    return check(f"GET com If-None-Match: {status} (esperado 304)", status == 304, response)
+
+
+def test_idempotency_key(item_data: Dict) -> tuple:
+    """
+    Dois POST /items com o mesmo Idempotency-Key: a segunda resposta é a da
+    primeira (mesmo ID, Idempotent-Replayed) e só uma peça é criada.
+    Retorna (passou, ID da peça criada ou None)
+    """
+    print_info(f"Testando POST /items com Idempotency-Key: {item_data['codigo']}")
+    key = {"Idempotency-Key": f"teste-{uuid.uuid4()}"}
+    status, first = make_request("POST", "/items", item_data, extra_headers=key)
+    if not check(f"Primeira requisição: {status} (esperado 201)", status == 201, first):
+        return False, None
+    item_id = first.get("item", {}).get("id")
+    
+    headers = {}
+    status, second = make_request("POST", "/items", item_data, extra_headers=key, response_headers=headers)
+    ok = check(f"Repetição: {status} (esperado 201)", status == 201, second)
+    ok = check("Repetição devolve a mesma peça", second.get("item", {}).get("id") == item_id, second) and ok
+    ok = check(f"Idempotent-Replayed: {headers.get('Idempotent-Replayed')}",
+               headers.get("Idempotent-Replayed") == "true") and ok
+    
+    status, response = make_request("GET", "/items", params={"codigo": item_data["codigo"]})
+    ok = check(f"Peças com o código {item_data['codigo']}: {response.get('count')} (esperado 1)",
+               status == 200 and len(response.get("items", [])) == 1, response) and ok
+    return ok, item_id
+
+
+def test_delete_batch_unknown(item_data: Dict) -> bool:
+    """
+    POST /items/delete-batch com uma peça criada pelo teste e um ID
+    inexistente: 207, a peça removida (200) e o inexistente com 404
+    """
+    print_info("Testando POST /items/delete-batch com ID inexistente")
+    status, response = make_request("POST", "/items", item_data)
+    item_id = response.get("item", {}).get("id") if status == 201 else None
+    if not check(f"Peça criada para o teste: {item_id}", bool(item_id), response):
+        return False
+    
+    unknown_id = str(uuid.uuid4())
+    status, response = make_request("POST", "/items/delete-batch", {"ids": [item_id, unknown_id]})
+    if not check(f"Exclusão em lote: {status} (esperado 207)", status == 207, response):
+        make_request("DELETE", f"/items/{item_id}")
+        return False
+    results = {result.get("id"): result.get("status") for result in response.get("results", [])}
+    ok = check(f"ID existente: {results.get(item_id)} (esperado 200)", results.get(item_id) == 200, response)
+    return check(f"ID inexistente: {results.get(unknown_id)} (esperado 404)", results.get(unknown_id) == 404) and ok
+
+
 def run_complete_test():
     """
     Executa a suíte completa de testes
@@ -281,11 +407,13 @@ def run_complete_test():
     tests_passed = 0
     tests_failed = 0
     
-    # Dados de teste
+    # Dados de teste: o sufixo torna os códigos únicos por execução, porque a
+    # API rejeita código duplicado (409) e a suíte pode rodar mais de uma vez
+    sufixo = uuid.uuid4().hex[:8].upper()
     test_items = [
         {
             "nome": "Vela de Ignição NGK Laser Platinum",
-            "codigo": "NGK-BKR6E-11",
+            "codigo": f"NGK-BKR6E-11-{sufixo}",
             "preco": 29.90,
             "quantidade": 150,
             "descricao": "Vela de ignição com eletrodo de platina",
@@ -293,7 +421,7 @@ def run_complete_test():
         },
         {
             "nome": "Filtro de Óleo Mann W610/1",
-            "codigo": "MANN-W610-1",
+            "codigo": f"MANN-W610-1-{sufixo}",
             "preco": 45.00,
             "quantidade": 80,
             "descricao": "Filtro de óleo para motores diesel e gasolina",
@@ -355,6 +483,55 @@ def run_complete_test():
     test_validation_errors()
     tests_passed += 3  # 3 testes de validação
     
+    # TESTE 7: Regras de consistência, cada uma sobre a segunda peça criada
+    print_header("TESTE 7: REGRAS DE CONSISTÊNCIA")
+    consistency_tests = (test_if_match_conflict, test_stock_below_zero, test_if_none_match)
+    if len(created_ids) > 1:
+        for test in consistency_tests:
+            print()
+            if test(created_ids[1]):
+                tests_passed += 1
+            else:
+                tests_failed += 1
+    else:
+        tests_failed += len(consistency_tests)
+    
+    print()
+    idempotent_ok, idempotent_id = test_idempotency_key({
+        "nome": "Pastilha de Freio Cobreq N-1000",
+        "codigo": f"COBREQ-N1000-{sufixo}",
+        "preco": 89.90,
+        "quantidade": 40,
+        "fabricante": "Cobreq"
+    })
+    if idempotent_id:
+        created_ids.append(idempotent_id)
+    if idempotent_ok:
+        tests_passed += 1
+    else:
+        tests_failed += 1
+    
+    print()
+    if test_delete_batch_unknown({
+        "nome": "Correia Dentada Gates 5504XS",
+        "codigo": f"GATES-5504XS-{sufixo}",
+        "preco": 119.00,
+        "quantidade": 25,
+        "fabricante": "Gates"
+    }):
+        tests_passed += 1
+    else:
+        tests_failed += 1
+    
+    # Limpeza: remove as peças que a suíte criou e ainda existem
+    print_header("LIMPEZA")
+    for item_id in created_ids[1:]:
+        status, _ = make_request("DELETE", f"/items/{item_id}")
+        if status == 200:
+            print_success(f"Peça de teste removida: {item_id}")
+        else:
+            print_warning(f"Não foi possível remover a peça de teste {item_id}. Status: {status}")
+    
     # Resumo final
     print_header("RESUMO DOS TESTES")
     print(f"\n{Colors.OKGREEN}✅ Testes Aprovados: {tests_passed}{Colors.ENDC}")
@@ -375,6 +552,313 @@ def run_complete_test():
         return 1
 
 
+# =============================================================================
+# TESTE DE CARGA
+# =============================================================================
+
+# Mix padrão de requisições (pesos relativos por operação)
+DEFAULT_MIX = "get=40,list=20,codigo=10,create=10,update=10,estoque=5,lookup=3,delete=2"
+
+FABRICANTES = ["NGK", "Bosch", "Mann Filter", "Cofap", "Moura", "Gates", "TRW", "Fras-le"]
+TIPOS_PECA = ["Vela de Ignição", "Filtro de Óleo", "Pastilha de Freio", "Correia Dentada",
+              "Bateria", "Amortecedor", "Filtro de Ar", "Disco de Freio"]
+
+
+def gerar_peca(rng: random.Random, indice: int) -> Dict:
+    """
+    Gera uma peça sintética para o catálogo de teste
+    """
+    fabricante = rng.choice(FABRICANTES)
+    tipo = rng.choice(TIPOS_PECA)
+    return {
+        "nome": f"{tipo} {fabricante} {indice}",
+        "codigo": f"CARGA-{fabricante[:3].upper()}-{indice:07d}-{rng.randrange(16 ** 4):04x}",
+        "preco": round(rng.uniform(5, 2000), 2),
+        "quantidade": rng.randint(0, 500),
+        "descricao": f"{tipo} gerado pelo teste de carga",
+        "fabricante": fabricante
+    }
+
+
+def parse_mix(mix: str) -> Dict[str, int]:
+    """
+    Converte 'get=40,list=20,...' em {'get': 40, 'list': 20, ...}
+    """
+    pesos = {}
+    for parte in mix.split(","):
+        nome, _, peso = parte.partition("=")
+        nome = nome.strip()
+        if nome not in LOAD_OPERATIONS:
+            raise ValueError(f"Operação desconhecida no mix: {nome}. Use: {', '.join(LOAD_OPERATIONS)}")
+        pesos[nome] = int(peso)
+    return pesos
+
+
+def percentile(valores: List[float], p: float) -> float:
+    """
+    Percentil p (0-100) de uma lista já ordenada
+    """
+    if not valores:
+        return 0.0
+    indice = min(len(valores) - 1, int(round(p / 100 * (len(valores) - 1))))
+    return valores[indice]
+
+
+class LoadState:
+    """
+    Estado compartilhado entre as threads do teste de carga
+    """
+    def __init__(self, seed: int):
+        self.lock = threading.Lock()
+        self.ids: List[str] = []
+        self.codigos: List[str] = []
+        self.contador = 0
+        self.seed = seed
+        self.latencias: Dict[str, List[float]] = {}
+        self.erros: Dict[str, int] = {}
+        self.status: Dict[str, Dict[int, int]] = {}
+    
+    def proximo_indice(self) -> int:
+        with self.lock:
+            self.contador += 1
+            return self.contador
+    
+    def registrar(self, operacao: str, latencia_ms: float, status: Optional[int], esperado: bool):
+        with self.lock:
+            self.latencias.setdefault(operacao, []).append(latencia_ms)
+            por_status = self.status.setdefault(operacao, {})
+            por_status[status] = por_status.get(status, 0) + 1
+            if not esperado:
+                self.erros[operacao] = self.erros.get(operacao, 0) + 1
+    
+    def adicionar_peca(self, item_id: str, codigo: str):
+        with self.lock:
+            self.ids.append(item_id)
+            self.codigos.append(codigo)
+    
+    def sortear_id(self, rng: random.Random, remover: bool = False) -> Optional[str]:
+        with self.lock:
+            if not self.ids:
+                return None
+            indice = rng.randrange(len(self.ids))
+            if remover:
+                self.codigos.pop(indice)
+                return self.ids.pop(indice)
+            return self.ids[indice]
+    
+    def sortear_codigo(self, rng: random.Random) -> Optional[str]:
+        with self.lock:
+            return rng.choice(self.codigos) if self.codigos else None
+
+
+def op_create(session, state, rng):
+    peca = gerar_peca(rng, state.proximo_indice())
+    status, body = make_request("POST", "/items", peca, session=session)
+    if status == 201:
+        state.adicionar_peca(body["item"]["id"], peca["codigo"])
+    return status, status == 201
+
+
+def op_list(session, state, rng):
+    status, _ = make_request("GET", "/items", session=session, params={"limit": "100"})
+    return status, status == 200
+
+
+def op_codigo(session, state, rng):
+    codigo = state.sortear_codigo(rng)
+    if codigo is None:
+        return op_list(session, state, rng)
+    status, _ = make_request("GET", "/items", session=session, params={"codigo": codigo})
+    return status, status == 200
+
+
+def op_get(session, state, rng):
+    item_id = state.sortear_id(rng)
+    if item_id is None:
+        return op_list(session, state, rng)
+    status, _ = make_request("GET", f"/items/{item_id}", session=session)
+    return status, status in (200, 404)
+
+
+def op_update(session, state, rng):
+    item_id = state.sortear_id(rng)
+    if item_id is None:
+        return op_create(session, state, rng)
+    status, _ = make_request("PUT", f"/items/{item_id}", {"preco": round(rng.uniform(5, 2000), 2)}, session=session)
+    return status, status in (200, 404)
+
+
+def op_estoque(session, state, rng):
+    item_id = state.sortear_id(rng)
+    if item_id is None:
+        return op_create(session, state, rng)
+    status, _ = make_request("POST", f"/items/{item_id}/estoque", {"delta": rng.choice([-1, 1, 5])}, session=session)
+    # 409 = estoque insuficiente, resultado esperado sob concorrência
+    return status, status in (200, 404, 409)
+
+
+def op_lookup(session, state, rng):
+    with state.lock:
+        ids = rng.sample(state.ids, min(50, len(state.ids)))
+    if not ids:
+        return op_list(session, state, rng)
+    status, _ = make_request("POST", "/items/lookup", {"ids": ids}, session=session)
+    return status, status == 200
+
+
+def op_delete(session, state, rng):
+    item_id = state.sortear_id(rng, remover=True)
+    if item_id is None:
+        return op_create(session, state, rng)
+    status, _ = make_request("DELETE", f"/items/{item_id}", session=session)
+    return status, status in (200, 404)
+
+
+LOAD_OPERATIONS = {
+    "get": op_get,
+    "list": op_list,
+    "codigo": op_codigo,
+    "create": op_create,
+    "update": op_update,
+    "estoque": op_estoque,
+    "lookup": op_lookup,
+    "delete": op_delete
+}
+
+
+def seed_catalog(state: LoadState, quantidade: int, rng: random.Random) -> int:
+    """
+    Cadastra o catálogo sintético inicial via POST /items/batch
+    """
+    session = requests.Session()
+    criadas = 0
+    for inicio in range(0, quantidade, 500):
+        lote = [gerar_peca(rng, state.proximo_indice()) for _ in range(min(500, quantidade - inicio))]
+        status, body = make_request("POST", "/items/batch", lote, session=session)
+        if status not in (201, 207):
+            print_error(f"Falha ao cadastrar catálogo inicial. Status: {status} - {body}")
+            break
+        for resultado in body.get("results", []):
+            if resultado.get("status") == 201:
+                state.adicionar_peca(resultado["id"], lote[resultado["index"]]["codigo"])
+                criadas += 1
+    return criadas
+
+
+def run_load_test(concorrencia: int, duracao: float, requisicoes: Optional[int],
+                  mix: Dict[str, int], catalogo: int, seed: int,
+                  saida: Optional[str]) -> int:
+    """
+    Executa o teste de carga e imprime throughput e latências por endpoint
+    """
+    print_header("⚡ TESTE DE CARGA - API PEÇAS AUTOMOTIVAS")
+    print(f"Endpoint Base: {API_BASE_URL}")
+    print(f"Concorrência: {concorrencia} | Mix: {mix}")
+    
+    state = LoadState(seed)
+    rng = random.Random(seed)
+    
+    print_info(f"Cadastrando catálogo sintético de {catalogo} peças...")
+    criadas = seed_catalog(state, catalogo, rng)
+    print_success(f"{criadas} peças cadastradas")
+    
+    operacoes = list(mix)
+    pesos = [mix[nome] for nome in operacoes]
+    restantes = [requisicoes]
+    deadline = time.perf_counter() + duracao
+    
+    def proxima_requisicao() -> bool:
+        if requisicoes is None:
+            return time.perf_counter() < deadline
+        with state.lock:
+            if restantes[0] <= 0:
+                return False
+            restantes[0] -= 1
+            return True
+    
+    def worker(numero: int):
+        worker_rng = random.Random(seed * 1000 + numero)
+        # Uma sessão por thread: conexões HTTP reaproveitadas (keep-alive)
+        with requests.Session() as session:
+            while proxima_requisicao():
+                operacao = worker_rng.choices(operacoes, weights=pesos)[0]
+                inicio = time.perf_counter()
+                status, esperado = LOAD_OPERATIONS[operacao](session, state, worker_rng)
+                state.registrar(operacao, (time.perf_counter() - inicio) * 1000, status, esperado)
+    
+    print_info("Executando carga...")
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        futures = [executor.submit(worker, numero) for numero in range(concorrencia)]
+    tempo_total = time.perf_counter() - inicio
+    
+    # Uma exceção em um worker encerra só aquela thread: sem conferir os
+    # resultados, a carga terminaria com menos concorrência e sem erro
+    falhas = []
+    for numero, future in enumerate(futures):
+        try:
+            future.result()
+        except Exception as e:
+            falhas.append(f"worker {numero}: {type(e).__name__}: {e}")
+    if falhas:
+        print_error(f"{len(falhas)} de {concorrencia} workers falharam; resultados descartados")
+        for falha in falhas:
+            print(f"   {falha}")
+        return 1
+    
+    resultados = {}
+    todas = []
+    for operacao, latencias in sorted(state.latencias.items()):
+        latencias.sort()
+        todas.extend(latencias)
+        resultados[operacao] = {
+            "requisicoes": len(latencias),
+            "erros": state.erros.get(operacao, 0),
+            "throughput_rps": round(len(latencias) / tempo_total, 2),
+            "p50_ms": round(percentile(latencias, 50), 2),
+            "p95_ms": round(percentile(latencias, 95), 2),
+            "p99_ms": round(percentile(latencias, 99), 2),
+            "status": {str(codigo): total for codigo, total in state.status[operacao].items()}
+        }
+    todas.sort()
+    total_erros = sum(state.erros.values())
+    resumo = {
+        "requisicoes": len(todas),
+        "erros": total_erros,
+        "duracao_s": round(tempo_total, 2),
+        "throughput_rps": round(len(todas) / tempo_total, 2) if tempo_total else 0,
+        "p50_ms": round(percentile(todas, 50), 2),
+        "p95_ms": round(percentile(todas, 95), 2),
+        "p99_ms": round(percentile(todas, 99), 2)
+    }
+    
+    print_header("RESULTADOS DO TESTE DE CARGA")
+    print(f"{'Operação':<10} {'Req':>8} {'Erros':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    print("-" * 67)
+    for operacao, r in resultados.items():
+        print(f"{operacao:<10} {r['requisicoes']:>8} {r['erros']:>7} {r['throughput_rps']:>9} "
+              f"{r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9}")
+    print("-" * 67)
+    print(f"{'TOTAL':<10} {resumo['requisicoes']:>8} {resumo['erros']:>7} {resumo['throughput_rps']:>9} "
+          f"{resumo['p50_ms']:>9} {resumo['p95_ms']:>9} {resumo['p99_ms']:>9}")
+    
+    if saida:
+        with open(saida, "w", encoding="utf-8") as arquivo:
+            json.dump({
+                "data_hora": datetime.now().isoformat(),
+                "endpoint": API_BASE_URL,
+                "concorrencia": concorrencia,
+                "mix": mix,
+                "catalogo": criadas,
+                "seed": seed,
+                "resumo": resumo,
+                "operacoes": resultados
+            }, arquivo, indent=2, ensure_ascii=False)
+        print_success(f"Resultados salvos em {saida}")
+    
+    return 0 if total_erros == 0 else 1
+
+
 def check_localstack_health():
     """
     Verifica se o LocalStack está rodando e saudável
@@ -405,9 +889,37 @@ def main():
     """
     global API_BASE_URL, API_ID
     
+    parser = argparse.ArgumentParser(description="Testes da API de Peças Automotivas")
+    parser.add_argument("api_id", nargs="?", help="API ID do LocalStack (detectado automaticamente se omitido)")
+    parser.add_argument("--base-url", help="URL base da API (ex.: http://localhost:8000), ignora o API ID")
+    parser.add_argument("--carga", action="store_true", help="Executa o teste de carga em vez da suíte funcional")
+    parser.add_argument("--concorrencia", type=int, default=10, help="Threads simultâneas (padrão: 10)")
+    parser.add_argument("--duracao", type=float, default=30, help="Duração do teste de carga em segundos (padrão: 30)")
+    parser.add_argument("--requisicoes", type=int, help="Total de requisições (substitui --duracao)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Pesos das operações (padrão: {DEFAULT_MIX})")
+    parser.add_argument("--catalogo", type=int, default=500, help="Peças cadastradas antes da carga (padrão: 500)")
+    parser.add_argument("--seed", type=int, default=42, help="Semente do gerador de dados (padrão: 42)")
+    parser.add_argument("--saida", help="Arquivo JSON para salvar os resultados da carga")
+    args = parser.parse_args()
+    
+    if args.carga:
+        try:
+            mix = parse_mix(args.mix)
+        except ValueError as e:
+            print_error(str(e))
+            return 1
+    
+    # URL direta (ex.: servidor local), sem LocalStack
+    if args.base_url:
+        API_BASE_URL = args.base_url.rstrip("/")
+        if args.carga:
+            return run_load_test(args.concorrencia, args.duracao, args.requisicoes,
+                                 mix, args.catalogo, args.seed, args.saida)
+        return run_complete_test()
+    
     # Verificar argumentos
-    if len(sys.argv) > 1:
-        API_ID = sys.argv[1]
+    if args.api_id:
+        API_ID = args.api_id
         print_info(f"Usando API ID fornecido: {API_ID}")
     else:
         # Tentar obter automaticamente
@@ -442,6 +954,9 @@ def main():
     time.sleep(2)
     
     # Executar testes
+    if args.carga:
+        return run_load_test(args.concorrencia, args.duracao, args.requisicoes,
+                             mix, args.catalogo, args.seed, args.saida)
     return run_complete_test()
 
 